@@ -30,6 +30,31 @@ class Act(BaseModel):
     )
 
 
+class Subtask(BaseModel):
+    """One piece of work for a worker agent."""
+
+    task: str = Field(description="the subtask, with all the information needed to do it")
+    depends_on: List[int] = Field(
+        default_factory=list,
+        description="numbers (1 for the first) of earlier subtasks whose results this one needs"
+    )
+
+
+class Subtasks(BaseModel):
+    """Subtasks to hand out to the team"""
+
+    tasks: List[Subtask] = Field(
+        description="subtasks in order; the ones that do not depend on each other are done at the same time"
+    )
+
+
+class Review(BaseModel):
+    """Quality review of an answer."""
+
+    approved: bool
+    feedback: str = Field(default="", description="what to fix, if not approved")
+
+
 def doer_hat (llm, tools):
     prompt = "You are a helpful assistant. Keep your answer short, crisp and to the point. Provide human readable answers."
     doer = create_react_agent(llm, tools, prompt=prompt)
@@ -84,4 +109,47 @@ Update your plan accordingly. If no more steps are needed and you can return to
 
     replanner = replanner_prompt |  llm.with_structured_output(Act)
     
-    return replanner
\ No newline at end of file
+    return replanner
+
+
+def leader_hat(llm, str_tools, profile=""):
+    leader_prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                f"""{profile}
+You lead a team of workers. Split the given objective into subtasks that a worker can do on its own. \
+Make each subtask independent unless it really needs the result of an earlier one, and say which earlier \
+subtasks it needs: independent subtasks are worked on at the same time. Do not add any superfluous subtasks.
+
+the workers have only following tools at disposal
+{str_tools}
+""".replace("{", "{{").replace("}", "}}"),
+            ),
+            ("placeholder", "{messages}"),
+        ]
+    )
+    leader = leader_prompt | llm.with_structured_output(Subtasks)
+    
+    return leader
+
+
+def qa_hat(llm, profile=""):
+    profile = profile.replace("{", "{{").replace("}", "}}")
+    qa_prompt = ChatPromptTemplate.from_template(
+    f"""{profile}
+Review the answer the team wrote for this objective. Approve it if it addresses the objective and is \
+consistent with the subtask results; otherwise say what to fix.
+
+Objective:
+{{input}}
+
+Subtask results:
+{{past_steps}}
+
+Answer:
+{{response}}"""
+)
+    qa = qa_prompt | llm.with_structured_output(Review)
+    
+    return qa
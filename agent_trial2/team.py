@@ -1,15 +1,20 @@
+import asyncio
 import operator
-from typing import Annotated, List, Tuple,Literal, Union
+import os
+import threading
+import yaml
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple,Literal, Union
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 from agent_trial2.tools import tools
 from langgraph.graph import END
 from langchain_core.prompts import ChatPromptTemplate
-from agent_trial2.hats import Response, doer_hat, planner_hat, replanner_hat
+from agent_trial2.hats import Response, Subtask, doer_hat, leader_hat, planner_hat, qa_hat, replanner_hat
 from langgraph.graph import StateGraph, START
-from langchain.tools import tool
-import inspect
 import re
+from framework.core.brains import Models, get_model
+from framework.core.metrics import stage
+from framework.core.tools import Toolbox, tool_to_call
 
 
 
@@ -21,7 +26,7 @@ class PlanExecute(TypedDict):
     
     
 
-class base_agent:
+class base_agent(Toolbox):
     def __init__(self, llm_think, llm_do, llm_interact):
         
         #step 1: get the tools
@@ -56,7 +61,8 @@ class base_agent:
         you are tasked with executing step {1}, {task}."""
         
         #step 4 - Now Execute the first step- remember the previous steps are being deleted
-        response = await self.doer.ainvoke({"messages":[("user", task_formatted)]})
+        with stage("agent.execute"):
+            response = await self.doer.ainvoke({"messages":[("user", task_formatted)]})
         #step 5 - Now add the value to previous messages in state
         return {
             "past_steps":[(task, response["messages"][-1].content)]
@@ -65,7 +71,8 @@ class base_agent:
 
     async def plan_step(self,state: PlanExecute):
         #step 1 - generate the plan
-        plan= await self.planner.ainvoke({"messages":["user", state["input"]]})
+        with stage("agent.plan"):
+            plan= await self.planner.ainvoke({"messages":["user", state["input"]]})
         
         #step 2 - return the plan
         return {"plan":plan.steps}
@@ -74,7 +81,8 @@ class base_agent:
 
     async def replan_step(self,state: PlanExecute):
         #step 1 - get the new plan
-        output= await self.replanner.ainvoke(state)
+        with stage("agent.replan"):
+            output= await self.replanner.ainvoke(state)
         
         #step 2 - check if the response is needed from the customer return
         if isinstance (output.action, Response):
@@ -123,47 +131,15 @@ class base_agent:
     
     def __get_tool_info(self):
         """
-        Dynamically identify and return information about all tool-decorated methods.
+        Return information about all tool-decorated methods, as found when the class was defined.
         
         Returns:
-            tuple: (description_string, function_list)
+            tuple: (description_string, tool_list)
         """
-        import inspect
-        
-        descriptions = ""
-        tool_methods = []
-        
-        # Get the source of the entire class
-        try:
-            class_source = inspect.getsource(self.__class__)
-            
-            # Split the source into method chunks
-            method_chunks = class_source.split("@tool")
-            
-            # Skip the first chunk (class definition before any @tool)
-            for chunk in method_chunks[1:]:
-                # Find the method name
-                method_match = inspect.re.search(r'def\s+(\w+)\s*\(', chunk)
-                if method_match:
-                    method_name = method_match.group(1)
-                    
-                    # Find the docstring
-                    docstring_match = inspect.re.search(r'"""(.*?)"""', chunk, inspect.re.DOTALL)
-                    docstring = docstring_match.group(1).strip() if docstring_match else ""
-                    
-                    # Get the actual method
-                    if hasattr(self, method_name):
-                        method = getattr(self, method_name)
-                        tool_methods.append(method)
-                        descriptions += f"{method_name}: {docstring}\n\n"
-        except Exception as e:
-            # Fallback: Just say what happened, maybe add a more robust solution
-            print(f"Error finding tools: {e}")
-        
-        return descriptions.strip(), tool_methods
+        return self.tool_descriptions(), self.langchain_tools()
         
     
-    @tool
+    @tool_to_call
     def calculate(self,expression: str) -> str:
         """Evaluate a mathematical expression.
         
@@ -181,7 +157,7 @@ class base_agent:
         except Exception as e:
             return f"Error calculating '{expression}': {str(e)}"
 
-    @tool
+    @tool_to_call
     def get_weather(self,location: str) -> str:
         """Get the current weather for a location.
         
@@ -204,7 +180,7 @@ class base_agent:
             return f"Current weather in {location.title()}: {weather_data[location_lower]}"
         return f"Weather information not available for {location}"
     
-    @tool
+    @tool_to_call
     def search_database(self,query: str) -> str:
         """Search a database for information about a given query.
         
@@ -227,4 +203,204 @@ class base_agent:
 
     
         
-    
\ No newline at end of file
+    
+
+class shared_state:
+    """Key-value store shared by the leader, the workers and QA of a team"""
+    
+    def __init__(self, initial: Optional[Dict[str, Any]] = None):
+        self._data = dict(initial or {})
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+    
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+    
+    def append(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data.setdefault(key, []).append(value)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._data)
+
+
+class agent_team:
+    """
+    A leader, a pool of worker agents and an optional QA reviewer sharing a state store.
+    
+    The leader splits an objective into subtasks and says which ones need
+    earlier results. Subtasks go into the room (a queue) as soon as what they
+    need is done, so independent ones are worked on at the same time; each
+    worker agent takes one subtask at a time, which bounds the concurrency to
+    the number of workers. The leader writes the answer from the results and
+    QA may send it back once with feedback. Results are kept in the shared
+    state under "results".
+    
+    The worker pool lives on the event loop that started it and is rebuilt
+    when the team is used from another one (e.g. a second asyncio.run). Use
+    `async with team:` or close() to stop it.
+    """
+    
+    def __init__(self, leader_llm, workers: List[base_agent], qa_llm=None,
+                 profiles: Optional[Dict[str, str]] = None, state: Optional[shared_state] = None,
+                 recursion_limit: int = 25):
+        profiles = profiles or {}
+        self.profiles = profiles
+        self.leader_llm = leader_llm
+        self.leader = leader_hat(llm=leader_llm, str_tools=base_agent.tool_descriptions(),
+                                 profile=profiles.get("leader", ""))
+        self.qa = qa_hat(llm=qa_llm, profile=profiles.get("qa", "")) if qa_llm is not None else None
+        self.workers = workers
+        self.state = state or shared_state()
+        self.recursion_limit = recursion_limit
+        self.room: Optional[asyncio.Queue] = None
+        self.pool: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counts = {"subtasks": 0, "failed": 0, "rejected": 0}
+    
+    @classmethod
+    def from_config(cls, org_file: str, make_llm: Optional[Callable[[Dict], Any]] = None,
+                    workers: Optional[int] = None) -> "agent_team":
+        """
+        Build a team from an org file (see config/orgs/jobsearch.yaml).
+        
+        Args:
+            org_file: Org YAML with `workers` and the leader, worker and qa roles
+            make_llm: Builds a model from a role's llm_settings. Defaults to get_model
+            workers: Number of worker agents, overriding the org file
+        """
+        with open(org_file, 'r') as file:
+            org = yaml.safe_load(file) or {}
+        make_llm = make_llm or (lambda settings: get_model(
+            Models(settings.get("model", Models.GPT4o.value)),
+            temperature=settings.get("temperature", 0),
+            max_tokens=settings.get("max_tokens", 4096)))
+        
+        profiles, llms = {}, {}
+        for role, role_config in (org.get("roles") or {}).items():
+            role_config = dict(role_config or {})
+            if "profile" in role_config:
+                # the profile file gives the defaults, the role overrides them
+                with open(os.path.join(os.path.dirname(org_file), role_config.pop("profile")), 'r') as file:
+                    role_config = {**(yaml.safe_load(file) or {}), **role_config}
+            profiles[role] = "\n".join(str(role_config[key]).strip()
+                                       for key in ("personality", "primary_goals", "capabilities")
+                                       if role_config.get(key))
+            llms[role] = make_llm(role_config.get("llm_settings", {}))
+        
+        count = workers if workers is not None else org.get("workers", 1)
+        worker_llm = llms.get("worker") or llms["leader"]
+        # the worker agents share one client: each only holds its own graph
+        pool = [base_agent(llm_think=worker_llm, llm_do=worker_llm, llm_interact=worker_llm)
+                for _ in range(count)]
+        return cls(leader_llm=llms["leader"], workers=pool, qa_llm=llms.get("qa"), profiles=profiles,
+                   state=shared_state(org.get("state")), recursion_limit=org.get("recursion_limit", 25))
+    
+    async def run(self, objective: str) -> str:
+        """Split the objective into subtasks, have the workers do them and answer from the results"""
+        with stage("team.run"):
+            with stage("team.lead"):
+                plan = await self.leader.ainvoke({"messages": [("user", objective)]})
+            subtasks = plan.tasks or [Subtask(task=objective)]
+            results = await self.dispatch(subtasks)
+            past_steps = list(zip([subtask.task for subtask in subtasks], results))
+            
+            answer = await self._compose(objective, past_steps)
+            if self.qa is not None:
+                with stage("team.review"):
+                    review = await self.qa.ainvoke({"input": objective, "past_steps": past_steps,
+                                                    "response": answer})
+                if not review.approved:
+                    self.counts["rejected"] += 1
+                    answer = await self._compose(objective, past_steps, review.feedback)
+            
+            self.state.append("runs", {"objective": objective, "subtasks": len(subtasks), "answer": answer})
+            return answer
+    
+    async def dispatch(self, subtasks: List[Subtask]) -> List[str]:
+        """Have the workers do the subtasks, each as soon as the subtasks it depends on are done"""
+        self._start()
+        running: List[asyncio.Task] = []
+        
+        async def run_subtask(position: int, subtask: Subtask) -> str:
+            needed = sorted({number - 1 for number in subtask.depends_on if 1 <= number <= position})
+            task = subtask.task
+            if needed:
+                inputs = [await running[index] for index in needed]
+                task += "\n\nResults you can use:\n" + "\n".join(
+                    f"{index + 1}. {subtasks[index].task}: {result}" for index, result in zip(needed, inputs))
+            result = await self.submit(task)
+            self.state.append("results", {"task": subtask.task, "result": result})
+            return result
+        
+        for position, subtask in enumerate(subtasks):
+            running.append(asyncio.ensure_future(run_subtask(position, subtask)))
+        return list(await asyncio.gather(*running))
+    
+    async def submit(self, task: str) -> str:
+        """Queue one task for the next free worker and wait for its answer"""
+        self._start()
+        answer = asyncio.get_running_loop().create_future()
+        await self.room.put((task, answer))
+        return await answer
+    
+    async def close(self) -> None:
+        if self._loop is asyncio.get_running_loop():
+            for worker in self.pool:
+                worker.cancel()
+            await asyncio.gather(*self.pool, return_exceptions=True)
+        # a pool of another loop died with it
+        self.pool, self.room, self._loop = [], None, None
+    
+    async def __aenter__(self) -> "agent_team":
+        self._start()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.room is None or self._loop is not loop:
+            # the queue and the workers are bound to the loop they were made on
+            self._loop = loop
+            self.room = asyncio.Queue()
+            self.pool = [asyncio.create_task(self._work(agent)) for agent in self.workers]
+    
+    async def _work(self, agent: base_agent) -> None:
+        profile = self.profiles.get("worker", "")
+        while True:
+            task, answer = await self.room.get()
+            try:
+                with stage("team.subtask"):
+                    state = await agent.get_app().ainvoke({"input": f"{profile}\n\n{task}" if profile else task},
+                                                          {"recursion_limit": self.recursion_limit})
+                self.counts["subtasks"] += 1
+                result = state.get("response", "")
+            except Exception as e:
+                self.counts["failed"] += 1
+                result = f"Error executing {task}: {e}"
+            if not answer.done():
+                answer.set_result(result)
+    
+    async def _compose(self, objective: str, past_steps: List[Tuple], feedback: str = "") -> str:
+        steps = "\n".join(f"{i+1}. {task}: {result}" for i, (task, result) in enumerate(past_steps))
+        prompt = f"""{self.profiles.get("leader", "")}
+Write the answer to this objective from the results of your team.
+
+Objective:
+{objective}
+
+Results:
+{steps}
+"""
+        if feedback:
+            prompt += f"\nA reviewer sent back the previous answer: {feedback}\n"
+        with stage("team.compose"):
+            response = await self.leader_llm.ainvoke(prompt)
+        return response.content
@@ -11,11 +11,19 @@ from langchain_community.llms import Replicate
 from langchain_ollama import ChatOllama
 from typing import List, Dict, Any, Callable, Optional
 
-from framework.core.brains import get_model, tool_to_call, Models,standardize_tool_output
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
+from framework.core.brains import get_model, tool_to_call, Models, ToolCallStream, chunk_text
+from framework.core.metrics import stage
+from framework.core.tools import Toolbox
 
 
-class Worker:
+
+class Worker(Toolbox):
     """
     A self-contained Worker class that includes:
     1. The LLM initialization
@@ -33,158 +41,117 @@ class Worker:
 
         self.llm = llm
         
-        # Create a dictionary to store tool functions by name
-        self.tool_functions = {}
-        
         # Bind all tool methods to the LLM
         self._bind_tools()
     
     def _bind_tools(self):
-        """Discover and bind methods marked with @tool_to_call."""
-        tools = []
+        """Bind the methods marked with @tool_to_call, as found when the class was defined."""
+        tools = self.langchain_tools()
         
-        # Look for methods that have the _is_tool marker
-        for attr_name in dir(self):
-            if attr_name.startswith('__'):
-                continue
-                
-            attr = getattr(self, attr_name)
-            if callable(attr) and hasattr(attr, '_is_tool') and attr._is_tool:
-                # Get tool name (use method name if not specified)
-                name = attr._tool_name or attr_name
-                
-                # Get tool description (use docstring if not specified)
-                description = attr._tool_description
-                if description is None and attr.__doc__:
-                    description = attr.__doc__.strip()
-                
-                # Create a Tool from the method
-                tool = Tool(
-                    name=name,
-                    description=description,
-                    func=attr
-                )
-                tools.append(tool)
-                
-                # Store the function in our dictionary for direct access
-                self.tool_functions[name] = attr
+        # Store the functions in our dictionary for direct access
+        self.tool_functions = self.bound_tools()
         
         print(f"Discovered {len(tools)} tools: {[t.name for t in tools]}")
         
         # Bind tools to the LLM
         self.llm_with_tools = self.llm.bind_tools(tools)
         
-    def run_query(self, query):
+    def run_query(self, query, max_iterations: int = 5):
         """
-        Run a query through the LLM with tools.
+        Run a query through the LLM with tools until it answers without calling any.
+        
+        Each model turn is streamed and each tool call is started as soon as
+        the model has finished writing it, so the tool calls of one turn run
+        concurrently (in a thread pool) and the first ones run while the model
+        is still generating. All results of a turn go back to the LLM as one
+        batch of tool messages. After max_iterations turns with tool calls the
+        LLM is asked to answer without tools.
+        
+        The timing of every turn is kept in self.iterations: model time, time
+        waiting on tools after the model finished, and the number of calls.
         
         Args:
             query: The query string to process
+            max_iterations: Most model turns that may call tools
             
         Returns:
             The LLM's response
         """
-        # Get the initial response from the LLM
-        response = self.llm_with_tools.invoke(query)
-        
-        # Print the full response for debugging
-        print(f"Full response: {response}")
-        response2= standardize_tool_output (llm_response=response, provider="ollama")
-        print(f"\n\n modified response: {response2}")
-        
-        # Extract any tool calls from the response - supporting both OpenAI and LangChain formats
-        tool_calls = []
-        # if 'tool_calls' in response.additional_kwargs:
-        #     tool_calls = response.additional_kwargs['tool_calls']
-        # elif 'function_call' in response.additional_kwargs:
-        #     # Single function call case
-        #     tool_calls = [{
-        #         'id': 'function_call_id',
-        #         'name': response.additional_kwargs['function_call']['name'],
-        #         'arguments': response.additional_kwargs['function_call']['arguments']
-        #     }]
-        
-        # If we have tool calls, we need to execute them and provide the results
-        # if tool_calls:
-        #     print(f"Tool calls detected: {json.dumps(tool_calls)}")
-        #     tool_results = []
-            
-        #     for tool_call in tool_calls:
-        #         # Handle both formats of tool calls
-        #         if 'function' in tool_call:
-        #             # OpenAI format
-        #             tool_name = tool_call['function']['name']
-        #             try:
-        #                 # Parse arguments from JSON string
-        #                 args_str = tool_call['function']['arguments']
-        #                 tool_args = json.loads(args_str)
-        #             except:
-        #                 tool_args = {}
-        #             tool_id = tool_call['id']
-        #         else:
-        #             # LangChain format
-        #             tool_name = tool_call['name']
-        #             tool_args = tool_call.get('args', {})
-        #             tool_id = tool_call.get('id', 'tool_call_id')
+        messages = [HumanMessage(content=query)]
+        self.iterations = []
+        with ThreadPoolExecutor(max_workers=8) as pool, stage("worker.tool_loop"):
+            for iteration in range(max_iterations):
+                started = time.perf_counter()
+                response, results = self._run_turn(messages, pool)
+                generated = time.perf_counter()
+                results = [(call, future.result()) for call, future in results]
+                finished = time.perf_counter()
+                self.iterations.append({
+                    "iteration": iteration + 1,
+                    "model_seconds": generated - started,
+                    "tool_wait_seconds": finished - generated,
+                    "tool_calls": len(results),
+                })
+                print(f"Iteration {iteration + 1}: model {generated - started:.2f}s, "
+                      f"waited {finished - generated:.2f}s for {len(results)} tool call(s)")
                 
-        #         print(f"Executing tool: {tool_name} with args: {tool_args}")
+                # If no tool calls, this is the answer
+                if not results:
+                    return response.content if response is not None else ""
                 
-        #         # Get the appropriate function from our dictionary
-        #         if tool_name in self.tool_functions:
-        #             func = self.tool_functions[tool_name]
-                    
-        #             try:
-        #                 # Extract argument value - OpenAI sometimes uses __arg1 for the first argument
-        #                 if '__arg1' in tool_args:
-        #                     arg_value = tool_args['__arg1']
-        #                     result = func(arg_value)
-        #                 else:
-        #                     # Try to match args to function parameters
-        #                     result = func(**tool_args)
-                        
-        #                 print(f"Tool execution result: {result}")
-                        
-        #                 tool_results.append({
-        #                     "tool_call_id": tool_id,
-        #                     "role": "tool",
-        #                     "name": tool_name,
-        #                     "content": str(result)
-        #                 })
-        #             except Exception as e:
-        #                 print(f"Error executing tool: {e}")
-        #                 tool_results.append({
-        #                     "tool_call_id": tool_id,
-        #                     "role": "tool",
-        #                     "name": tool_name,
-        #                     "content": f"Error: {str(e)}"
-        #                 })
-        #         else:
-        #             print(f"Tool not found: {tool_name}")
-            
-        #     # If we have results, send them back to the LLM for final response
-        #     if tool_results:
-        #         print(f"Sending tool results back to LLM: {tool_results}")
-                
-        #         # Create a conversation with the original query, the response with tool calls, and the tool results
-        #         messages = [
-        #             {"role": "user", "content": query},
-        #             {"role": "assistant", "content": response.content or "", "tool_calls": tool_calls},
-        #         ]
-                
-        #         # Add tool results
-        #         for result in tool_results:
-        #             messages.append(result)
-                
-        #         # Get the final response
-        #         try:
-        #             final_response = self.llm.invoke(messages)
-        #             return final_response.content
-        #         except Exception as e:
-        #             print(f"Error getting final response: {e}")
-        #             return f"Error processing tool results: {str(e)}"
-        
-        # If no tool calls, return the original response
-        return response.content
+                # One assistant turn with ids, then one tool message per call
+                tool_calls = [{"name": call["name"], "args": call["arguments"],
+                               "id": call.get("id") or f"call_{iteration}_{index}"}
+                              for index, (call, _) in enumerate(results)]
+                messages.append(AIMessage(content=chunk_text(response), tool_calls=tool_calls))
+                messages.extend(ToolMessage(content=result, tool_call_id=tool_call["id"], name=tool_call["name"])
+                                for tool_call, (_, result) in zip(tool_calls, results))
+        
+        print(f"Stopped calling tools after {max_iterations} iterations")
+        try:
+            final_response = self.llm.invoke(messages)
+            return final_response.content
+        except Exception as e:
+            print(f"Error getting final response: {e}")
+            return f"Error processing tool results: {str(e)}"
+    
+    def _run_turn(self, messages, pool):
+        """Stream one model turn, submitting each tool call as soon as it is parsed"""
+        parser = ToolCallStream()
+        response = None
+        calls = []
+        for chunk in self.llm_with_tools.stream(messages):
+            response = chunk if response is None else response + chunk
+            for call in parser.feed(chunk):
+                print(f"Executing tool: {call['name']} with args: {call['arguments']}")
+                calls.append((call, pool.submit(self._call_tool, call)))
+        for call in parser.close():
+            print(f"Executing tool: {call['name']} with args: {call['arguments']}")
+            calls.append((call, pool.submit(self._call_tool, call)))
+        return response, calls
+    
+    def _call_tool(self, call) -> str:
+        """Run one tool call and return its result (or the error) as text"""
+        tool_name = call["name"]
+        tool_args = call["arguments"]
+        if tool_name not in self.tool_functions:
+            print(f"Tool not found: {tool_name}")
+            return f"Error: unknown tool {tool_name}"
+        func = self.tool_functions[tool_name]
+        try:
+            # Tools bound through langchain.tools.Tool take their single argument as __arg1
+            if '__arg1' in tool_args:
+                result = func(tool_args['__arg1'])
+            else:
+                result = func(**tool_args)
+            if inspect.isawaitable(result):
+                # async tools get an event loop of their own in the pool thread
+                result = asyncio.run(result)
+            print(f"Tool execution result: {result}")
+            return str(result)
+        except Exception as e:
+            print(f"Error executing tool: {e}")
+            return f"Error: {str(e)}"
     
     @tool_to_call()
     def search_database(self, query: str) -> str:
@@ -1,7 +1,8 @@
 import yaml
 import inspect
-import functools
 import json
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List, Dict, Any, Optional, Union, Callable
 
 # LangChain imports for messages
@@ -9,9 +10,16 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
 # Import model utility (replace with your actual model utility)
 from framework.core.brains import Models, get_model
+from framework.core.memory import ConversationMemory
+from framework.core.tools import Toolbox, tool_to_call
 
 
-class PlanAndExecuteAgent:
+# $N (optionally $N.key.0) in a tool parameter: the result of call N of the same response;
+# $result-N: a result kept in the result store because it was too large for the conversation
+RESULT_REFERENCE = re.compile(r"\$(\d+|result-\d+)((?:\.\w+)*)")
+
+
+class PlanAndExecuteAgent(Toolbox):
     """Simple plan-and-execute agent that treats all tools equally"""
     
     def __init__(self, config_file: str, model: str = "gpt-4"):
@@ -24,18 +32,21 @@ class PlanAndExecuteAgent:
         
         # Initialize state and conversations
         self.state = {}
-        self.internal_messages = []
+        # Tool results too large to put in the conversation, by reference
+        self.result_store: Dict[str, Any] = {}
+        # Internal conversation, packed into a token budget for each prompt
+        self.internal_messages = ConversationMemory.from_config(self.config.get("memory"), llm=self.llm)
         self.user_messages = []
     
     def add_user_message(self, message: str):
         """Add a user message to both conversation tracks"""
         self.user_messages.append({"role": "user", "content": message})
-        self.internal_messages.append(HumanMessage(content=message))
+        self.internal_messages.add(HumanMessage(content=message))
     
     def add_assistant_message(self, message: str):
         """Add an assistant message to both conversation tracks"""
         self.user_messages.append({"role": "assistant", "content": message})
-        self.internal_messages.append(AIMessage(content=message))
+        self.internal_messages.add(AIMessage(content=message))
     
     def process_input(self, user_input: str) -> str:
         """Process user input and return response"""
@@ -46,7 +57,7 @@ class PlanAndExecuteAgent:
         planning_prompt = self._create_planning_prompt(user_input)
         
         # Get tool calls from LLM
-        messages = [SystemMessage(content=planning_prompt)] + self.internal_messages[-10:]
+        messages = [SystemMessage(content=planning_prompt)] + self.internal_messages.context()
         response = self.llm.invoke(messages)
         
         # Extract tool calls from response
@@ -86,6 +97,11 @@ parameters:
 ```
 
 If you need to make multiple tool calls, list them in sequence, each in its own code block.
+To pass the result of an earlier call in this response to a later one, write $N as the parameter
+value, where N is the number of that call (1 for the first), optionally followed by a key path
+such as $1.results.0. Calls that do not use earlier results run at the same time.
+A result too large for the conversation is shown as "stored as result-N": pass it on whole as
+$result-N, or read parts of it with the read_stored_result tool.
 
 If you don't need to call any tools, just provide a direct response to the user.
 """
@@ -95,28 +111,22 @@ If you don't need to call any tools, just provide a direct response to the user.
         """Get descriptions of all available tools"""
         descriptions = []
         
-        for attr_name in dir(self):
-            attr = getattr(self, attr_name)
-            if hasattr(attr, '_is_tool') and attr._is_tool:
-                # Get function signature
-                signature = inspect.signature(attr)
-                
-                # Get parameters
-                params = []
-                for param_name, param in signature.parameters.items():
-                    if param_name != 'self':
-                        param_type = param.annotation.__name__ if param.annotation != inspect.Parameter.empty else "any"
-                        default = "" if param.default == inspect.Parameter.empty else f" (default: {param.default})"
-                        params.append(f"  - {param_name}: {param_type}{default}")
-                
-                # Format description
-                description = f"""
-Tool: {attr_name}
-Description: {attr.__doc__ or 'No description available'}
+        for name, spec in self.tool_specs().items():
+            # Get parameters
+            params = []
+            for param_name, param in spec.signature.parameters.items():
+                param_type = param.annotation.__name__ if param.annotation != inspect.Parameter.empty else "any"
+                default = "" if param.default == inspect.Parameter.empty else f" (default: {param.default})"
+                params.append(f"  - {param_name}: {param_type}{default}")
+            
+            # Format description
+            description = f"""
+Tool: {name}
+Description: {spec.description}
 Parameters:
 {chr(10).join(params) if params else '  None'}
 """
-                descriptions.append(description)
+            descriptions.append(description)
         
         return "\n".join(descriptions)
     
@@ -167,7 +177,7 @@ Parameters:
         # If no tool blocks were found but there's a direct response
         if not tool_calls and not self._contains_tool_block(response):
             # Treat as a direct response
-            self.internal_messages.append(SystemMessage(
+            self.internal_messages.add(SystemMessage(
                 content="LLM decided to respond directly without tool calls."
             ))
             return []
@@ -179,66 +189,87 @@ Parameters:
         return '```tool' in text
     
     def _execute_tool_sequence(self, tool_calls: List[Dict]) -> str:
-        """Execute a sequence of tool calls"""
+        """
+        Execute a sequence of tool calls.
+        
+        A call whose parameters reference an earlier result ($1, $2.results.0, ...)
+        waits for that call; the others run concurrently in a thread pool. The
+        conversation and the execution summary still list the calls in their
+        original order. Results too large to inline are kept in self.result_store
+        and referenced by id in the conversation.
+        """
         if not tool_calls:
             # No tool calls, so just return the LLM's direct response
-            return self.internal_messages[-1].content
+            return self.internal_messages.last().content
         
-        # Execute each tool in sequence
-        execution_summary = []
-        final_result = None
+        # Which earlier calls (0-based) each call needs
+        dependencies = [self._referenced_calls(tool_call["parameters"], position)
+                        for position, tool_call in enumerate(tool_calls)]
+        outcomes: Dict[int, Dict] = {}
+        
+        with ThreadPoolExecutor(max_workers=self.config.get("max_parallel_tools", 8)) as pool:
+            running = {}
+            while len(outcomes) < len(tool_calls):
+                for position, tool_call in enumerate(tool_calls):
+                    if position in outcomes or position in running.values():
+                        continue
+                    if not all(dependency in outcomes for dependency in dependencies[position]):
+                        continue
+                    failed = [dependency + 1 for dependency in dependencies[position]
+                              if "error" in outcomes[dependency]]
+                    if failed:
+                        outcomes[position] = {"error": f"depends on failed call(s) {failed}"}
+                        continue
+                    try:
+                        parameters = self._resolve_references(tool_call["parameters"], outcomes)
+                    except (TypeError, KeyError, IndexError, ValueError) as e:
+                        # a model-written path that does not fit the result fails only this call
+                        outcomes[position] = {"error": f"could not resolve reference: {e!r}"}
+                        continue
+                    running[pool.submit(self._run_tool, tool_call["tool_name"], parameters)] = position
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcomes[running.pop(future)] = future.result()
         
-        for tool_call in tool_calls:
+        # Record everything in the original order
+        execution_summary = []
+        for position, tool_call in enumerate(tool_calls):
             tool_name = tool_call["tool_name"]
             parameters = tool_call["parameters"]
-            
-            self.internal_messages.append(SystemMessage(
+            outcome = outcomes[position]
+            self.internal_messages.add(SystemMessage(
                 content=f"Executing tool: {tool_name} with parameters: {json.dumps(parameters)}"
             ))
             
-            # Execute the tool
-            try:
-                # Get the tool method
-                if hasattr(self, tool_name) and hasattr(getattr(self, tool_name), '_is_tool'):
-                    tool_method = getattr(self, tool_name)
-                    
-                    # Prepare parameters (convert types if needed)
-                    processed_params = self._process_parameters(tool_method, parameters)
-                    
-                    # Execute the tool
-                    result = tool_method(**processed_params)
-                    final_result = result  # Save the last result
-                    
-                    # Record result in internal conversation
-                    self.internal_messages.append(SystemMessage(
-                        content=f"Tool result: {json.dumps(result)}"
-                    ))
-                    
-                    # Update state with relevant information from the result
-                    if isinstance(result, dict) and result.get("update_state", False):
-                        # Tool result indicates state should be updated
-                        state_updates = result.get("state_updates", {})
-                        for key, value in state_updates.items():
-                            self._update_state(key, value)
-                    
-                    # Add to execution summary
-                    execution_summary.append({
-                        "tool": tool_name,
-                        "parameters": parameters,
-                        "result": result
-                    })
-                else:
-                    raise ValueError(f"Tool not found: {tool_name}")
-            
-            except Exception as e:
-                # Log the error and continue
-                error_msg = f"Error executing tool {tool_name}: {str(e)}"
-                self.internal_messages.append(SystemMessage(content=error_msg))
+            if "error" in outcome:
+                error_msg = f"Error executing tool {tool_name}: {outcome['error']}"
+                self.internal_messages.add(SystemMessage(content=error_msg))
                 execution_summary.append({
                     "tool": tool_name,
                     "parameters": parameters,
-                    "error": str(e)
+                    "error": outcome["error"]
                 })
+                continue
+            
+            result = outcome["result"]
+            
+            # Update state with relevant information from the result
+            if isinstance(result, dict) and result.get("update_state", False):
+                # Tool result indicates state should be updated
+                state_updates = result.get("state_updates", {})
+                for key, value in state_updates.items():
+                    self._update_state(key, value)
+            
+            # Record result in internal conversation, by reference if it is large
+            shown = self._store_result(result)
+            self.internal_messages.add(SystemMessage(content=f"Tool result: {shown}"))
+            execution_summary.append({
+                "tool": tool_name,
+                "parameters": parameters,
+                "result": shown
+            })
         
         # Generate a final response based on the execution results
         response_prompt = f"""
@@ -257,15 +288,81 @@ Generate ONLY the response to the user, with no additional formatting.
 """
         
         # Get final response from LLM
-        messages = [SystemMessage(content=response_prompt)] + self.internal_messages[-15:]
+        messages = [SystemMessage(content=response_prompt)] + self.internal_messages.context()
         final_response = self.llm.invoke(messages)
         
         return final_response.content
     
-    def _process_parameters(self, tool_method: Callable, parameters: Dict) -> Dict:
+    def _run_tool(self, tool_name: str, parameters: Dict) -> Dict:
+        """Run one tool call: {"result": ...} or {"error": ...}"""
+        try:
+            spec = self.tool_specs().get(tool_name)
+            if spec is None:
+                raise ValueError(f"Tool not found: {tool_name}")
+            tool_method = getattr(self, spec.attribute)
+            
+            # Prepare parameters (convert types if needed)
+            processed_params = self._process_parameters(spec.signature, parameters)
+            return {"result": tool_method(**processed_params)}
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def _referenced_calls(self, parameters: Dict, position: int) -> List[int]:
+        """Earlier calls (0-based) whose results the parameters reference as $N"""
+        referenced = set()
+        for value in parameters.values():
+            for match in RESULT_REFERENCE.finditer(str(value)):
+                if not match.group(1).isdigit():
+                    continue
+                number = int(match.group(1))
+                if 1 <= number <= position:
+                    referenced.add(number - 1)
+        return sorted(referenced)
+    
+    def _resolve_references(self, parameters: Dict, outcomes: Dict[int, Dict]) -> Dict:
+        """
+        Replace $N and $N.key.0 references with results of earlier calls, and
+        $result-N with stored results. A parameter that is only a reference
+        gets the value itself; a reference inside text is replaced by the value
+        as text. A path that does not fit the value raises TypeError, KeyError,
+        IndexError or ValueError.
+        """
+        def lookup(match):
+            if match.group(1).isdigit():
+                value = outcomes[int(match.group(1)) - 1]["result"]
+            else:
+                value = self.result_store[match.group(1)]
+            for key in filter(None, (match.group(2) or "").split(".")):
+                value = value[int(key)] if isinstance(value, list) else value[key]
+            return value
+        
+        def as_text(match):
+            value = lookup(match)
+            return value if isinstance(value, str) else json.dumps(value, default=str)
+        
+        resolved = {}
+        for name, value in parameters.items():
+            if not isinstance(value, str) or not RESULT_REFERENCE.search(value):
+                resolved[name] = value
+            elif RESULT_REFERENCE.fullmatch(value.strip()):
+                resolved[name] = lookup(RESULT_REFERENCE.fullmatch(value.strip()))
+            else:
+                resolved[name] = RESULT_REFERENCE.sub(as_text, value)
+        return resolved
+    
+    def _store_result(self, result: Any) -> str:
+        """The result as it goes into the conversation: inline, or a reference and preview if large"""
+        serialized = json.dumps(result, default=str)
+        limit = self.config.get("max_inline_result_chars", 2000)
+        if len(serialized) <= limit:
+            return serialized
+        reference = f"result-{len(self.result_store) + 1}"
+        self.result_store[reference] = result
+        return f"[stored as {reference}, {len(serialized)} characters] {serialized[:200]}..."
+    
+    def _process_parameters(self, signature: inspect.Signature, parameters: Dict) -> Dict:
         """Process and convert parameters to the correct types"""
         processed = {}
-        signature = inspect.signature(tool_method)
         
         for param_name, param_value in parameters.items():
             if param_name in signature.parameters:
@@ -321,17 +418,20 @@ Generate ONLY the response to the user, with no additional formatting.
             }
         }
         return results
-
-
-# Decorator for marking tools
-def tool_to_call(func):
-    """Decorator to mark a method as an available tool"""
-    @functools.wraps(func)
-    def wrapper(self, *args, **kwargs):
-        return func(self, *args, **kwargs)
     
-    wrapper._is_tool = True
-    return wrapper
+    @tool_to_call
+    def read_stored_result(self, reference: str, offset: int = 0, length: int = 1500) -> str:
+        """Read part of a tool result that was too large for the conversation.
+        
+        Args:
+            reference: The id the result was stored as, e.g. result-1
+            offset: Character of the stored result (as JSON) to start at
+            length: Number of characters to read
+        """
+        if reference not in self.result_store:
+            raise ValueError(f"No stored result {reference}; stored: {', '.join(self.result_store) or 'none'}")
+        serialized = json.dumps(self.result_store[reference], default=str)
+        return serialized[offset:offset + length]
 
 
 # Example usage (for your reference)
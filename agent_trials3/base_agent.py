@@ -1,17 +1,26 @@
 from agent_trials3.displays.console_based import AgentDisplay
 from langgraph.graph import StateGraph, START, END
 from typing_extensions import TypedDict
-from typing import Annotated, List, Tuple, Literal, Union
+from typing import Annotated, Dict, List, Optional, Tuple, Literal, Union
 import operator
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.models.groq import GroqModel
-from agent_trials3.hats import planner_hat, replanner_hat, doer_hat, Response
+from agent_trials3.hats import planner_hat, replanner_hat, doer_hat, interactor_hat, run_hat, Response, AskUser
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.tools import Tool
 from pydantic_ai.exceptions import UsageLimitExceeded
+from agent_trials3.budget import BudgetExceeded, BudgetMeter, RunBudget, add_usage
+from langgraph.types import Command, interrupt
+from framework.core.checkpoints import checkpoint_store
+from framework.core.config_manager import settings
+from framework.core.metrics import metrics_store
+from framework.core.reflection import reflection_log
+from framework.core.tools import Toolbox, tool_to_call
+import asyncio
 import inspect
 import re
+import uuid
 
 
 class PlanExecute(TypedDict):
@@ -19,23 +28,23 @@ class PlanExecute(TypedDict):
     plan: List[str]
     past_steps: Annotated[List[Tuple], operator.add]
     response: str
+    run_id: str
+    question: str
+    usage: Annotated[Dict[str, float], add_usage]
 
 
 # Decorators for tools
-def tool_for_doer(fn):
-    fn._is_tool = True
-    fn._use_context = False
-    return fn
+tool_for_doer = tool_to_call()
+tool_for_doer_with_context = tool_to_call(use_context=True)
 
 
-def tool_for_doer_with_context(fn):
-    fn._is_tool = True
-    fn._use_context = True
-    return fn
-
-
-class base_agent:
-    def __init__(self, llm_think, llm_do, llm_interact):
+class base_agent(Toolbox):
+    def __init__(self, llm_think, llm_do, llm_interact, checkpointer=None, budget: Optional[RunBudget] = None):
+        # llm_think and llm_do may each be a list of models, cheapest first: a hat
+        # runs on the first one and escalates when it cannot produce a valid result
+        llm_think, *self.think_escalation = llm_think if isinstance(llm_think, (list, tuple)) else [llm_think]
+        llm_do, *self.do_escalation = llm_do if isinstance(llm_do, (list, tuple)) else [llm_do]
+        
         # Initialize the display
         self.display = AgentDisplay()
         self.display.start()
@@ -48,6 +57,17 @@ class base_agent:
         self.planner = planner_hat(model=llm_think, tools=tools_at_disposal)
         self.replanner = replanner_hat(model=llm_think, tools=tools_at_disposal)
         self.llm_interact = llm_interact
+        self.interactor = interactor_hat(model=llm_interact)
+        
+        # Lessons and outcomes of earlier runs, for the planner
+        self.reflections = reflection_log()
+        
+        # Runs waiting for the user are checkpointed here, keyed by run id, and
+        # hold no memory until resumed (settings databases.checkpoints by default)
+        self.checkpointer = checkpointer or checkpoint_store()
+        
+        # Calls, tokens, time and replans each run may spend (settings agent_budget by default)
+        self.budget = budget or RunBudget.from_settings(settings.get("agent_budget"))
         
         # Step 3: set up agent
         self.app = self.initialize_agent()
@@ -77,8 +97,9 @@ class base_agent:
         self.display.thinking(f"Executing step: {task}")
         
         # Step 4 - Now Execute the first step
+        meter = self.budget.meter(state.get("usage"))
         try:
-            response = await self.doer.run(task_formatted)
+            response = await self._run_hat(self.doer, task_formatted, meter, self.do_escalation)
             
             # Check if this is a function call and extract info
             function_match = re.search(r"([\w_]+)\((.*?)\)", task)
@@ -107,20 +128,33 @@ class base_agent:
             
             # Step 5 - Now add the value to previous messages in state
             return {
-                "past_steps": past_steps + [(task, response.data.answer_short_points)]
+                "past_steps": [(task, response.data.answer_short_points)],
+                "usage": meter.spent()
             }
             
+        except BudgetExceeded as e:
+            # the replanner wraps the run up from here
+            error_msg = f"Not done: {str(e)}"
+            self.display.error(error_msg)
+            return {
+                "past_steps": [(task, error_msg)],
+                "usage": meter.spent()
+            }
         except UsageLimitExceeded as e:
             error_msg = f"Usage limit exceeded: I tried {self.doer._max_result_retries} times but could not get answer"
             self.display.error(error_msg)
+            self.reflections.append(f"Step failed: {task}. {error_msg}", run_id=state.get("run_id", ""))
             return {
-                "past_steps": past_steps + [(task, error_msg)]
+                "past_steps": [(task, error_msg)],
+                "usage": meter.spent()
             }
         except Exception as e:
             error_msg = f"Error executing {task}: {str(e)}"
             self.display.error(error_msg)
+            self.reflections.append(f"Step failed: {error_msg}", run_id=state.get("run_id", ""))
             return {
-                "past_steps": past_steps + [(task, error_msg)]
+                "past_steps": [(task, error_msg)],
+                "usage": meter.spent()
             }
 
     async def plan_step(self, state: PlanExecute):
@@ -130,8 +164,19 @@ class base_agent:
         # Log to thinking display
         self.display.thinking(f"Planning steps for input: {state['input']}")
         
-        # Step 1 - generate the plan
-        plan = await self.planner.run(state["input"])
+        # Step 1 - generate the plan, with what earlier runs on similar objectives learned
+        run_id = state.get("run_id") or uuid.uuid4().hex
+        planner_input = state["input"]
+        lessons = self.reflections.search(state["input"], limit=3)
+        if lessons:
+            self.display.thinking(f"Recalled {len(lessons)} lessons from earlier runs")
+            planner_input += "\n\nLessons from earlier runs:\n" + "\n".join(
+                f"- {lesson['text'][:300]}" for lesson in lessons)
+        meter = self.budget.meter(state.get("usage"))
+        try:
+            plan = await self._run_hat(self.planner, planner_input, meter, self.think_escalation)
+        except BudgetExceeded as e:
+            return dict(self._wrap_up(dict(state, run_id=run_id), e.limit, meter), run_id=run_id)
         
         # Log the generated plan to thinking display
         self.display.thinking(f"Generated plan with {len(plan.data.steps)} steps")
@@ -140,9 +185,16 @@ class base_agent:
         self.display.update_steps([], plan.data.steps)
         
         # Step 2 - return the plan
-        return {"plan": plan.data.steps}
+        return {"plan": plan.data.steps, "run_id": run_id, "usage": meter.spent()}
 
     async def replan_step(self, state: PlanExecute):
+        # Out of budget: answer with what the steps found, without another model call
+        meter = self.budget.meter(state.get("usage"))
+        limit = meter.exceeded()
+        if limit:
+            return self._wrap_up(state, limit, meter)
+        meter.replans = 1
+        
         # Log to thinking display
         self.display.thinking("Replanning based on executed steps...")
         
@@ -157,7 +209,7 @@ class base_agent:
         {state["past_steps"]}"""
         
         try:
-            output = await self.replanner.run(replan_input)
+            output = await self._run_hat(self.replanner, replan_input, meter, self.think_escalation)
             
             # Log the replan result to thinking display
             self.display.thinking(f"Replanning complete")
@@ -165,26 +217,91 @@ class base_agent:
             # Step 2 - check if the response is needed from the customer
             if isinstance(output.data.action, Response):
                 self.display.thinking(f"Final response determined")
-                return {"response": output.data.action}
+                self.reflections.append(
+                    f"Objective: {state['input']}\nSteps: {[step for step, _ in state['past_steps']]}\n"
+                    f"Answer: {output.data.action.response}",
+                    run_id=state.get("run_id", ""), kind="outcome")
+                return self._finish(state, output.data.action, meter)
+            elif isinstance(output.data.action, AskUser):
+                question = output.data.action.question
+                self.display.thinking(f"Need input from the user: {question}")
+                try:
+                    phrased = await self._run_hat(self.interactor, question, meter)
+                    question = phrased.data.strip() or question
+                except Exception as e:
+                    self.display.error(f"Could not phrase the question: {str(e)}")
+                return {"question": question, "usage": meter.spent()}
             else:
                 new_plan = output.data.action.steps
                 self.display.thinking(f"New plan with {len(new_plan)} steps")
                 self.display.update_steps(state.get("past_steps", []), new_plan)
-                return {"plan": new_plan}
+                return {"plan": new_plan, "usage": meter.spent()}
                 
+        except BudgetExceeded as e:
+            return self._wrap_up(state, e.limit, meter)
         except Exception as e:
             error_msg = f"Error in replanning: {str(e)}"
             self.display.error(error_msg)
-            return {"plan": state["plan"]}
+            return {"plan": state["plan"], "usage": meter.spent()}
+    
+    async def _run_hat(self, hat, prompt: str, meter: BudgetMeter, escalate_to=()):
+        # every model call of a run goes through here, so the run's budget holds
+        # across all hats, and the time limit also covers the tools they call
+        meter.check()
+        try:
+            return await asyncio.wait_for(
+                run_hat(hat, prompt, self.display.partial, escalate_to,
+                        usage=meter.usage, usage_limits=meter.usage_limits()),
+                meter.seconds_left())
+        except asyncio.TimeoutError:
+            self.display.partial("")
+            raise BudgetExceeded("seconds", f"Run budget exhausted: {meter.report()}")
+        except UsageLimitExceeded as e:
+            limit = None if isinstance(e, BudgetExceeded) else meter.charge(e)
+            if limit is None:
+                raise
+            raise BudgetExceeded(limit, f"Run budget exhausted: {meter.report()}") from e
+    
+    def _wrap_up(self, state: PlanExecute, limit: str, meter: BudgetMeter):
+        # best-effort answer from the steps done so far; costs no model call
+        self.display.error(f"Run budget exhausted ({limit}), wrapping up with what I have")
+        findings = "\n".join(f"- {step}: {result}" for step, result in state.get("past_steps", []))
+        response = Response(response=(
+            f"I ran out of my {limit} budget before finishing, so this answer is incomplete. "
+            + (f"What I found so far:\n{findings}" if findings else "I could not get anything done yet.")))
+        self.reflections.append(
+            f"Objective: {state['input']}\nStopped after {len(state.get('past_steps', []))} steps: {limit} budget exhausted",
+            run_id=state.get("run_id", ""), kind="outcome")
+        return self._finish(state, response, meter, exhausted=limit)
+    
+    def _finish(self, state: PlanExecute, response: Response, meter: BudgetMeter, exhausted: Optional[str] = None):
+        spent = meter.spent()
+        used = add_usage(state.get("usage"), spent)
+        self.display.thinking(f"Run budget used: {self.budget.report(used)}")
+        try:
+            metrics_store().record_run(run_id=state.get("run_id", ""), exhausted=exhausted, **used)
+        except Exception as e:
+            # metering must never break the run it measures
+            self.display.error(f"Error recording run metrics: {str(e)}")
+        return {"response": response, "usage": spent}
 
     async def interact_step(self, state: PlanExecute):
-        pass
+        # The run stops here and is checkpointed; resume() re-enters this node
+        # with the user's reply as the value of interrupt()
+        question = state["question"]
+        self.display.thinking(f"Waiting for the user: {question}")
+        reply = interrupt({"question": question, "run_id": state.get("run_id", "")})
+        self.display.input(reply)
+        return {"past_steps": [(f"Asked the user: {question}", reply)], "question": ""}
 
     def should_end(self, state: PlanExecute):
         self.display.thinking("Checking if execution should end")
         if "response" in state and state["response"]:
             self.display.thinking("Execution complete with final response")
             return END
+        elif state.get("question"):
+            self.display.thinking("Pausing until the user answers")
+            return "ask user"
         else:
             self.display.thinking("Continuing execution with next step")
             return "do step"
@@ -198,33 +315,67 @@ class base_agent:
         workflow.add_node("first plan", self.plan_step)
         workflow.add_node("do step", self.execute_step)
         workflow.add_node("adjust plan", self.replan_step)
+        workflow.add_node("ask user", self.interact_step)
         
         # Step 3 - add edges
         workflow.add_edge(START, "first plan")
-        workflow.add_edge("first plan", "do step")
+        workflow.add_conditional_edges(
+            "first plan",
+            self.should_end,
+            ["do step", END]
+        )
         workflow.add_edge("do step", "adjust plan")
+        workflow.add_edge("ask user", "adjust plan")
         workflow.add_conditional_edges(
             "adjust plan",
             self.should_end,
-            ["do step", END]
+            ["do step", "ask user", END]
         )
         
         # Log graph construction to thinking display
         self.display.thinking("Agent workflow graph initialized")
         
         # Step 4 - compile and return
-        app = workflow.compile()
+        app = workflow.compile(checkpointer=self.checkpointer)
         return app
     
+    async def run(self, input_text: str, run_id: Optional[str] = None) -> Dict:
+        """
+        Start a run. It either finishes or pauses on a question for the user;
+        a paused run is resumed with resume(run_id, reply), from any agent
+        sharing the checkpointer.
+
+        Returns:
+            {"run_id", "status": "done", "response", "usage"} or {"run_id", "status": "waiting", "question", "usage"},
+            usage being the calls, tokens, seconds and replans the run has spent
+        """
+        run_id = run_id or uuid.uuid4().hex
+        return await self._drive({"input": input_text, "run_id": run_id}, run_id)
+    
+    async def resume(self, run_id: str, reply: str) -> Dict:
+        """Answer the question a paused run is waiting on and carry on; returns like run()"""
+        return await self._drive(Command(resume=reply), run_id)
+    
+    def waiting_runs(self) -> List[str]:
+        """Ids of the runs paused on a question for the user"""
+        return self.checkpointer.interrupted()
+    
+    async def _drive(self, graph_input, run_id: str) -> Dict:
+        config = {"configurable": {"thread_id": run_id}, "recursion_limit": 50}
+        state = await self.app.ainvoke(graph_input, config)
+        snapshot = await self.app.aget_state(config)
+        interrupts = [item for task in snapshot.tasks for item in task.interrupts]
+        if interrupts:
+            return {"run_id": run_id, "status": "waiting", "question": interrupts[0].value["question"],
+                    "usage": snapshot.values.get("usage")}
+        response = state.get("response")
+        return {"run_id": run_id, "status": "done",
+                "response": response.response if isinstance(response, Response) else response,
+                "usage": state.get("usage")}
+    
     def _get_tool_methods(self):
-        tool_funcs = []
-        for _, method in inspect.getmembers(self, predicate=inspect.ismethod):
-            if hasattr(method, "_is_tool"):
-                if method._use_context:
-                    tool_funcs.append(Tool(method))  # with RunContext
-                else:
-                    tool_funcs.append(Tool(method))  # no RunContext
-        return tool_funcs
+        # found when the class was defined; the Tool schemas are built once per class
+        return self.pydantic_ai_tools()
     
     @tool_for_doer
     def calculate(self, expression: str) -> str:
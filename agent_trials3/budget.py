@@ -0,0 +1,129 @@
+import time
+from typing import Dict, Optional
+
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.usage import Usage, UsageLimits
+
+
+# usage of a run, as kept in the graph state
+USAGE_KEYS = ("calls", "tokens", "seconds", "replans")
+
+
+def add_usage(used: Optional[Dict], spent: Optional[Dict]) -> Dict:
+    """Graph state reducer: each node returns what it spent and the run's usage adds up"""
+    used, spent = used or {}, spent or {}
+    return {key: used.get(key, 0) + spent.get(key, 0) for key in USAGE_KEYS}
+
+
+class BudgetExceeded(UsageLimitExceeded):
+    """A run used up one of the limits of its budget"""
+
+    def __init__(self, limit: str, message: str):
+        self.limit = limit
+        super().__init__(message)
+
+
+class RunBudget:
+    """
+    Limits of one plan-and-execute run: model calls and tokens over all its
+    hats, wall-clock seconds spent working (time paused waiting for the user
+    does not count) and replans. None means unlimited.
+    """
+
+    def __init__(self, max_calls: Optional[int] = None, max_tokens: Optional[int] = None,
+                 max_seconds: Optional[float] = None, max_replans: Optional[int] = None):
+        """
+        Args:
+            max_calls (int, optional): Model requests over all hats. Defaults to None.
+            max_tokens (int, optional): Input plus output tokens over all hats. Defaults to None.
+            max_seconds (float, optional): Wall-clock seconds in the graph's nodes. Defaults to None.
+            max_replans (int, optional): Times the replanner runs. Defaults to None.
+        """
+        self.limits = {"calls": max_calls, "tokens": max_tokens, "seconds": max_seconds, "replans": max_replans}
+
+    @classmethod
+    def from_settings(cls, section: Optional[Dict]) -> "RunBudget":
+        """The budget in a settings agent_budget section; unlimited if there is none"""
+        section = section or {}
+        return cls(max_calls=section.get("max_calls"), max_tokens=section.get("max_tokens"),
+                   max_seconds=section.get("max_seconds"), max_replans=section.get("max_replans"))
+
+    def exceeded(self, used: Optional[Dict]) -> Optional[str]:
+        """The first limit `used` has reached, or None"""
+        used = add_usage(used, None)
+        for key in USAGE_KEYS:
+            if self.limits[key] is not None and used[key] >= self.limits[key]:
+                return key
+        return None
+
+    def meter(self, used: Optional[Dict]) -> "BudgetMeter":
+        return BudgetMeter(self, add_usage(used, None))
+
+    def report(self, used: Optional[Dict]) -> str:
+        """e.g. "calls 12/40, tokens 8210/200000, seconds 41/300, replans 3/8\""""
+        used = add_usage(used, None)
+        return ", ".join(
+            f"{key} {used[key]:.0f}" + ("" if self.limits[key] is None else f"/{self.limits[key]}")
+            for key in USAGE_KEYS)
+
+
+class BudgetMeter:
+    """
+    What one graph step spends of its run's budget. The hats of the step share
+    `usage`, so pydantic-ai stops them at the calls and tokens left, and
+    `seconds_left` bounds them (and the tools they call) in time.
+    """
+
+    def __init__(self, budget: RunBudget, used: Dict):
+        self.budget = budget
+        self.used = used
+        self.usage = Usage()
+        self.replans = 0
+        self.started = time.monotonic()
+
+    def spent(self) -> Dict:
+        return {"calls": self.usage.requests, "tokens": self.usage.total_tokens or 0,
+                "seconds": time.monotonic() - self.started, "replans": self.replans}
+
+    def exceeded(self) -> Optional[str]:
+        return self.budget.exceeded(add_usage(self.used, self.spent()))
+
+    def check(self) -> None:
+        """Raise BudgetExceeded if the run has nothing left"""
+        limit = self.exceeded()
+        if limit:
+            raise BudgetExceeded(limit, f"Run budget exhausted: {self.report()}")
+
+    def charge(self, error: UsageLimitExceeded) -> Optional[str]:
+        """
+        The limit of the budget a pydantic-ai usage error came from, or None if
+        it was pydantic-ai's own request limit. Worked out from the limits this
+        meter set: pydantic-ai stops before a request once the calls left are
+        used, and otherwise stopped at the tokens left. A streamed response cut
+        off at the token limit never had its tokens counted, so they are
+        charged here.
+        """
+        limits = self.usage_limits()
+        if self.usage.requests >= limits.request_limit:
+            return "calls" if self.budget.limits["calls"] is not None else None
+        if limits.total_tokens_limit is None:
+            return None
+        self.usage.total_tokens = max(self.usage.total_tokens or 0, limits.total_tokens_limit)
+        return "tokens"
+
+    def usage_limits(self) -> UsageLimits:
+        calls, tokens = self.budget.limits["calls"], self.budget.limits["tokens"]
+        return UsageLimits(
+            # without a call limit a hat keeps pydantic-ai's own per-run request limit
+            request_limit=UsageLimits().request_limit if calls is None else max(0, calls - self.used["calls"]),
+            total_tokens_limit=None if tokens is None else max(0, tokens - self.used["tokens"]),
+        )
+
+    def seconds_left(self) -> Optional[float]:
+        seconds = self.budget.limits["seconds"]
+        if seconds is None:
+            return None
+        return max(0.0, seconds - self.used["seconds"] - (time.monotonic() - self.started))
+
+    def report(self) -> str:
+        return self.budget.report(add_usage(self.used, self.spent()))
@@ -23,6 +23,7 @@ class AgentDisplay:
         self.thinking_lines = []
         self.function_calls = []
         self.errors = []
+        self.partial_text = ""
         
         # UI thread control
         self.running = False
@@ -107,8 +108,12 @@ class AgentDisplay:
                         print(f"{self.PURPLE}Result: {result}{self.END}")
                     elif cmd == 'error':
                         self._print_section("ERROR", self.RED, args)
+                    elif cmd == 'partial':
+                        self._print_partial(args)
                     
                     self.ui_queue.task_done()
+                    # Drain the queue before sleeping so streamed text keeps up
+                    continue
                     
                 # Sleep to avoid CPU hogging
                 time.sleep(0.1)
@@ -116,6 +121,24 @@ class AgentDisplay:
                 print(f"Error in console output loop: {e}")
                 time.sleep(1)  # Longer sleep on error
     
+    def _print_partial(self, text):
+        """Print the new part of the streamed model output"""
+        if not text:
+            # the response is complete
+            if self.partial_text:
+                print(self.END)
+            self.partial_text = ""
+            return
+        if not text.startswith(self.partial_text):
+            # a new response (e.g. a retry) started
+            print(self.END)
+            self.partial_text = ""
+        if not self.partial_text:
+            print(f"\n{self.YELLOW}{self.BOLD}===== MODEL OUTPUT ====={self.END}")
+        sys.stdout.write(f"{self.YELLOW}{text[len(self.partial_text):]}{self.END}")
+        sys.stdout.flush()
+        self.partial_text = text
+    
     def _print_section(self, title, color, content):
         """Print a formatted section to the console"""
         print(f"\n{color}{self.BOLD}===== {title} ====={self.END}")
@@ -154,6 +177,10 @@ class AgentDisplay:
         """Add an error to the errors display"""
         self.errors.append(text)
         self.ui_queue.put(('error', text))
+    
+    def partial(self, text):
+        """Show the model output streamed so far; an empty string ends it"""
+        self.ui_queue.put(('partial', text))
 
 
 # To use this file, you would need to:
@@ -93,6 +93,7 @@ class AgentDisplay:
         self.thinking_lines = []
         self.function_calls = []
         self.errors = []
+        self.partial_text = ""
         
         # Main thread control
         self.running = False
@@ -177,7 +178,10 @@ class AgentDisplay:
                     self._update_steps_display()
                 elif cmd == 'thinking':
                     self.thinking_lines.append(args)
-                    self.screen_content[2] = "\n\n".join(self.thinking_lines)
+                    self._update_thinking_display()
+                elif cmd == 'partial':
+                    self.partial_text = args
+                    self._update_thinking_display()
                 elif cmd == 'function':
                     name, params, result = args
                     self._add_function_call(name, params, result)
@@ -188,6 +192,11 @@ class AgentDisplay:
         except Exception as e:
             print(f"Error processing UI queue: {e}")
     
+    def _update_thinking_display(self):
+        """Thinking lines followed by the model output streamed so far"""
+        lines = self.thinking_lines + ([f"> {self.partial_text}"] if self.partial_text else [])
+        self.screen_content[2] = "\n\n".join(lines)
+    
     def _update_steps_display(self):
         """Update the steps display with current executed and planned steps"""
         steps_text = "Executed Steps:\n"
@@ -316,6 +325,10 @@ class AgentDisplay:
     def error(self, text):
         """Add an error to the errors display"""
         self.ui_queue.put(('error', text))
+    
+    def partial(self, text):
+        """Show the model output streamed so far; an empty string ends it"""
+        self.ui_queue.put(('partial', text))
 
 # Example usage
 if __name__ == "__main__":
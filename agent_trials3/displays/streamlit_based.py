@@ -56,6 +56,17 @@ class StreamlitAgentDisplay:
         st.session_state.plan = plan
         st.experimental_rerun()
         
+    def partial(self, message: str):
+        """Show the model output streamed so far; an empty string ends it"""
+        # updated in place: a rerun per token would restart the script
+        if not message:
+            if 'partial_placeholder' in st.session_state:
+                st.session_state.pop('partial_placeholder').empty()
+            return
+        if 'partial_placeholder' not in st.session_state:
+            st.session_state.partial_placeholder = st.empty()
+        st.session_state.partial_placeholder.markdown(f"> {message}")
+        
     def set_final_response(self, response: str):
         """Set the final response"""
         st.session_state.final_response = response
@@ -139,17 +150,13 @@ class StreamlitAgentUI:
                         st.session_state.execution_started = True
                         
                         # Run the agent with the request
-                        try:
-                            st.session_state.execution_in_progress = True
-                            asyncio.run(self.agent.app.ainvoke({"input": user_input}))
-                            st.session_state.execution_in_progress = False
-                            st.session_state.execution_complete = True
-                        except Exception as e:
-                            st.session_state.execution_in_progress = False
-                            st.session_state.execution_error = str(e)
+                        asyncio.run(execute_agent_request(self.agent, user_input))
                     else:
                         st.warning("Please enter a request")
             
+            # A run paused on a question waits here for the answer
+            ask_for_reply(self.agent)
+            
             # Display the agent state
             if 'execution_started' in st.session_state and st.session_state.execution_started:
                 self.display_agent_state()
@@ -327,6 +334,9 @@ def main():
                 else:
                     st.warning("Please enter a request")
         
+        # A run paused on a question waits here for the answer
+        ask_for_reply(st.session_state.agent)
+        
         # Display the agent state
         if 'execution_started' in st.session_state and st.session_state.execution_started:
             display_agent_state()
@@ -338,14 +348,45 @@ async def execute_agent_request(agent, user_input):
         st.session_state.execution_in_progress = True
         
         # This will trigger the workflow
-        await agent.app.ainvoke({"input": user_input})
-        
+        _record_run(await agent.run(user_input))
+    except Exception as e:
         st.session_state.execution_in_progress = False
-        st.session_state.execution_complete = True
+        st.session_state.execution_error = str(e)
+
+# Function to resume a run paused on a question for the user
+async def resume_agent_request(agent, run_id, reply):
+    try:
+        st.session_state.execution_in_progress = True
+        _record_run(await agent.resume(run_id, reply))
     except Exception as e:
         st.session_state.execution_in_progress = False
         st.session_state.execution_error = str(e)
 
+def _record_run(result):
+    # a waiting run lives in the agent's checkpointer; only its id is kept in the session
+    st.session_state.execution_in_progress = False
+    if result["status"] == "waiting":
+        st.session_state.waiting_run = result
+        st.session_state.execution_complete = False
+    else:
+        st.session_state.waiting_run = None
+        st.session_state.final_response = result["response"]
+        st.session_state.execution_complete = True
+
+# Function to ask the user the question a paused run is waiting on
+def ask_for_reply(agent):
+    waiting = st.session_state.get("waiting_run")
+    if not waiting:
+        return
+    st.info(f"🙋 {waiting['question']}")
+    reply = st.text_input("Your answer", key=f"reply_{waiting['run_id']}")
+    if st.button("Send answer", type="primary"):
+        if reply.strip():
+            asyncio.run(resume_agent_request(agent, waiting["run_id"], reply))
+            st.rerun()
+        else:
+            st.warning("Please enter an answer")
+
 # Function to display the agent state
 def display_agent_state():
     # Create tabs for different views
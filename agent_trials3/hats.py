@@ -1,10 +1,16 @@
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
 from pydantic_ai import Agent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.messages import PartDeltaEvent, PartStartEvent, TextPart, TextPartDelta, ToolCallPart, ToolCallPartDelta
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.models.groq import GroqModel
-from typing import Union, List
+from pydantic_ai.usage import Usage, UsageLimits
+from typing import Callable, Optional, Sequence, Union, List
+from framework.core.cascade import cascade_counts
+from framework.core.metrics import current_stage
+from agent_trials3.structured import ConstrainedModel, structured_counts
 
 
 class Plan(BaseModel):
@@ -20,12 +26,19 @@ class Response(BaseModel):
     response: str= Field (description="the final answer to the user's query.")
 
 
+class AskUser(BaseModel):
+    """Question to the user."""
+
+    question: str = Field(description="what you need to know from the user to go on")
+
+
 class Act(BaseModel):
     """Action to perform."""
 
-    action: Union[Response, Plan] = Field(
+    action: Union[Response, Plan, AskUser] = Field(
         description="Action to perform. If you want to respond to user, use Response. "
-        "If you need to further use tools to get the answer, use Plan."
+        "If you need to further use tools to get the answer, use Plan. "
+        "If only the user can give information you need, use AskUser."
     )
 
 
@@ -42,7 +55,8 @@ class Output(BaseModel):
 
 def doer_hat (model, tools)->Agent:
     doer =Agent(
-        model=model,
+        model=ConstrainedModel(model, hat="doer"),
+        name="doer",
         system_prompt=(
             "you are a helpful assistant. Be concise reply with one sentence. If you can't find answer even after retries just say you can't find the answer."
         ),
@@ -59,7 +73,8 @@ def planner_hat(model, tools)->Agent:
     
     
     planner = Agent(
-        model=model,
+        model=ConstrainedModel(model, hat="planner"),
+        name="planner",
         system_prompt=(
             f"""For the given objective, come up with a simple step by step execution plan. \
 This plan should involve individual tasks including the tool name, that if executed correctly will yield the correct answer. Do not add any superfluous steps. \
@@ -82,7 +97,8 @@ def replanner_hat(model,tools)->Agent:
         ])
     
     replanner = Agent(
-        model=model,
+        model=ConstrainedModel(model, hat="replanner"),
+        name="replanner",
         system_prompt=(
             f"""For the given objective, come up with a simple step by step plan. \
 This plan should involve individual tasks, that if executed correctly will yield the correct answer. Do not add any superfluous steps. \
@@ -100,3 +116,88 @@ The result of the final step should be the final answer. Make sure that each ste
     
     return replanner
 
+
+def interactor_hat(model)->Agent:
+    interactor = Agent(
+        model=ConstrainedModel(model, hat="interactor"),
+        name="interactor",
+        system_prompt=(
+            "You speak to the user for an agent working on their request. Turn the agent's question into one short, "
+            "polite question the user can answer directly, mentioning what it is needed for. Reply with the question only."
+        ),
+        result_type=str,
+    )
+    
+    return interactor
+
+
+async def run_hat(hat: Agent, prompt: str, on_partial: Callable[[str], None], escalate_to: Sequence = (),
+                  usage: Optional[Usage] = None, usage_limits: Optional[UsageLimits] = None):
+    """
+    Run a hat like hat.run(prompt), passing the text (or result JSON) of each
+    model response to on_partial as it streams in.
+
+    Walks the agent graph node by node instead of using run_stream, so tool
+    calls and result_retries behave exactly as in hat.run.
+
+    If the hat's own model cannot produce a valid result within its
+    result_retries, the run is repeated on each model of escalate_to in turn
+    (cheapest first), so a local model can front a stronger remote one.
+
+    Runs and result retries are counted per hat and model in structured_stats.
+    Model calls and tokens add up in `usage`, shared with the escalations (and
+    with other hats of the same run), and are bounded by `usage_limits`.
+    """
+    models = [None, *escalate_to]
+    for position, model in enumerate(models):
+        try:
+            result = await _stream_hat(hat, prompt, on_partial, model, usage, usage_limits)
+        except UnexpectedModelBehavior:
+            on_partial("")
+            if position == len(models) - 1:
+                if escalate_to:
+                    cascade_counts.record("hats", current_stage(), "exhausted")
+                raise
+            continue
+        if escalate_to:
+            cascade_counts.record("hats", current_stage(), _model_name(model or hat.model))
+        return result
+
+
+def _model_name(model) -> str:
+    return model if isinstance(model, str) else getattr(model, "model_name", type(model).__name__)
+
+
+async def _stream_hat(hat: Agent, prompt: str, on_partial: Callable[[str], None], model=None,
+                      usage: Optional[Usage] = None, usage_limits: Optional[UsageLimits] = None):
+    if model is not None and not isinstance(model, ConstrainedModel):
+        model = ConstrainedModel(model, hat=hat.name)
+    async with hat.iter(prompt, model=model, usage=usage, usage_limits=usage_limits) as agent_run:
+        try:
+            async for node in agent_run:
+                if not Agent.is_model_request_node(node):
+                    continue
+                text = ""
+                async with node.stream(agent_run.ctx) as request_stream:
+                    async for event in request_stream:
+                        if isinstance(event, PartStartEvent):
+                            part = event.part
+                            if isinstance(part, TextPart):
+                                text += part.content
+                            elif isinstance(part, ToolCallPart) and isinstance(part.args, str):
+                                text += part.args
+                        elif isinstance(event, PartDeltaEvent):
+                            delta = event.delta
+                            if isinstance(delta, TextPartDelta):
+                                text += delta.content_delta
+                            elif isinstance(delta, ToolCallPartDelta) and isinstance(delta.args_delta, str):
+                                text += delta.args_delta
+                        else:
+                            continue
+                        on_partial(text)
+        finally:
+            model_name = _model_name(model or hat.model)
+            structured_counts.record(hat.name, model_name, "runs")
+            structured_counts.record(hat.name, model_name, "retries", agent_run.ctx.state.retries)
+    on_partial("")
+    return agent_run.result
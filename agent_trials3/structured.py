@@ -0,0 +1,370 @@
+import ast
+import copy
+import json
+import re
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse, ModelResponseStreamEvent, TextPart, ToolCallPart
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse, infer_model
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.tools import ToolDefinition
+from pydantic_ai.usage import Usage
+
+
+def _closed(text: str) -> str:
+    """Close the strings, objects and arrays a truncated JSON document left open"""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    text = text + '"' if in_string else text
+    return re.sub(r",\s*$", "", text) + "".join(reversed(stack))
+
+
+def _parse(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        # single quotes, True/False/None, trailing commas
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    text = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", text)))
+    return json.loads(_closed(text))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    The JSON value a model meant to write, or None if it cannot be recovered.
+
+    Handles the usual local-model slips: code fences or prose around the
+    JSON, Python literals and single quotes, trailing commas, and output
+    truncated before its closing brackets.
+    """
+    text = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)(?:```|$)", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = min((text.find(bracket) for bracket in "{[" if bracket in text), default=-1)
+    if start == -1:
+        return None
+    end = max(text.rfind("}"), text.rfind("]"))
+    candidates = [text[start:end + 1]] if end > start else []
+    candidates.append(text[start:])
+    for candidate in candidates:
+        try:
+            return _parse(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def fit_schema(value: Any, schema: Dict) -> Any:
+    """
+    Reshape a parsed value towards an object schema: unwrap an object nested
+    under one extra key ({"Plan": {"steps": ...}}), or wrap a bare value as
+    the schema's only property (["a", "b"] -> {"steps": ["a", "b"]}).
+    """
+    properties = schema.get("properties", {})
+    if not properties:
+        return value
+    if isinstance(value, dict):
+        if value and not set(value) & set(properties) and len(value) == 1:
+            inner = next(iter(value.values()))
+            if isinstance(inner, dict) and set(inner) & set(properties):
+                return inner
+        return value
+    required = schema.get("required", list(properties))
+    if len(required) == 1:
+        return {required[0]: value}
+    return value
+
+
+def _fits(value: Any, schema: Dict) -> bool:
+    return isinstance(value, dict) and all(name in value for name in schema.get("required", []))
+
+
+class StructuredStats:
+    """Per hat and model: runs, result retries, outputs repaired locally and natively constrained requests"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, hat: str, model: str, event: str, count: int = 1) -> None:
+        with self._lock:
+            self.counts[(hat or "-", model, event)] += count
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        with self._lock:
+            counts = dict(self.counts)
+        stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (hat, model, event), count in counts.items():
+            stats.setdefault(hat, {}).setdefault(model, {"runs": 0, "retries": 0, "repaired": 0, "constrained": 0})
+            stats[hat][model][event] += count
+        return stats
+
+
+structured_counts = StructuredStats()
+
+
+def structured_stats() -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Per hat and model: runs, result retries, repairs and constrained requests"""
+    return structured_counts.stats()
+
+
+class _ResponseFormatClient:
+    """
+    Stands in for an AsyncOpenAI client for one request, passing response_format
+    to chat.completions.create (OpenAIModel has no setting for it). Everything
+    else goes to the client it wraps, which is left untouched.
+    """
+
+    def __init__(self, client, response_format: Dict):
+        self._client = client
+        self._response_format = response_format
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, *args, **kwargs):
+        return await self._client.chat.completions.create(*args, response_format=self._response_format, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+class ConstrainedModel(Model):
+    """
+    Wraps a pydantic-ai model so structured results come out valid the first
+    time wherever the provider can guarantee it, and get repaired locally
+    where it cannot, before pydantic-ai spends a result retry on them.
+
+    Native constraints, by provider:
+        OpenAI: the result tool is sent with strict JSON schema.
+        Ollama and other OpenAI-compatible servers: when the hat has no
+            function tools, the result schema goes out as a json_schema
+            response_format (Ollama turns it into its `format` grammar) and
+            the JSON reply is read back as the result tool call. A server
+            that rejects response_format is remembered and asked plainly.
+        Anthropic: results already go through a forced tool call.
+
+    Otherwise, and on top: a result tool call whose arguments do not parse
+    or lack required fields, or a plain-text answer where a result was due,
+    is put through repair_json and fit_schema. Only if that fails too does
+    pydantic-ai see the bad output and retry.
+    """
+
+    def __init__(self, model: Union[Model, str], hat: str = "", native: bool = True, repair: bool = True):
+        """
+        Args:
+            model (Model | str): The model to wrap (a name is resolved on first use)
+            hat (str, optional): Hat name for structured_stats. Defaults to "".
+            native (bool, optional): Use provider-native constraints. Defaults to True.
+            repair (bool, optional): Repair malformed results locally. Defaults to True.
+        """
+        self._model = model
+        self.hat = hat
+        self.native = native
+        self.repair = repair
+        self.json_schema_rejected = False
+
+    @property
+    def wrapped(self) -> Model:
+        if not isinstance(self._model, Model):
+            self._model = infer_model(self._model)
+        return self._model
+
+    @property
+    def model_name(self) -> str:
+        return self.wrapped.model_name
+
+    @property
+    def system(self) -> str:
+        return self.wrapped.system
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.wrapped.base_url
+
+    def provider(self) -> str:
+        """"openai", "openai-compatible", "anthropic" or the model's own system name"""
+        system = self.wrapped.system
+        if system == "openai":
+            host = urlparse(self.wrapped.base_url or "").hostname or ""
+            return "openai" if host.endswith("api.openai.com") else "openai-compatible"
+        return system
+
+    # Request shaping
+
+    def customize_request_parameters(self, parameters: ModelRequestParameters) -> ModelRequestParameters:
+        if self.native and self.provider() == "openai":
+            parameters = replace(parameters, result_tools=[replace(tool, strict=True)
+                                                           for tool in parameters.result_tools])
+        return self.wrapped.customize_request_parameters(parameters)
+
+    def _json_schema_tool(self, parameters: ModelRequestParameters) -> Optional[ToolDefinition]:
+        """The result tool to answer through response_format, if this request can"""
+        if (not self.native or self.json_schema_rejected or self.provider() != "openai-compatible"
+                or parameters.function_tools or parameters.allow_text_result or len(parameters.result_tools) != 1):
+            return None
+        return parameters.result_tools[0]
+
+    def _json_mode(self, tool: ToolDefinition) -> Model:
+        """A copy of the wrapped model sending the result tool's schema as a json_schema response_format"""
+        model = copy.copy(self.wrapped)
+        model.client = _ResponseFormatClient(model.client, {
+            "type": "json_schema",
+            "json_schema": {"name": tool.name, "schema": tool.parameters_json_schema, "strict": True}})
+        return model
+
+    def _record_constrained(self, parameters: ModelRequestParameters, tool: Optional[ToolDefinition]) -> None:
+        if tool is not None or (self.native and parameters.result_tools and self.provider() in ("openai", "anthropic")):
+            structured_counts.record(self.hat, self.model_name, "constrained")
+
+    # Response repair
+
+    def fix(self, response: ModelResponse, parameters: ModelRequestParameters,
+            json_tool: Optional[ToolDefinition] = None) -> ModelResponse:
+        """Turn a JSON-mode reply into its result tool call, and repair malformed results"""
+        result_tools = {tool.name: tool for tool in parameters.result_tools}
+        if not result_tools:
+            return response
+        parts, repaired = [], False
+        for part in response.parts:
+            if isinstance(part, ToolCallPart) and part.tool_name in result_tools:
+                schema = result_tools[part.tool_name].parameters_json_schema
+                args, valid_json = part.args, True
+                if isinstance(args, str):
+                    try:
+                        args = json.loads(args)
+                    except ValueError:
+                        valid_json = False
+                        args = repair_json(args) if self.repair else args
+                fitted = fit_schema(args, schema) if self.repair and not _fits(args, schema) else args
+                if _fits(fitted, schema) and (not valid_json or fitted is not args):
+                    repaired = True
+                    part = replace(part, args=fitted)
+            parts.append(part)
+
+        has_result = any(isinstance(part, ToolCallPart) and part.tool_name in result_tools for part in parts)
+        texts = [part.content for part in parts if isinstance(part, TextPart)]
+        if not has_result and texts and (json_tool or (self.repair and not parameters.allow_text_result
+                                                       and len(result_tools) == 1)):
+            tool = json_tool or next(iter(result_tools.values()))
+            text = "".join(texts)
+            args = None
+            if json_tool:
+                try:
+                    args = json.loads(text)
+                except ValueError:
+                    pass
+            if args is None and self.repair:
+                args = fit_schema(repair_json(text), tool.parameters_json_schema)
+                repaired = args is not None and _fits(args, tool.parameters_json_schema)
+            if args is not None:
+                parts = [part for part in parts if not isinstance(part, TextPart)] + [ToolCallPart(tool.name, args)]
+        if repaired:
+            structured_counts.record(self.hat, self.model_name, "repaired")
+        return replace(response, parts=parts)
+
+    # Model API
+
+    async def request(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                      parameters: ModelRequestParameters) -> Tuple[ModelResponse, Usage]:
+        tool = self._json_schema_tool(parameters)
+        if tool is None:
+            response, usage = await self.wrapped.request(messages, model_settings, parameters)
+            self._record_constrained(parameters, tool)
+            return self.fix(response, parameters), usage
+        try:
+            response, usage = await self._json_mode(tool).request(messages, model_settings, _as_text(parameters))
+        except ModelHTTPError as e:
+            if e.status_code != 400:
+                raise
+            self.json_schema_rejected = True
+            response = None
+        if response is None:
+            return await self.request(messages, model_settings, parameters)
+        self._record_constrained(parameters, tool)
+        return self.fix(response, parameters, json_tool=tool), usage
+
+    @asynccontextmanager
+    async def request_stream(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                             parameters: ModelRequestParameters) -> AsyncIterator[StreamedResponse]:
+        # the agent graph does not customize parameters for streamed requests
+        parameters = self.customize_request_parameters(parameters)
+        tool = self._json_schema_tool(parameters)
+        if tool:
+            stream = self._json_mode(tool).request_stream(messages, model_settings, _as_text(parameters))
+        else:
+            stream = self.wrapped.request_stream(messages, model_settings, parameters)
+        try:
+            response = await stream.__aenter__()
+        except ModelHTTPError as e:
+            if tool is None or e.status_code != 400:
+                raise
+            self.json_schema_rejected = True
+            tool = None
+            stream = self.wrapped.request_stream(messages, model_settings, parameters)
+            response = await stream.__aenter__()
+        self._record_constrained(parameters, tool)
+        try:
+            yield _FixedStream(response, lambda streamed: self.fix(streamed, parameters, json_tool=tool))
+        except BaseException as e:
+            if not await stream.__aexit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            await stream.__aexit__(None, None, None)
+
+
+def _as_text(parameters: ModelRequestParameters) -> ModelRequestParameters:
+    """Parameters asking for a plain (JSON-constrained) reply instead of a result tool call"""
+    return ModelRequestParameters(function_tools=[], allow_text_result=True, result_tools=[])
+
+
+class _FixedStream(StreamedResponse):
+    """Passes a streamed response through, fixing the final ModelResponse"""
+
+    def __init__(self, inner: StreamedResponse, fixer: Callable[[ModelResponse], ModelResponse]):
+        super().__init__()
+        self.inner = inner
+        self.fixer = fixer
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        async for event in self.inner:
+            yield event
+
+    def get(self) -> ModelResponse:
+        return self.fixer(self.inner.get())
+
+    def usage(self) -> Usage:
+        return self.inner.usage()
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.inner.timestamp
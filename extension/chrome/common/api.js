@@ -39,6 +39,86 @@ window.LPFJS_API = (function() {
     }
   };
 
+  // Read a resource from the Flask backend
+  const getFromFlask = async function(endpoint) {
+    const { apiUrl } = await new Promise((resolve) => {
+      chrome.storage.sync.get(['apiUrl'], resolve);
+    });
+    
+    if (!apiUrl) {
+      throw new Error('API URL not configured');
+    }
+    
+    const url = apiUrl.endsWith('/') 
+      ? apiUrl + endpoint.replace(/^\//, '')
+      : apiUrl + endpoint;
+    
+    const response = await fetch(url, { method: 'GET' });
+    if (!response.ok) {
+      throw new Error(`Server responded with status: ${response.status}`);
+    }
+    return await response.json();
+  };
+
+  // POST to the backend and hand each streamed NDJSON line to onItem as it arrives
+  const streamFromFlask = async function(endpoint, data, onItem) {
+    const { apiUrl } = await new Promise((resolve) => {
+      chrome.storage.sync.get(['apiUrl'], resolve);
+    });
+    
+    if (!apiUrl) {
+      throw new Error('API URL not configured');
+    }
+    
+    const url = apiUrl.endsWith('/') 
+      ? apiUrl + endpoint.replace(/^\//, '')
+      : apiUrl + endpoint;
+    
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(data)
+    });
+    
+    if (!response.ok) {
+      throw new Error(`Server responded with status: ${response.status}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.filter((line) => line.trim()).forEach((line) => onItem(JSON.parse(line)));
+    }
+    if (buffer.trim()) {
+      onItem(JSON.parse(buffer));
+    }
+  };
+
+  // Submit a long-running job (e.g. cover letter) and poll until it finishes.
+  // The backend answers the POST with a job id straight away, so the wait
+  // never hits the browser's request timeout.
+  const runJob = async function(endpoint, data, pollIntervalMs = 1000) {
+    let job = await sendToFlask(endpoint, data);
+    
+    while (job.status === 'pending' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+      job = await getFromFlask(job.statusUrl || `/api/jobs/${job.jobId}`);
+    }
+    
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Job failed');
+    }
+    return job.result;
+  };
+
   // Function to check if the API is reachable
   const checkApiConnection = async function() {
     try {
@@ -84,6 +164,9 @@ window.LPFJS_API = (function() {
   // Return public functions
   return {
     sendToFlask: sendToFlask,
+    getFromFlask: getFromFlask,
+    streamFromFlask: streamFromFlask,
+    runJob: runJob,
     checkApiConnection: checkApiConnection
   };
 })();
\ No newline at end of file
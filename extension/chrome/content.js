@@ -4,6 +4,7 @@
     const PAGE_TYPES = {
       PROFILE: 'profile',
       JOB: 'job',
+      SEARCH: 'search',
       OTHER: 'other'
     };
   
@@ -15,6 +16,8 @@
         return PAGE_TYPES.PROFILE;
       } else if (url.includes('linkedin.com/jobs/view/')) {
         return PAGE_TYPES.JOB;
+      } else if (url.includes('linkedin.com/jobs/search') || url.includes('linkedin.com/jobs/collections')) {
+        return PAGE_TYPES.SEARCH;
       } else {
         return PAGE_TYPES.OTHER;
       }
@@ -42,6 +45,9 @@
         case PAGE_TYPES.JOB:
           LPFJS_Job.initJobPage(sidebar);
           break;
+        case PAGE_TYPES.SEARCH:
+          LPFJS_Search.initSearchPage(sidebar);
+          break;
         default:
           // Add default content for other pages
           const content = sidebar.querySelector('.lpfjs-content');
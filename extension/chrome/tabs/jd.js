@@ -151,7 +151,7 @@ try {
       };
       
       // Send to Flask backend
-      const result = await LPFJS_API.sendToFlask('/api/generate-cover-letter', jobData);
+      const result = await LPFJS_API.runJob('/api/generate-cover-letter', jobData);
       
       if (result && result.coverLetter) {
         // Create a temporary textarea to copy the text
@@ -142,7 +142,7 @@ window.LPFJS_Profile = (function() {
             };
             
             // Send to Flask backend
-            const result = await LPFJS_API.sendToFlask('/api/generate-followup', profileData);
+            const result = await LPFJS_API.runJob('/api/generate-followup', profileData);
             
             if (result && result.message) {
               // Create a temporary textarea to copy the text
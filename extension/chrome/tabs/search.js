@@ -0,0 +1,132 @@
+// Create a namespace for Job search page functions
+window.LPFJS_Search = (function() {
+    // Collect the job cards currently rendered in the results list
+    const collectJobCards = function() {
+      const cards = [];
+      const viewportHeight = window.innerHeight || document.documentElement.clientHeight;
+
+      document.querySelectorAll('li[data-occludable-job-id], .job-card-container').forEach((element) => {
+        const id = element.getAttribute('data-occludable-job-id') || element.getAttribute('data-job-id');
+        if (!id || cards.some((card) => card.id === id)) {
+          return;
+        }
+
+        const titleElement = element.querySelector('.job-card-list__title, .job-card-container__link');
+        const companyElement = element.querySelector('.artdeco-entity-lockup__subtitle, .job-card-container__primary-description');
+        const locationElement = element.querySelector('.job-card-container__metadata-item, .artdeco-entity-lockup__caption');
+        const rect = element.getBoundingClientRect();
+
+        cards.push({
+          id: id,
+          url: `https://www.linkedin.com/jobs/view/${id}/`,
+          title: titleElement ? titleElement.textContent.trim() : '',
+          company: companyElement ? companyElement.textContent.trim() : '',
+          location: locationElement ? locationElement.textContent.trim() : '',
+          description: element.innerText.trim().slice(0, 1000),
+          inViewport: rect.bottom > 0 && rect.top < viewportHeight
+        });
+      });
+
+      return cards;
+    };
+
+    // Show (or update) the score badge on a job card
+    const showBadge = function(result) {
+      const element = document.querySelector(`li[data-occludable-job-id="${result.id}"], [data-job-id="${result.id}"]`);
+      if (!element) {
+        return;
+      }
+
+      let badge = element.querySelector('.lpfjs-score-badge');
+      if (!badge) {
+        badge = document.createElement('span');
+        badge.className = 'lpfjs-score-badge';
+        badge.style.display = 'inline-block';
+        badge.style.margin = '4px 8px';
+        badge.style.padding = '2px 6px';
+        badge.style.borderRadius = '10px';
+        badge.style.fontSize = '12px';
+        badge.style.color = '#fff';
+        element.prepend(badge);
+      }
+
+      badge.textContent = result.final ? `${result.score}%` : `~${result.score}%`;
+      badge.title = result.reason || 'Keyword match, detailed score pending';
+      badge.style.background = result.score >= 70 ? '#057642' : result.score >= 40 ? '#915907' : '#666';
+    };
+
+    // Initialize job search page functionality
+    const initSearchPage = function(sidebar) {
+      console.log('Initializing job search page functionality');
+
+      // Get the content container from the sidebar
+      const contentContainer = sidebar.querySelector('.lpfjs-content');
+
+      // Create job match section
+      const searchSection = LPFJS_UI.createSection('Job Match Scores');
+
+      // Add message about functionality
+      const message = LPFJS_UI.createMessage('Score the jobs on this page against your CV');
+      searchSection.appendChild(message);
+
+      // Ranked results
+      const resultsList = document.createElement('ol');
+      resultsList.style.paddingLeft = '20px';
+      resultsList.style.fontSize = '13px';
+
+      // Create score jobs button
+      const scoreButton = LPFJS_UI.createButton('Score Jobs on This Page', async () => {
+        try {
+          const cards = collectJobCards();
+
+          if (cards.length === 0) {
+            LPFJS_UI.showNotification('No job cards found on this page', 'error');
+            return;
+          }
+
+          // Show scoring in progress
+          LPFJS_UI.showNotification(`Scoring ${cards.length} jobs...`, 'info');
+
+          const scores = {};
+          const titles = {};
+          cards.forEach((card) => { titles[card.id] = `${card.title} - ${card.company}`; });
+
+          // Results stream in as they are ready; keep the list sorted by score
+          await LPFJS_API.streamFromFlask('/api/score-jobs', { cards: cards }, (result) => {
+            scores[result.id] = result;
+            showBadge(result);
+
+            resultsList.innerHTML = '';
+            Object.values(scores)
+              .sort((a, b) => b.score - a.score)
+              .forEach((item) => {
+                const entry = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = item.url;
+                link.textContent = `${item.final ? '' : '~'}${item.score}% ${titles[item.id] || item.id}`;
+                link.title = item.reason || '';
+                entry.appendChild(link);
+                resultsList.appendChild(entry);
+              });
+          });
+
+          // Show success message
+          LPFJS_UI.showNotification('Jobs scored!', 'success');
+        } catch (error) {
+          console.error('Error scoring jobs:', error);
+          LPFJS_UI.showNotification('Error scoring jobs: ' + error.message, 'error');
+        }
+      });
+
+      searchSection.appendChild(scoreButton);
+      searchSection.appendChild(resultsList);
+
+      // Add the section to the content container
+      contentContainer.appendChild(searchSection);
+    };
+
+    // Public API
+    return {
+      initSearchPage: initSearchPage
+    };
+  })();
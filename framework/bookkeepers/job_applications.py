@@ -1,9 +1,44 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from urllib.parse import parse_qs, urlsplit
 from notion_client import Client
 from framework.connectors.notion.connector import NotionConnection
 
 
+_JOB_ID_RE = re.compile(r"/jobs/view/(?:[^/?#]*-)?(\d+)")
+
+
+def job_key(url: str) -> str:
+    """
+    Idempotency key of a job posting, derived from its URL.
+
+    LinkedIn serves the same posting under many URLs (tracking parameters,
+    slugs, search pages with currentJobId), so the numeric job id is used
+    when there is one and the bare URL otherwise.
+
+    Args:
+        url (str): URL of the job posting
+
+    Returns:
+        str: Normalised key, e.g. "linkedin:4012345678"
+    """
+    parts = urlsplit(url.strip())
+    match = _JOB_ID_RE.search(parts.path)
+    if match:
+        return f"linkedin:{match.group(1)}"
+    current_job = parse_qs(parts.query).get("currentJobId")
+    if current_job and current_job[0].isdigit():
+        return f"linkedin:{current_job[0]}"
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
 class JobApplicationManager:
     """
     A class to manage job applications in a Notion database.
@@ -27,7 +62,8 @@ class JobApplicationManager:
     # Referral options
     REFERRAL_OPTIONS = ["Yes", "No"]
     
-    def __init__(self, notion_connection: NotionConnection, database_id: str):
+    def __init__(self, notion_connection: NotionConnection, database_id: str,
+                 ledger_path: Optional[str] = None):
         """
         Initialize the JobApplicationManager with a NotionConnection instance
         and the ID of the job applications database.
@@ -35,9 +71,28 @@ class JobApplicationManager:
         Args:
             notion_connection (NotionConnection): An initialized NotionConnection
             database_id (str): The ID of the job applications database in Notion
+            ledger_path (str, optional): SQLite file recording completed writes, so
+                retried saves survive restarts. Defaults to None (in-memory only).
         """
         self.notion = notion_connection
         self.database_id = database_id
+        
+        # Completed writes by job key; concurrent saves of one job share a future
+        self._ledger_lock = threading.RLock()
+        self._in_flight: Dict[str, Future] = {}
+        if ledger_path and os.path.dirname(ledger_path):
+            os.makedirs(os.path.dirname(ledger_path), exist_ok=True)
+        self.ledger = sqlite3.connect(ledger_path or ":memory:", check_same_thread=False)
+        self.ledger.execute("PRAGMA journal_mode=WAL")
+        self.ledger.execute("""
+            CREATE TABLE IF NOT EXISTS saved_jobs (
+                job_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                page TEXT,
+                updated_at REAL NOT NULL
+            )""")
+        self.ledger.commit()
     
     def add_application(self, company: str, role: str, url: str, 
                         status: str = "Applied", confidence: str = "Low", 
@@ -46,6 +101,10 @@ class JobApplicationManager:
         """
         Add a new job application to the database.
         
+        Saving is idempotent per job URL (see job_key): a job that was already
+        saved returns the stored page without calling Notion, and concurrent
+        saves of the same job are coalesced into a single write.
+        
         Args:
             company (str): Company name
             role (str): Job title/role
@@ -76,6 +135,43 @@ class JobApplicationManager:
         if referral not in self.REFERRAL_OPTIONS:
             raise ValueError(f"Referral must be one of: {', '.join(self.REFERRAL_OPTIONS)}")
         
+        key = job_key(url)
+        with self._ledger_lock:
+            saved = self._saved_page(key)
+            if saved is not None:
+                return saved
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        
+        if not owner:
+            # Another thread is writing this job: share its outcome
+            return future.result()
+        
+        try:
+            page = self._write_application(key, company, role, url, status, confidence,
+                                           referral, contact_person, location, job_description)
+            future.set_result(page)
+            return page
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._ledger_lock:
+                del self._in_flight[key]
+    
+    def _write_application(self, key: str, company: str, role: str, url: str, status: str,
+                           confidence: str, referral: str, contact_person: str,
+                           location: str, job_description: str) -> Dict:
+        """Create the Notion row for a job not yet in the ledger"""
+        # A write that failed or was cut short last time may still have reached Notion
+        pending_url = self._pending_url(key)
+        if pending_url:
+            for app in self.find_by_url(pending_url):
+                self._record(key, url, "done", app)
+                return app
+        
         # Check for existing application with same company and role (case insensitive)
         existing_apps = self.search_applications(company=company, role=role)
         for app in existing_apps:
@@ -110,7 +206,10 @@ class JobApplicationManager:
         }
         
         # Add the application to the database
-        return self.notion.add_row(self.database_id, properties)
+        self._record(key, url, "pending")
+        page = self.notion.add_row(self.database_id, properties)
+        self._record(key, url, "done", page)
+        return page
     
     def update_status(self, page_id: str, new_status: str) -> Dict:
         """
@@ -233,6 +332,45 @@ class JobApplicationManager:
         # Get the matching applications
         return self.notion.get_all_rows(self.database_id, filter_params, sorts)
     
+    def find_by_url(self, url: str) -> List[Dict]:
+        """
+        Find applications whose URL property matches exactly.
+        
+        Args:
+            url (str): URL of the job posting
+            
+        Returns:
+            List[Dict]: Matching applications
+        """
+        filter_params = {
+            "property": "URL",
+            "url": {
+                "equals": url
+            }
+        }
+        return self.notion.get_all_rows(self.database_id, filter_params)
+    
+    # Ledger of completed writes
+    
+    def _saved_page(self, key: str) -> Optional[Dict]:
+        row = self.ledger.execute(
+            "SELECT page FROM saved_jobs WHERE job_key = ? AND status = 'done'", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _pending_url(self, key: str) -> Optional[str]:
+        with self._ledger_lock:
+            row = self.ledger.execute(
+                "SELECT url FROM saved_jobs WHERE job_key = ? AND status = 'pending'", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _record(self, key: str, url: str, status: str, page: Optional[Dict] = None) -> None:
+        with self._ledger_lock:
+            self.ledger.execute(
+                "INSERT OR REPLACE INTO saved_jobs (job_key, url, status, page, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(page) if page is not None else None, time.time()))
+            self.ledger.commit()
+    
     # Helper method for extracting text from Notion properties
     def _extract_text_property(self, page: Dict, property_name: str) -> str:
         """
@@ -9,9 +9,25 @@ from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from langchain_community.llms import Replicate
 from langchain_ollama import ChatOllama
-from typing import List, Dict, Any, Callable, Optional
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
 import re
-from langchain_core.output_parsers import JsonOutputToolsParser
+import time
+import asyncio
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.runnables import Runnable
+from framework.core.cassette import install_from_env
+from framework.core.limits import ProviderLimiter, estimate_tokens, limiter_for
+from framework.core.metrics import CallMeter, tagged
+from framework.core.singleflight import flights
+from framework.core.tools import tool_to_call  # agents import it from here
+
+
+# LLM_CASSETTE=<file> records or replays all model traffic (see framework/core/cassette.py)
+install_from_env()
 
 
 class Models(Enum):
@@ -33,67 +49,638 @@ REPLICATE_MODELS = {
 }
 
 
+def provider_of(model) -> str:
+    """
+    Provider serving a model: "anthropic", "openai", "groq", "ollama" or "replicate".
+
+    Args:
+        model: A Models member or a client returned by get_model
+    """
+    if isinstance(model, Models):
+        if model.value.startswith("llava"):
+            return "replicate"
+        if model.value.startswith("claude"):
+            return "anthropic"
+        if model.value.startswith("gpt"):
+            return "openai"
+        if model.value in [Models.LLAMA3x3_70B.value, Models.DEEPSEEK_R1_70B.value]:
+            return "groq"
+        return "ollama"
+    llm_type = model._llm_type
+    for provider in ("anthropic", "openai", "groq", "ollama", "replicate"):
+        if provider in llm_type:
+            return provider
+    return llm_type
+
+
+# Set while a call holds its limiter admission, so that provider code falling
+# back from async to sync (or from generate to stream) is not admitted twice
+_admitted = contextvars.ContextVar("admitted", default=False)
+
+
+class ManagedModel:
+    """
+    Mixin put in front of every client class handed out by get_model.
+
+    All LangChain entry points (invoke, ainvoke, stream, batch, bind_tools,
+    with_structured_output, ...) end in _generate/_agenerate/_stream/_astream,
+    so wrapping those four routes every call through the provider's shared
+    ProviderLimiter while the client stays a regular ChatAnthropic/ChatOpenAI/...
+
+    Identical non-streaming calls that overlap in time share one request
+    (see framework/core/singleflight.py), and every call is metered into the
+    metrics store (see framework/core/metrics.py).
+    """
+
+    @property
+    def limiter(self) -> ProviderLimiter:
+        return limiter_for(provider_of(self))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        meter = CallMeter(self._model_label(), provider_of(self))
+        try:
+            result = flights.do(self._flight_key(messages, stop, kwargs),
+                                lambda: self._limited_generate(messages, stop, run_manager, meter, **kwargs),
+                                label=self._model_label())
+        except Exception as e:
+            meter.finish(error=e)
+            raise
+        meter.finish(usage=self._usage(result)[0])
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        meter = CallMeter(self._model_label(), provider_of(self))
+        try:
+            result = await flights.ado(self._flight_key(messages, stop, kwargs),
+                                       lambda: self._alimited_generate(messages, stop, run_manager, meter, **kwargs),
+                                       label=self._model_label())
+        except Exception as e:
+            meter.finish(error=e)
+            raise
+        meter.finish(usage=self._usage(result)[0])
+        return result
+
+    def _limited_generate(self, messages, stop, run_manager, meter, **kwargs):
+        meter.lead()
+        limiter = self.limiter
+        while True:
+            reserved = self._reservation(messages, kwargs)
+            limiter.acquire(reserved)
+            token = _admitted.set(True)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                wait = limiter.backoff(e, meter.retries)
+                if wait is None:
+                    raise
+            else:
+                self._settle(reserved, *self._usage(result))
+                return result
+            finally:
+                _admitted.reset(token)
+                limiter.release()
+            time.sleep(wait)
+            meter.retries += 1
+
+    async def _alimited_generate(self, messages, stop, run_manager, meter, **kwargs):
+        meter.lead()
+        limiter = self.limiter
+        while True:
+            reserved = self._reservation(messages, kwargs)
+            await limiter.aacquire(reserved)
+            token = _admitted.set(True)
+            try:
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                wait = limiter.backoff(e, meter.retries)
+                if wait is None:
+                    raise
+            else:
+                self._settle(reserved, *self._usage(result))
+                return result
+            finally:
+                _admitted.reset(token)
+                limiter.release()
+            await asyncio.sleep(wait)
+            meter.retries += 1
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        meter = CallMeter(self._model_label(), provider_of(self), streamed=True)
+        meter.lead()
+        limiter = self.limiter
+        reserved = self._reservation(messages, kwargs)
+        limiter.acquire(reserved)
+        usage, headers, error = None, None, None
+        chunks = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        try:
+            while True:
+                # admitted only while the provider produces a chunk: a generator
+                # closed early may be finalized in another context, so the
+                # contextvar must not stay set across the yield
+                token = _admitted.set(True)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                finally:
+                    _admitted.reset(token)
+                meter.first_token()
+                usage, headers = self._chunk_usage(chunk, usage, headers)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            limiter.release()
+            self._settle(reserved, usage, headers)
+            meter.finish(usage=usage, error=error)
+            chunks.close()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        meter = CallMeter(self._model_label(), provider_of(self), streamed=True)
+        meter.lead()
+        limiter = self.limiter
+        reserved = self._reservation(messages, kwargs)
+        await limiter.aacquire(reserved)
+        usage, headers, error = None, None, None
+        chunks = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        try:
+            while True:
+                # see _stream: admission is not held across the yield
+                token = _admitted.set(True)
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _admitted.reset(token)
+                meter.first_token()
+                usage, headers = self._chunk_usage(chunk, usage, headers)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            limiter.release()
+            self._settle(reserved, usage, headers)
+            meter.finish(usage=usage, error=error)
+            await chunks.aclose()
+
+    # Helpers
+
+    def _model_label(self) -> str:
+        return getattr(self, "model_name", None) or getattr(self, "model", None) or self._llm_type
+
+    def _flight_key(self, messages, stop, kwargs) -> str:
+        """Identity of a call: model, parameters and prompt"""
+        if hasattr(self, "_get_llm_string"):
+            params = self._get_llm_string(stop=stop, **kwargs)
+        else:
+            params = repr(sorted(dict(self._identifying_params, stop=stop, **kwargs).items()))
+        return hashlib.sha256(f"{params}\n{dumps(messages)}".encode()).hexdigest()
+
+    def _reservation(self, messages, kwargs) -> int:
+        max_tokens = kwargs.get("max_tokens") or getattr(self, "max_tokens", None) or self.limiter.expected_output_tokens
+        return estimate_tokens(messages) + min(max_tokens, self.limiter.expected_output_tokens)
+
+    def _settle(self, reserved: int, usage: Optional[Dict], headers) -> None:
+        self.limiter.record(reserved, (usage or {}).get("total_tokens"), headers)
+
+    def _usage(self, result):
+        """(usage metadata, rate-limit headers) of a ChatResult/LLMResult, where reported"""
+        generations = result.generations
+        # LLMResult nests generations per prompt
+        if generations and isinstance(generations[0], list):
+            generations = generations[0]
+        message = getattr(generations[0], "message", None) if generations else None
+        metadata = getattr(message, "response_metadata", None) or {}
+        return getattr(message, "usage_metadata", None), metadata.get("headers")
+
+    def _chunk_usage(self, chunk, usage, headers):
+        """Accumulate usage and pick up headers across streamed chunks"""
+        message = getattr(chunk, "message", None)
+        chunk_usage = getattr(message, "usage_metadata", None)
+        if chunk_usage:
+            usage = dict(usage or {})
+            for field in ("input_tokens", "output_tokens", "total_tokens"):
+                usage[field] = usage.get(field, 0) + chunk_usage.get(field, 0)
+        metadata = getattr(message, "response_metadata", None) or {}
+        return usage, metadata.get("headers") or headers
+
+
+@functools.lru_cache(maxsize=None)
+def _managed(client_class):
+    """The client class with ManagedModel in front of it"""
+    return type(client_class.__name__, (ManagedModel, client_class), {"__module__": __name__})
+
+
 def get_model(model: Models, temperature: float = 0, max_tokens: int = 4096):
+    # Every client is rate limited per provider (see framework/core/limits.py).
+    # SDK retries are off so that 429s reach the limiter, which pauses the whole
+    # provider until retry-after instead of letting each caller retry alone.
     if model.value.startswith("llava"):
-        return Replicate(
+        return _managed(Replicate)(
             model=REPLICATE_MODELS[model.value],
             model_kwargs={"temperature": temperature, "max_length": 500, "top_p": 1}
         )
     elif model.value.startswith("claude"):
-        return ChatAnthropic(
+        return _managed(ChatAnthropic)(
             model=model.value,
             temperature=temperature,
             api_key=os.getenv("ANTHROPIC_API_KEY"),
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            max_retries=0
         )
     elif model.value.startswith("gpt"):
-        return ChatOpenAI(
+        return _managed(ChatOpenAI)(
             model=model.value,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            max_retries=0,
+            include_response_headers=True
         )
     elif model.value in [Models.LLAMA3x3_70B.value, Models.DEEPSEEK_R1_70B.value]:
-        return ChatGroq(
+        return _managed(ChatGroq)(
             api_key=os.getenv("GROQ_API_KEY"),
             model=model.value,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            max_retries=0
         )
     elif model.value in [Models.LLAMA3x2_3B.value, Models.QWQ.value, Models.QWEN2x5_7B.value,Models.QWEN2x5_CODER_7B.value]:
-        return ChatOllama(
+        return _managed(ChatOllama)(
             model=model.value,
             temperature=temperature
         )
     raise ValueError(f"Unsupported model: {model}")
 
 
-def tool_to_call(name=None, description=None):
+class Completion(NamedTuple):
+    """Outcome of one prompt in a fan-out: `output` on success, `error` otherwise"""
+    index: int
+    output: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _fan_out_plan(prompts: Sequence, llm) -> List[List[int]]:
     """
-    Custom decorator to mark methods as tools for LLM to call.
-    
+    Group prompt indexes into calls. Identical prompts become one call with
+    n=<copies> where the provider samples several completions natively
+    (OpenAI chat models); everything else is one call per prompt.
+    """
+    if not (isinstance(llm, BaseChatModel) and provider_of(llm) == "openai"):
+        return [[index] for index in range(len(prompts))]
+    groups: Dict[str, List[int]] = {}
+    for index, prompt in enumerate(prompts):
+        groups.setdefault(repr(llm._convert_input(prompt).to_messages()), []).append(index)
+    return list(groups.values())
+
+
+def _completions(group: List[int], result) -> List[Completion]:
+    """Map an n-completion LLMResult back onto the prompts of its group"""
+    return [Completion(index, generation.message) for index, generation in zip(group, result.generations[0])]
+
+
+async def astream_many(prompts: Sequence, model: Union[Models, Runnable],
+                       max_concurrency: int = 8, stage: Optional[str] = None) -> AsyncIterator[Completion]:
+    """
+    Fan prompts out to a model, yielding each Completion as soon as it finishes.
+
+    Args:
+        prompts (Sequence): Anything the model's ainvoke accepts (strings, message lists, ...)
+        model (Models | Runnable): Model to use, or a client already built by get_model
+            (possibly with tools or structured output bound)
+        max_concurrency (int, optional): Calls in flight at once. Defaults to 8.
+        stage (str, optional): Stage tag of the calls (see metrics.stage). Defaults to the caller's.
+
+    Yields:
+        Completion: index of the prompt plus its output or its error; a failed
+            prompt never stops the others
+    """
+    llm = get_model(model) if isinstance(model, Models) else model
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(group: List[int]) -> List[Completion]:
+        async with semaphore:
+            try:
+                if len(group) == 1:
+                    return [Completion(group[0], await llm.ainvoke(prompts[group[0]]))]
+                messages = llm._convert_input(prompts[group[0]]).to_messages()
+                return _completions(group, await llm.agenerate([messages], n=len(group)))
+            except Exception as e:
+                return [Completion(index, error=e) for index in group]
+
+    # the tasks copy the context they are created in, so the stage tags their calls only
+    with tagged(stage):
+        tasks = [asyncio.create_task(run(group)) for group in _fan_out_plan(prompts, llm)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for completion in await next_done:
+                yield completion
+    finally:
+        # the consumer stopped early: do not pay for results nobody reads
+        for task in tasks:
+            task.cancel()
+
+
+async def ainvoke_many(prompts: Sequence, model: Union[Models, Runnable],
+                       max_concurrency: int = 8) -> List[Completion]:
+    """Like astream_many, but waits for every prompt and returns them in prompt order"""
+    completions = [completion async for completion in astream_many(prompts, model, max_concurrency)]
+    return sorted(completions, key=lambda completion: completion.index)
+
+
+def invoke_many(prompts: Sequence, model: Union[Models, Runnable],
+                max_concurrency: int = 8) -> List[Completion]:
+    """
+    Synchronous ainvoke_many for code without an event loop (Streamlit, scripts).
+
+    Runs the sync client API on a thread pool rather than spinning up an event
+    loop, so the model's cached async HTTP client is never tied to a loop that
+    is closed afterwards.
+
+    Returns:
+        List[Completion]: One Completion per prompt, in prompt order
+    """
+    llm = get_model(model) if isinstance(model, Models) else model
+
+    def run(group: List[int]) -> List[Completion]:
+        try:
+            if len(group) == 1:
+                return [Completion(group[0], llm.invoke(prompts[group[0]]))]
+            messages = llm._convert_input(prompts[group[0]]).to_messages()
+            return _completions(group, llm.generate([messages], n=len(group)))
+        except Exception as e:
+            return [Completion(index, error=e) for index in group]
+
+    completions: List[Completion] = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        # copy the caller's context so stage tags reach the worker threads
+        futures = [pool.submit(contextvars.copy_context().run, run, group) for group in _fan_out_plan(prompts, llm)]
+        for future in as_completed(futures):
+            completions.extend(future.result())
+    return sorted(completions, key=lambda completion: completion.index)
+
+
+def chunk_text(chunk) -> str:
+    """Text carried by a streamed chunk (str, message chunk or content blocks)"""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    # Anthropic streams a list of content blocks; thinking and tool blocks are not text
+    return "".join(block.get("text", "") for block in content
+                   if isinstance(block, dict) and block.get("type") == "text")
+
+
+def stream_text(prompt, model: Union[Models, Runnable], stage: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield a completion's text as it arrives, so callers can show output
+    from the first token instead of after the whole completion.
+
     Args:
-        name: Optional name override for the tool
-        description: Optional description override for the tool
+        prompt: Anything the model's stream accepts (string, message list, ...)
+        model (Models | Runnable): Model to use, or a client built by get_model
+        stage (str, optional): Stage tag of the model call (see metrics.stage). Defaults to the caller's.
     """
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
-            
-        # Add markers to the function
-        wrapper._is_tool = True
-        wrapper._tool_name = name
-        wrapper._tool_description = description
-        return wrapper
-    return decorator
+    llm = get_model(model) if isinstance(model, Models) else model
+    chunks = llm.stream(prompt)
+    try:
+        while True:
+            # tag the model call only: the consumer's code between chunks keeps its own stage
+            with tagged(stage):
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+            text = chunk_text(chunk)
+            if text:
+                yield text
+    finally:
+        chunks.close()
+
 
+async def astream_text(prompt, model: Union[Models, Runnable], stage: Optional[str] = None) -> AsyncIterator[str]:
+    """Async stream_text"""
+    llm = get_model(model) if isinstance(model, Models) else model
+    # not closed here when the consumer stops early: the event loop finalizes it as soon as
+    # it is dropped, and closing it from here too would race that finalizer
+    chunks = llm.astream(prompt)
+    while True:
+        # see stream_text; the stage is never held across the yield either, since a
+        # stream closed early may be finalized in another context
+        with tagged(stage):
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+        text = chunk_text(chunk)
+        if text:
+            yield text
 
 
+async def merge_streams(streams: Dict[Any, AsyncIterator]) -> AsyncIterator[Tuple[Any, Any]]:
+    """
+    Interleave several async streams, yielding (key, item) as items arrive.
+    An exception in any stream is raised once the items before it are out.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(key, stream):
+        try:
+            async for item in stream:
+                await queue.put((key, item))
+            await queue.put((key, done))
+        except Exception as e:
+            await queue.put((key, e))
+
+    tasks = [asyncio.create_task(pump(key, stream)) for key, stream in streams.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            key, item = await queue.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield key, item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class ToolCallStream:
+    """
+    Incremental tool-call parser for streamed model output.
+
+    Feed it streamed chunks and it returns each tool call, as
+    {"name": ..., "arguments": {...}}, as soon as the call is complete, so
+    the caller can start running a tool while the model is still writing
+    the next one:
+
+    - tool calls written as JSON in the text (Ollama models without native
+      tool calling) are complete when their top-level object closes. Braces
+      inside strings and nested objects are handled, and any number of calls
+      may follow each other, separated by prose, commas or array brackets;
+    - native tool-call chunks (OpenAI, Anthropic, Groq, ChatOllama) are
+      complete when the next call starts or the stream ends (see close).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start: Optional[int] = None
+        self.native: Dict[int, Dict[str, Any]] = {}
+        self.native_done = 0
+
+    def feed(self, chunk) -> List[Dict[str, Any]]:
+        """Consume one streamed chunk (message chunk or str) and return the calls it completed"""
+        calls = []
+        for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+            index = tool_chunk.get("index")
+            if index is None:
+                # clients streaming whole calls (ChatOllama) send no index: a
+                # chunk naming a call starts a new one, anything else continues the last
+                starts = tool_chunk.get("name") or tool_chunk.get("id") or not self.native
+                index = max(self.native, default=-1) + 1 if starts else max(self.native)
+            if index not in self.native:
+                # a new call starts: the ones before it are complete
+                calls += self._flush_native(below=index)
+                self.native[index] = {"name": "", "args": "", "id": None}
+            call = self.native[index]
+            call["name"] += tool_chunk.get("name") or ""
+            call["args"] += tool_chunk.get("args") or ""
+            call["id"] = call["id"] or tool_chunk.get("id")
+            if tool_chunk.get("index") is None and call["name"] and _is_json(call["args"] or "{}"):
+                # a fully formed call needs no closing chunk
+                calls += self._flush_native(below=None)
+        return calls + self.feed_text(chunk_text(chunk))
+
+    def feed_text(self, text: str) -> List[Dict[str, Any]]:
+        """Consume streamed text and return the JSON tool calls it completed"""
+        calls = []
+        offset = len(self.buffer)
+        self.buffer += text
+        for position in range(offset, len(self.buffer)):
+            char = self.buffer[position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                # between calls only the start of the next object matters
+                if char == "{":
+                    self.depth, self.object_start = 1, position
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    calls += _json_tool_calls(self.buffer[self.object_start:position + 1])
+                    self.object_start = None
+        # keep only the object still being written
+        if self.object_start is None:
+            self.buffer = ""
+        else:
+            self.buffer = self.buffer[self.object_start:]
+            self.object_start = 0
+        return calls
+
+    def close(self) -> List[Dict[str, Any]]:
+        """The stream has ended: return the native calls still open"""
+        return self._flush_native(below=None)
+
+    def _flush_native(self, below: Optional[int]) -> List[Dict[str, Any]]:
+        calls = []
+        for index in sorted(self.native):
+            if index < self.native_done or (below is not None and index >= below):
+                continue
+            call = self.native[index]
+            try:
+                arguments = json.loads(call["args"]) if call["args"] else {}
+            except ValueError:
+                arguments = {"__arg1": call["args"]}
+            calls.append({"name": call["name"], "arguments": arguments, "id": call["id"]})
+            self.native_done = index + 1
+        return calls
+
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _json_tool_calls(text: str) -> List[Dict[str, Any]]:
+    """The tool calls in one JSON object: {"name", "arguments"}, OpenAI's function format, or {"tool_calls": [...]}"""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return []
+    if isinstance(value, dict) and isinstance(value.get("tool_calls"), list):
+        return [call for item in value["tool_calls"] if isinstance(item, dict)
+                for call in _json_tool_calls(json.dumps(item))]
+    if isinstance(value, dict) and isinstance(value.get("function"), dict):
+        value = value["function"]
+    if not isinstance(value, dict) or not isinstance(value.get("name"), str):
+        return []
+    arguments = next((value[key] for key in ("arguments", "args", "parameters", "input") if key in value), {})
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except ValueError:
+            arguments = {"__arg1": arguments}
+    return [{"name": value["name"], "arguments": arguments}]
+
+
+def stream_tool_calls(prompt, model: Union[Models, Runnable]) -> Iterator[Dict[str, Any]]:
+    """Yield each tool call of a completion as soon as the model has finished writing it"""
+    llm = get_model(model) if isinstance(model, Models) else model
+    parser = ToolCallStream()
+    for chunk in llm.stream(prompt):
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def astream_tool_calls(prompt, model: Union[Models, Runnable]) -> AsyncIterator[Dict[str, Any]]:
+    """Async stream_tool_calls"""
+    llm = get_model(model) if isinstance(model, Models) else model
+    parser = ToolCallStream()
+    async for chunk in llm.astream(prompt):
+        for call in parser.feed(chunk):
+            yield call
+    for call in parser.close():
+        yield call
 
 
 def standardize_tool_output(llm_response, provider):
     """
-    Standardize tool calling outputs across providers using JsonOutputToolsParser.
+    Standardize tool calling outputs across providers.
     
     Args:
         llm_response: The raw response from the LLM
@@ -148,22 +735,9 @@ def standardize_tool_output(llm_response, provider):
                         })
         
         elif provider == "ollama":
-            # Try to extract from response content
+            # Tool calls written as JSON in the content, possibly several
             if hasattr(llm_response, "content") and isinstance(llm_response.content, str):
-                content = llm_response.content
-                # Use JsonOutputToolsParser for parsable JSON
-                parser = JsonOutputToolsParser()
-                try:
-                    # The parse method expects JSON string output
-                    tool_calls = parser.parse(content)
-                    return tool_calls
-                except:
-                    # If parsing fails, try to extract JSON via regex
-                    import re
-                    json_match = re.search(r'({.*})', content.replace('\n', ' '))
-                    if json_match:
-                        tool_call = json.loads(json_match.group(1))
-                        standardized_calls.append(tool_call)
+                standardized_calls.extend(ToolCallStream().feed_text(llm_response.content))
         
         return standardized_calls
     
@@ -0,0 +1,227 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import BaseModel, ValidationError
+
+from framework.core.brains import Models, chunk_text, get_model
+from framework.core.metrics import current_stage
+
+
+class ValidationFailed(ValueError):
+    """A model's output did not pass the quality gate of its stage"""
+
+
+class CascadeExhausted(ValueError):
+    """Every tier of a strict cascade failed; `attempts` lists (tier, reason)"""
+
+    def __init__(self, name: str, attempts: List[Tuple[str, str]]):
+        super().__init__(f"cascade {name}: every tier failed ("
+                         + "; ".join(f"{tier}: {reason}" for tier, reason in attempts) + ")")
+        self.attempts = attempts
+
+
+# A validator inspects a model output and raises ValidationFailed to reject it
+Validator = Callable[[Any], None]
+
+
+def length(min_chars: int = 1, max_chars: Optional[int] = None) -> Validator:
+    """Reject text shorter than min_chars or longer than max_chars"""
+    def validate(output) -> None:
+        size = len(chunk_text(output).strip())
+        if size < min_chars:
+            raise ValidationFailed(f"{size} characters, expected at least {min_chars}")
+        if max_chars is not None and size > max_chars:
+            raise ValidationFailed(f"{size} characters, expected at most {max_chars}")
+    return validate
+
+
+def lines(min_lines: int = 1, max_lines: Optional[int] = None, max_words: Optional[int] = None) -> Validator:
+    """Reject text with too few or too many non-empty lines, or lines that run too long"""
+    def validate(output) -> None:
+        text_lines = [line for line in chunk_text(output).splitlines() if line.strip()]
+        if len(text_lines) < min_lines:
+            raise ValidationFailed(f"{len(text_lines)} lines, expected at least {min_lines}")
+        if max_lines is not None and len(text_lines) > max_lines:
+            raise ValidationFailed(f"{len(text_lines)} lines, expected at most {max_lines}")
+        if max_words is not None:
+            for line in text_lines:
+                if len(line.split()) > max_words:
+                    raise ValidationFailed(f"line of {len(line.split())} words, expected at most {max_words}: {line[:60]}")
+    return validate
+
+
+def matches(pattern: str, flags: int = 0) -> Validator:
+    """Reject text in which the regular expression is not found"""
+    compiled = re.compile(pattern, flags)
+
+    def validate(output) -> None:
+        if not compiled.search(chunk_text(output)):
+            raise ValidationFailed(f"output does not match {pattern!r}")
+    return validate
+
+
+def parses(schema: Type[BaseModel]) -> Validator:
+    """Reject output that is not JSON valid against the schema (code fences are ignored)"""
+    def validate(output) -> None:
+        if isinstance(output, schema):
+            return
+        text = chunk_text(output).strip()
+        fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+        try:
+            schema.model_validate(json.loads(fenced.group(1) if fenced else text))
+        except (json.JSONDecodeError, ValidationError) as e:
+            raise ValidationFailed(f"not a valid {schema.__name__}: {e}") from e
+    return validate
+
+
+def all_of(*validators: Validator) -> Validator:
+    """Pass only if every validator passes"""
+    def validate(output) -> None:
+        for validator in validators:
+            validator(output)
+    return validate
+
+
+class CascadeStats:
+    """Which tier answered, per cascade and stage"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, stage_name: str, outcome: str) -> None:
+        """outcome: the label of the tier whose answer was used, or "exhausted" """
+        with self._lock:
+            self.counts[(name, stage_name or "-", outcome)] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        with self._lock:
+            counts = dict(self.counts)
+        stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (name, stage_name, outcome), count in counts.items():
+            stats.setdefault(name, {}).setdefault(stage_name, Counter())[outcome] += count
+        return {name: {stage_name: dict(outcomes) for stage_name, outcomes in stages.items()}
+                for name, stages in stats.items()}
+
+
+cascade_counts = CascadeStats()
+
+
+def cascade_stats() -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Per cascade and stage: how many calls each tier answered, and how many exhausted every tier"""
+    return cascade_counts.stats()
+
+
+def _label(llm) -> str:
+    if hasattr(llm, "_model_label"):
+        return llm._model_label()
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class Cascade(Runnable):
+    """
+    Quality-gated model cascade.
+
+    A call goes to the cheapest tier first. Its output is checked by the
+    validator registered for the current stage (see metrics.stage), and the
+    call moves up to the next tier only when that output is rejected: a
+    validator raising ValidationFailed, a structured-output parse error, or
+    the tier failing outright (e.g. no local Ollama running). Outputs from a
+    stage without a validator are taken from the first tier that answers.
+
+    A Cascade is a Runnable, so it drops in wherever a client from get_model
+    is used (invoke, ainvoke, batch, invoke_many, stream_text). Streaming
+    yields the accepted output in one piece, since it can only be validated
+    once complete.
+    """
+
+    def __init__(self, tiers: Sequence[Union[Models, Runnable]],
+                 validators: Union[Validator, Dict[str, Validator], None] = None,
+                 name: str = "cascade", strict: bool = False):
+        """
+        Args:
+            tiers (Sequence[Models | Runnable]): Models to try, cheapest first
+            validators (Validator | Dict[str, Validator], optional): One validator for every
+                call, or validators keyed by stage name. Defaults to none.
+            name (str, optional): Name in cascade_stats. Defaults to "cascade".
+            strict (bool, optional): Raise CascadeExhausted when the last tier is rejected too,
+                instead of returning its output as a single-model call would. Defaults to False.
+        """
+        if not tiers:
+            raise ValueError("a cascade needs at least one tier")
+        self.tiers = [get_model(tier) if isinstance(tier, Models) else tier for tier in tiers]
+        self.labels = [_label(tier) for tier in self.tiers]
+        self.validators = validators
+        self.name = name
+        self.strict = strict
+
+    @classmethod
+    def from_settings(cls, name: str, validators: Union[Validator, Dict[str, Validator], None] = None,
+                      **kwargs) -> Optional["Cascade"]:
+        """The cascade configured under settings cascades.<name>, or None if there is none"""
+        from framework.core.config_manager import settings
+        tiers = (settings.get("cascades") or {}).get(name)
+        if not tiers:
+            return None
+        return cls([Models(tier) for tier in tiers], validators=validators, name=name, **kwargs)
+
+    def _validator(self) -> Optional[Validator]:
+        if isinstance(self.validators, dict):
+            return self.validators.get(current_stage())
+        return self.validators
+
+    def _accept(self, position: int, output, validator: Optional[Validator],
+                attempts: List[Tuple[str, str]]) -> bool:
+        try:
+            if validator:
+                validator(output)
+        except ValidationFailed as e:
+            attempts.append((self.labels[position], str(e)))
+            return False
+        cascade_counts.record(self.name, current_stage(), self.labels[position])
+        return True
+
+    def _rejected(self, position: int, error: Exception, attempts: List[Tuple[str, str]]) -> None:
+        """A tier failed: remember why, or give up if it was the last one"""
+        attempts.append((self.labels[position], f"{type(error).__name__}: {error}"))
+        if position == len(self.tiers) - 1:
+            cascade_counts.record(self.name, current_stage(), "exhausted")
+            if self.strict:
+                raise CascadeExhausted(self.name, attempts) from error
+            raise error
+
+    def _exhausted(self, output, attempts: List[Tuple[str, str]]):
+        cascade_counts.record(self.name, current_stage(), "exhausted")
+        if self.strict:
+            raise CascadeExhausted(self.name, attempts)
+        return output
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        validator = self._validator()
+        attempts: List[Tuple[str, str]] = []
+        for position, tier in enumerate(self.tiers):
+            try:
+                output = tier.invoke(input, config, **kwargs)
+            except Exception as e:
+                self._rejected(position, e, attempts)
+                continue
+            if self._accept(position, output, validator, attempts):
+                return output
+        return self._exhausted(output, attempts)
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        validator = self._validator()
+        attempts: List[Tuple[str, str]] = []
+        for position, tier in enumerate(self.tiers):
+            try:
+                output = await tier.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                self._rejected(position, e, attempts)
+                continue
+            if self._accept(position, output, validator, attempts):
+                return output
+        return self._exhausted(output, attempts)
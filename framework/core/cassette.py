@@ -0,0 +1,334 @@
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay found no recorded response for a request"""
+
+
+# Request fields that change from run to run without changing the answer
+VOLATILE_FIELDS = ("user", "metadata", "stream_options")
+
+# Set in replay mode so SDK clients can be built without real credentials
+DUMMY_KEYS = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GROQ_API_KEY", "REPLICATE_API_TOKEN")
+
+Chunks = List[Tuple[float, bytes]]
+
+
+def request_key(request: httpx.Request) -> str:
+    """Identity of a request: method, URL and JSON body minus volatile fields"""
+    body = request.content
+    try:
+        payload = json.loads(body) if body else None
+        if isinstance(payload, dict):
+            payload = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+        body = json.dumps(payload, sort_keys=True).encode()
+    except ValueError:
+        pass
+    return hashlib.sha256(b"\n".join([request.method.encode(), str(request.url).encode(), body])).hexdigest()
+
+
+def _encode(data: bytes, binary: bool) -> str:
+    return base64.b64encode(data).decode() if binary else data.decode()
+
+
+def _decode(data: str, binary: bool) -> bytes:
+    return base64.b64decode(data) if binary else data.encode()
+
+
+class Cassette:
+    """
+    Records model traffic to a JSONL file and serves it back offline.
+
+    It works at the httpx transport, so every client that talks HTTP through
+    httpx is covered: the get_model clients (OpenAI, Anthropic, Groq, Ollama,
+    Replicate) and the pydantic-ai models alike.
+
+    Modes:
+        record: every request goes out; request, response status, headers,
+            body chunks and their timing are written to the cassette.
+        replay: requests are answered from the cassette and never leave the
+            process. Identical requests get their recordings in order (the
+            last one repeats). An unknown request raises CassetteMiss.
+        auto: replay what is recorded, record the rest.
+
+    Request headers (API keys) are never written. Replayed responses keep
+    their recorded timing, scaled by `speed`, unless `latency` is given:
+    seconds (or a function returning seconds) before the response, with the
+    body streamed out straight away.
+
+    Use it as a context manager, or set LLM_CASSETTE (and LLM_CASSETTE_MODE)
+    to have framework.core.brains install one for the whole process.
+    """
+
+    _active: Optional["Cassette"] = None
+    _originals: Dict[str, Callable] = {}
+
+    def __init__(self, path: str, mode: str = "replay", speed: float = 1.0,
+                 latency: Union[None, float, Callable[[], float]] = None):
+        """
+        Args:
+            path (str): Cassette file (JSONL), created in record mode
+            mode (str, optional): "record", "replay" or "auto". Defaults to "replay".
+            speed (float, optional): Replay recorded timing this many times faster. Defaults to 1.0.
+            latency (float | Callable, optional): Replay with this latency instead of the recorded one.
+        """
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.latency = latency
+        self.recordings: Dict[str, List[Dict]] = {}
+        self.played: Dict[str, int] = {}
+        self.counts = {"recorded": 0, "replayed": 0}
+        self.dummy_keys: List[str] = []
+        self._lock = threading.Lock()
+        if mode != "record" and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self.recordings.setdefault(interaction["key"], []).append(interaction)
+        elif mode == "replay":
+            raise FileNotFoundError(f"No cassette at {path}")
+        if mode == "record":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            open(path, "w").close()
+
+    # Installing
+
+    def install(self) -> "Cassette":
+        if Cassette._active is not None:
+            raise RuntimeError(f"Cassette {Cassette._active.path} is already active")
+        Cassette._active = self
+        Cassette._originals = {
+            "sync": httpx.HTTPTransport.handle_request,
+            "async": httpx.AsyncHTTPTransport.handle_async_request,
+        }
+        cassette = self
+
+        def handle_request(transport, request):
+            return cassette._handle(transport, request)
+
+        async def handle_async_request(transport, request):
+            return await cassette._ahandle(transport, request)
+
+        httpx.HTTPTransport.handle_request = handle_request
+        httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+        # only the keys set here are removed again on uninstall
+        self.dummy_keys = [key for key in DUMMY_KEYS if self.mode == "replay" and key not in os.environ]
+        for key in self.dummy_keys:
+            os.environ[key] = "cassette-replay"
+        return self
+
+    def uninstall(self) -> None:
+        if Cassette._active is self:
+            httpx.HTTPTransport.handle_request = Cassette._originals["sync"]
+            httpx.AsyncHTTPTransport.handle_async_request = Cassette._originals["async"]
+            Cassette._active = None
+            for key in self.dummy_keys:
+                if os.environ.get(key) == "cassette-replay":
+                    del os.environ[key]
+            self.dummy_keys = []
+
+    def __enter__(self) -> "Cassette":
+        return self.install()
+
+    def __exit__(self, *exc) -> None:
+        self.uninstall()
+
+    # Replay
+
+    def _lookup(self, request: httpx.Request) -> Optional[Dict]:
+        key = request_key(request)
+        with self._lock:
+            recorded = self.recordings.get(key)
+            if not recorded:
+                return None
+            position = self.played.get(key, 0)
+            self.played[key] = position + 1
+            self.counts["replayed"] += 1
+            return recorded[min(position, len(recorded) - 1)]
+
+    def _miss(self, request: httpx.Request) -> CassetteMiss:
+        return CassetteMiss(f"No recorded response for {request.method} {request.url} in {self.path}",
+                            request=request)
+
+    def _timing(self, interaction: Dict) -> Tuple[float, List[float]]:
+        """Seconds before the response, and before each body chunk (relative to the response)"""
+        offsets = [offset for offset, _ in interaction["chunks"]]
+        if self.latency is not None:
+            delay = self.latency() if callable(self.latency) else self.latency
+            return delay, [0.0] * len(offsets)
+        started = interaction["elapsed"] / self.speed
+        return started, [max(0.0, offset / self.speed - started) for offset in offsets]
+
+    def _response(self, interaction: Dict, request: httpx.Request, stream) -> httpx.Response:
+        return httpx.Response(interaction["status"], headers=interaction["headers"], stream=stream,
+                              request=request, extensions={"http_version": b"HTTP/1.1"})
+
+    def _replay(self, interaction: Dict, request: httpx.Request) -> httpx.Response:
+        delay, offsets = self._timing(interaction)
+        time.sleep(delay)
+        chunks = [_decode(data, interaction["binary"]) for _, data in interaction["chunks"]]
+        return self._response(interaction, request, _ReplayStream(chunks, offsets))
+
+    async def _areplay(self, interaction: Dict, request: httpx.Request) -> httpx.Response:
+        delay, offsets = self._timing(interaction)
+        await asyncio.sleep(delay)
+        chunks = [_decode(data, interaction["binary"]) for _, data in interaction["chunks"]]
+        return self._response(interaction, request, _AsyncReplayStream(chunks, offsets))
+
+    # Record
+
+    def _save(self, request: httpx.Request, response: httpx.Response, elapsed: float, chunks: Chunks) -> None:
+        binary = "content-encoding" in response.headers
+        try:
+            for _, data in chunks:
+                data.decode()
+        except UnicodeDecodeError:
+            # a chunk boundary split a character
+            binary = True
+        try:
+            body = json.loads(request.content) if request.content else None
+        except ValueError:
+            body = None
+        interaction = {
+            "key": request_key(request),
+            "method": request.method,
+            "url": str(request.url),
+            "request": body,
+            "status": response.status_code,
+            "headers": [(name, value) for name, value in response.headers.multi_items()
+                        if name.lower() not in ("set-cookie", "transfer-encoding", "content-length")],
+            "elapsed": elapsed,
+            "binary": binary,
+            "chunks": [(offset, _encode(data, binary)) for offset, data in chunks],
+        }
+        with self._lock:
+            self.recordings.setdefault(interaction["key"], []).append(interaction)
+            self.counts["recorded"] += 1
+            with open(self.path, "a") as f:
+                f.write(json.dumps(interaction) + "\n")
+
+    def _handle(self, transport, request: httpx.Request) -> httpx.Response:
+        if self.mode != "record":
+            interaction = self._lookup(request)
+            if interaction:
+                return self._replay(interaction, request)
+            if self.mode == "replay":
+                raise self._miss(request)
+        request.read()
+        started = time.perf_counter()
+        response = Cassette._originals["sync"](transport, request)
+        elapsed = time.perf_counter() - started
+        response.stream = _RecordingStream(
+            response.stream, started, lambda chunks: self._save(request, response, elapsed, chunks))
+        return response
+
+    async def _ahandle(self, transport, request: httpx.Request) -> httpx.Response:
+        if self.mode != "record":
+            interaction = self._lookup(request)
+            if interaction:
+                return await self._areplay(interaction, request)
+            if self.mode == "replay":
+                raise self._miss(request)
+        await request.aread()
+        started = time.perf_counter()
+        response = await Cassette._originals["async"](transport, request)
+        elapsed = time.perf_counter() - started
+        response.stream = _AsyncRecordingStream(
+            response.stream, started, lambda chunks: self._save(request, response, elapsed, chunks))
+        return response
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Passes a response body through, noting each chunk and when it arrived"""
+
+    def __init__(self, inner, started: float, on_close: Callable[[Chunks], None]):
+        self.inner = inner
+        self.started = started
+        self.on_close = on_close
+        self.chunks: Chunks = []
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.inner:
+            self.chunks.append((time.perf_counter() - self.started, chunk))
+            yield chunk
+
+    def close(self) -> None:
+        self.inner.close()
+        self.on_close(self.chunks)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, started: float, on_close: Callable[[Chunks], None]):
+        self.inner = inner
+        self.started = started
+        self.on_close = on_close
+        self.chunks: Chunks = []
+
+    async def __aiter__(self):
+        async for chunk in self.inner:
+            self.chunks.append((time.perf_counter() - self.started, chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+        self.on_close(self.chunks)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: List[bytes], offsets: List[float]):
+        self.chunks = chunks
+        self.offsets = offsets
+
+    def __iter__(self) -> Iterator[bytes]:
+        started = time.perf_counter()
+        for chunk, offset in zip(self.chunks, self.offsets):
+            wait = offset - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+            yield chunk
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[bytes], offsets: List[float]):
+        self.chunks = chunks
+        self.offsets = offsets
+
+    async def __aiter__(self):
+        started = time.perf_counter()
+        for chunk, offset in zip(self.chunks, self.offsets):
+            wait = offset - (time.perf_counter() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield chunk
+
+
+@contextlib.contextmanager
+def use_cassette(path: str, mode: str = "replay", **kwargs) -> Iterator[Cassette]:
+    """with use_cassette("cassettes/cv.jsonl", mode="record"): ..."""
+    with Cassette(path, mode=mode, **kwargs) as cassette:
+        yield cassette
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Install the cassette named by LLM_CASSETTE (mode LLM_CASSETTE_MODE, speed LLM_CASSETTE_SPEED)"""
+    path = os.getenv("LLM_CASSETTE")
+    if not path or Cassette._active is not None:
+        return Cassette._active
+    return Cassette(path, mode=os.getenv("LLM_CASSETTE_MODE", "replay"),
+                    speed=float(os.getenv("LLM_CASSETTE_SPEED", "1"))).install()
@@ -0,0 +1,232 @@
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.constants import INTERRUPT, RESUME
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer keeping graph state in a SQLite file.
+
+    A run that stops at an interrupt (e.g. waiting for the user) then lives
+    only on disk: nothing in memory refers to it until it is resumed with its
+    thread id, possibly by another process. Only the newest `keep_last`
+    checkpoints of a thread are kept, which is all resuming needs.
+    """
+
+    def __init__(self, path: str, keep_last: Optional[int] = 5):
+        """
+        Args:
+            path (str): SQLite file, created if missing
+            keep_last (int, optional): Checkpoints kept per thread; None keeps them all. Defaults to 5.
+        """
+        super().__init__()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.keep_last = keep_last
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_id TEXT,
+                checkpoint_type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                value_type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            )""")
+        self.db.commit()
+        self._lock = threading.Lock()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self.db.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self.db.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+            return self._tuple(row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query, parameters = "SELECT * FROM checkpoints WHERE 1 = 1", []
+        if config:
+            query += " AND thread_id = ?"
+            parameters.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                parameters.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                parameters.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            parameters.append(get_checkpoint_id(before))
+        with self._lock:
+            rows = self.db.execute(query + " ORDER BY checkpoint_id DESC", parameters).fetchall()
+            tuples = []
+            for row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                checkpoint_tuple = self._tuple(row)
+                if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                tuples.append(checkpoint_tuple)
+        yield from tuples
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 checkpoint_type, checkpoint_blob, metadata_type, metadata_blob))
+            if self.keep_last is not None:
+                self._prune(thread_id, checkpoint_ns)
+            self.db.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for position, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, position),
+                         channel, value_type, value_blob, task_path))
+        with self._lock:
+            # special channels (errors, interrupts, resumes) overwrite; regular writes are kept as first written
+            self.db.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [row for row in rows if row[4] < 0])
+            self.db.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [row for row in rows if row[4] >= 0])
+            self.db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.db.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self.db.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self.db.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return InMemorySaver.get_next_version(self, current, channel)
+
+    def interrupted(self) -> List[str]:
+        """Threads whose latest checkpoint stopped at an interrupt, i.e. runs waiting for input"""
+        with self._lock:
+            rows = self.db.execute("""
+                SELECT DISTINCT w.thread_id FROM writes w
+                JOIN (SELECT thread_id, checkpoint_ns, MAX(checkpoint_id) AS latest
+                      FROM checkpoints GROUP BY thread_id, checkpoint_ns) c
+                  ON w.thread_id = c.thread_id AND w.checkpoint_ns = c.checkpoint_ns AND w.checkpoint_id = c.latest
+                WHERE w.channel = ?
+                  AND NOT EXISTS (SELECT 1 FROM writes r WHERE r.thread_id = w.thread_id
+                                  AND r.checkpoint_ns = w.checkpoint_ns AND r.checkpoint_id = w.checkpoint_id
+                                  AND r.channel = ?)""", (INTERRUPT, RESUME)).fetchall()
+        return [row[0] for row in rows]
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        oldest_kept = self.db.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?", (thread_id, checkpoint_ns, self.keep_last - 1)).fetchone()
+        if oldest_kept:
+            for table in ("checkpoints", "writes"):
+                self.db.execute(f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                                (thread_id, checkpoint_ns, oldest_kept[0]))
+
+    def _tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        writes = self.db.execute(
+            "SELECT task_id, channel, value_type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((checkpoint_type, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                             "checkpoint_id": parent_id}} if parent_id else None),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((value_type, value)))
+                            for task_id, channel, value_type, value in writes],
+        )
+
+
+_checkpointer: Optional[SqliteCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def checkpoint_store() -> SqliteCheckpointer:
+    """The shared checkpointer, at settings databases.checkpoints"""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            from framework.core.config_manager import settings
+            _checkpointer = SqliteCheckpointer(
+                (settings.get("databases") or {}).get("checkpoints") or "./logs/checkpoints.sqlite3")
+        return _checkpointer
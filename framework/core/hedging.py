@@ -0,0 +1,210 @@
+import asyncio
+import collections
+import contextlib
+import threading
+from typing import AsyncIterator, Deque, Dict, List, Optional, Union
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from framework.core.brains import Models, get_model
+from framework.core.metrics import percentile
+
+
+class HedgeBudget:
+    """
+    Caps hedging at a share of traffic: every call earns `ratio` of a hedge,
+    every hedge spends one, and at most `burst` hedges can be saved up.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.credit = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.credit = min(self.burst, self.credit + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.credit < 1:
+                return False
+            self.credit -= 1
+            return True
+
+
+class _Attempt:
+    """
+    One streamed request, read by its own task: the first chunk resolves
+    `first`, later chunks are queued. Keeping the whole stream in one task
+    keeps the model's context variables in one context.
+    """
+
+    _END = object()
+
+    def __init__(self, llm: Runnable, input, config, kwargs, hedge: bool):
+        self.hedge = hedge
+        self.first: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.rest: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.ensure_future(self._read(llm.astream(input, config, **kwargs)))
+
+    async def _read(self, stream: AsyncIterator) -> None:
+        try:
+            async for chunk in stream:
+                if self.first.done():
+                    self.rest.put_nowait(chunk)
+                else:
+                    self.first.set_result(chunk)
+            if not self.first.done():
+                self.first.set_exception(ValueError("empty response"))
+        except Exception as e:
+            if not self.first.done():
+                self.first.set_exception(e)
+            else:
+                self.rest.put_nowait(e)
+        self.rest.put_nowait(self._END)
+
+    async def chunks(self) -> AsyncIterator:
+        """The chunks after the first one"""
+        while True:
+            item = await self.rest.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    async def cancel(self) -> None:
+        # cancelling the reader closes the HTTP response, so the provider stops generating
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+        if not self.first.done():
+            self.first.cancel()
+        elif not self.first.cancelled():
+            self.first.exception()
+
+
+class HedgedModel(Runnable):
+    """
+    Hedged requests for latency-sensitive calls.
+
+    A call streams from the primary model. If no first token has arrived
+    after the primary's recent `percentile` time to first token, the same
+    request also goes to the backup model; whichever produces a first token
+    first is used and the other request is cancelled. A request failing
+    before its first token leaves the race to the other one (the backup is
+    started straight away if it was not yet). Hedges are limited by a
+    HedgeBudget, so at most about `budget` of the calls cost double.
+
+    Async only: the sync API calls the primary alone, since a blocking call
+    cannot be cancelled once the other one wins.
+    """
+
+    def __init__(self, primary: Union[Models, Runnable], backup: Union[Models, Runnable],
+                 percentile: float = 95, budget: float = 0.1, initial_delay: float = 2.0,
+                 min_delay: float = 0.05, window: int = 200):
+        """
+        Args:
+            primary (Models | Runnable): Model every call goes to first
+            backup (Models | Runnable): Model (ideally another provider) for the hedge
+            percentile (float, optional): Primary TTFT percentile after which to hedge. Defaults to 95.
+            budget (float, optional): Share of calls that may be hedged. Defaults to 0.1.
+            initial_delay (float, optional): Hedge delay until 20 calls have been measured. Defaults to 2.0.
+            min_delay (float, optional): Never hedge sooner than this. Defaults to 0.05.
+            window (int, optional): Recent first-token times kept. Defaults to 200.
+        """
+        self.primary = get_model(primary) if isinstance(primary, Models) else primary
+        self.backup = get_model(backup) if isinstance(backup, Models) else backup
+        self.percentile = percentile
+        self.budget = HedgeBudget(ratio=budget, burst=5.0 if budget > 0 else 0.0)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.first_token_times: Deque[float] = collections.deque(maxlen=window)
+        self.counts: collections.Counter = collections.Counter()
+
+    @classmethod
+    def from_settings(cls, primary: Union[Models, Runnable], section: Dict) -> Runnable:
+        """Wrap `primary` as configured by a settings hedge section, or return it as is if there is none"""
+        if not section or not section.get("backup_model"):
+            return primary
+        return cls(primary, Models(section["backup_model"]),
+                   percentile=section.get("percentile", 95),
+                   budget=section.get("budget", 0.1),
+                   initial_delay=section.get("initial_delay", 2.0))
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary's first token before hedging"""
+        if len(self.first_token_times) < 20:
+            return self.initial_delay
+        return max(self.min_delay, percentile(sorted(self.first_token_times), self.percentile))
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self.counts, delay=self.delay())
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        return self.primary.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        message = None
+        async for chunk in self.astream(input, config, **kwargs):
+            message = chunk if message is None else message + chunk
+        if message is None:
+            return AIMessage(content="")
+        return AIMessage(content=message.content, additional_kwargs=message.additional_kwargs,
+                         response_metadata=message.response_metadata,
+                         usage_metadata=getattr(message, "usage_metadata", None),
+                         tool_calls=getattr(message, "tool_calls", []), id=message.id)
+
+    async def astream(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator:
+        self.budget.earn()
+        self.counts["calls"] += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        attempts: List[_Attempt] = [_Attempt(self.primary, input, config, kwargs, hedge=False)]
+        winner, failed_over = None, False
+        try:
+            await asyncio.wait({attempts[0].first}, timeout=self.delay())
+            if not attempts[0].first.done():
+                if self.budget.spend():
+                    self.counts["hedged"] += 1
+                    attempts.append(_Attempt(self.backup, input, config, kwargs, hedge=True))
+                else:
+                    self.counts["budget_denied"] += 1
+
+            while winner is None:
+                pending = [attempt.first for attempt in attempts if not attempt.first.done()]
+                if pending:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = [attempt for attempt in attempts if attempt.first.done()]
+                winner = next((attempt for attempt in finished if attempt.first.exception() is None), None)
+                if winner is None and len(finished) == len(attempts):
+                    if len(attempts) > 1:
+                        raise attempts[0].first.exception()
+                    # the primary failed outright: fail over rather than hedge
+                    self.counts["failover"] += 1
+                    failed_over = True
+                    attempts.append(_Attempt(self.backup, input, config, kwargs, hedge=True))
+        except BaseException:
+            for attempt in attempts:
+                await attempt.cancel()
+            raise
+
+        for attempt in attempts:
+            if attempt is not winner:
+                await attempt.cancel()
+        if winner.hedge and not failed_over:
+            self.counts["backup_won"] += 1
+        if not failed_over:
+            # when the backup won, the primary's first token would have come later still,
+            # so the time so far is a lower bound of it
+            self.first_token_times.append(loop.time() - started)
+
+        try:
+            yield winner.first.result()
+            async for chunk in winner.chunks():
+                yield chunk
+        finally:
+            await winner.cancel()
@@ -0,0 +1,329 @@
+import asyncio
+import collections
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from framework.core.cassette import CassetteMiss
+
+
+# Used when config/settings.yaml has no rate_limits entry for a provider.
+# None means unlimited.
+DEFAULT_LIMITS = {
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40000, "max_in_flight": 8},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000, "max_in_flight": 16},
+    "groq": {"requests_per_minute": 30, "tokens_per_minute": 6000, "max_in_flight": 4},
+    "ollama": {"requests_per_minute": None, "tokens_per_minute": None, "max_in_flight": 1},
+    "replicate": {"requests_per_minute": 600, "tokens_per_minute": None, "max_in_flight": 4},
+}
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value: str) -> Optional[float]:
+    """
+    Seconds until a rate limit resets, from a reset or retry-after header.
+
+    Handles plain seconds ("20"), OpenAI durations ("6m0s", "250ms") and
+    the RFC 3339 timestamps Anthropic sends.
+    """
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    matches = _DURATION_RE.findall(value)
+    if matches and "".join(number + unit for number, unit in matches) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in matches)
+    try:
+        from datetime import datetime
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, reset_at.timestamp() - time.time())
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute`.
+
+    `reserve` takes the amount straight away, letting the level go negative,
+    and returns how long the caller must wait before going ahead. Callers are
+    therefore served in reservation order and the bucket never over-admits.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # a single request larger than the bucket would otherwise wait forever
+            self.level -= min(amount, self.capacity)
+            wait = -self.level / self.rate if self.level < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or charge (negative) tokens after the fact"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining: float, reset: Optional[float] = None, limit: Optional[float] = None) -> None:
+        """Align with what the provider reports in its rate-limit headers"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.capacity = float(limit)
+                self.rate = limit / 60.0
+            self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset:
+                self.paused_until = max(self.paused_until, now + reset)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class Slots:
+    """
+    Counting semaphore shared by threads and event loops, served FIFO.
+
+    Sync callers block on a threading.Event; async callers await a future
+    resolved on their own loop, so neither ties up the other.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_use = 0
+        self._waiters: "collections.deque" = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.in_use < self.size and not self._waiters:
+                self.in_use += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.size and not self._waiters:
+                self.in_use += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+                    raise
+            # the slot was handed over just as we were cancelled; if the
+            # future was cancelled first, _wake gives the slot back instead
+            if not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                # the slot passes straight to the next waiter, in_use is unchanged
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._wake, future)
+                    return
+            self.in_use -= 1
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class ProviderLimiter:
+    """
+    Requests/min, tokens/min and in-flight limits for one LLM provider.
+
+    Every model returned by get_model for the provider shares one limiter.
+    Limits start from the configuration and are tightened from the
+    provider's rate-limit headers whenever a response carries them; a 429
+    pauses the whole provider until its retry-after instead of letting every
+    in-flight caller retry on its own.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_in_flight: Optional[int] = None,
+                 max_retries: int = 3, expected_output_tokens: int = 500):
+        """
+        Args:
+            provider (str): Provider name, e.g. "anthropic"
+            requests_per_minute (float, optional): Request budget. Defaults to None (unlimited).
+            tokens_per_minute (float, optional): Token budget. Defaults to None (unlimited).
+            max_in_flight (int, optional): Concurrent calls. Defaults to None (unlimited).
+            max_retries (int, optional): Retries after rate-limit or overload errors. Defaults to 3.
+            expected_output_tokens (int, optional): Output tokens reserved per call
+                until the real usage is known. Defaults to 500.
+        """
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.slots = Slots(max_in_flight) if max_in_flight else None
+        self.max_retries = max_retries
+        self.expected_output_tokens = expected_output_tokens
+
+    # Admission
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int) -> None:
+        if self.slots:
+            self.slots.acquire()
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        if self.slots:
+            await self.slots.aacquire()
+        try:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        if self.slots:
+            self.slots.release()
+
+    # Feedback
+
+    def record(self, reserved: int, used: Optional[int], headers: Optional[Mapping[str, str]] = None) -> None:
+        """Settle the token reservation and apply any rate-limit headers"""
+        if self.tokens and used is not None:
+            self.tokens.adjust(reserved - used)
+        if headers:
+            self.apply_headers(headers)
+
+    def apply_headers(self, headers: Mapping[str, str]) -> None:
+        headers = {key.lower(): value for key, value in headers.items()}
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            if bucket is None:
+                continue
+            # OpenAI and Groq: x-ratelimit-remaining-requests, Anthropic: anthropic-ratelimit-requests-remaining
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-remaining")
+            if remaining is None:
+                continue
+            limit = headers.get(f"x-ratelimit-limit-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-limit")
+            reset = headers.get(f"x-ratelimit-reset-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-reset")
+            try:
+                bucket.sync(float(remaining), parse_reset(reset) if reset else None,
+                            float(limit) if limit else None)
+            except ValueError:
+                continue
+
+    def backoff(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying after `error`, or None if the error
+        is not worth retrying (or retries are used up).
+        """
+        if attempt >= self.max_retries or _replay_miss(error):
+            return None
+        response = getattr(error, "response", None)
+        status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+        if status not in RETRYABLE_STATUS and "Connection" not in type(error).__name__:
+            return None
+
+        headers = getattr(response, "headers", None) or {}
+        if headers:
+            self.apply_headers(headers)
+        retry_after = headers.get("retry-after") if headers else None
+        wait = parse_reset(retry_after) if retry_after else None
+        if wait is None:
+            wait = min(30.0, 2.0 ** attempt)
+        if status == 429:
+            # everyone waits, not just this caller
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.pause(wait)
+        return wait
+
+
+def _replay_miss(error: BaseException) -> bool:
+    """A cassette had no recording for the call: retrying will not help"""
+    while error is not None:
+        if isinstance(error, CassetteMiss):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(provider: str) -> ProviderLimiter:
+    """The shared limiter of a provider, configured from settings `rate_limits`"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            from framework.core.config_manager import settings
+            configured = (settings.get("rate_limits") or {}).get(provider) or {}
+            limits = dict(DEFAULT_LIMITS.get(provider, {}), **configured)
+            _limiters[provider] = ProviderLimiter(provider, **limits)
+        return _limiters[provider]
+
+
+def configure_limits(provider: str, **limits) -> ProviderLimiter:
+    """Replace a provider's shared limiter, e.g. to match a different account tier"""
+    with _limiters_lock:
+        _limiters[provider] = ProviderLimiter(provider, **limits)
+        return _limiters[provider]
+
+
+def estimate_tokens(value) -> int:
+    """Rough token count of a prompt: about four characters per token"""
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_tokens(item) for item in value.values())
+    content = getattr(value, "content", None)
+    if content is not None:
+        return estimate_tokens(content)
+    to_messages = getattr(value, "to_messages", None)
+    if to_messages is not None:
+        return estimate_tokens(to_messages())
+    return len(str(value)) // 4 + 1
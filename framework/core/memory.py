@@ -0,0 +1,171 @@
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+
+from framework.core.brains import chunk_text
+from framework.core.limits import estimate_tokens
+
+
+class Entry(NamedTuple):
+    message: BaseMessage
+    tokens: int
+    turn: int
+    words: Set[str]
+
+
+def _words(text: str) -> Set[str]:
+    return {word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2}
+
+
+SUMMARY_PROMPT = """You maintain the running summary of a conversation between a user and an assistant
+that calls tools. Update the summary with the new messages below. Keep facts, names, numbers, decisions,
+tool results that may matter later and open questions; drop pleasantries and repetition.
+Answer with the updated summary only, at most {words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+class ConversationMemory:
+    """
+    Conversation history that fits a token budget however long the session runs.
+
+    Every message is counted once, when added. Messages of the last
+    `recent_turns` turns (a turn starts with each user message) are kept
+    verbatim; once the older ones add up to more than `summarize_after`
+    tokens they are folded into a running summary and dropped. Folding is
+    incremental: the model sees the current summary plus only the messages
+    being folded, so its cost does not grow with the session. Without a
+    model, the summary keeps the first line of each folded message.
+
+    context() packs the prompt: the summary, then messages by relevance
+    (the current turn first, then the others by word overlap with the
+    latest user message and by recency) until the budget is spent, in
+    their original order.
+    """
+
+    def __init__(self, llm: Optional[Runnable] = None, budget_tokens: int = 3000, recent_turns: int = 2,
+                 summary_tokens: int = 400, summarize_after: Optional[int] = None,
+                 count_tokens: Callable[[BaseMessage], int] = estimate_tokens):
+        """
+        Args:
+            llm (Runnable, optional): Model that writes the summary. Defaults to an extractive summary.
+            budget_tokens (int, optional): Size of the packed context, summary included. Defaults to 3000.
+            recent_turns (int, optional): Turns never folded into the summary. Defaults to 2.
+            summary_tokens (int, optional): Size the summary is kept to. Defaults to 400.
+            summarize_after (int, optional): Tokens of older messages that trigger a fold.
+                Defaults to half the budget.
+            count_tokens (Callable, optional): Token counter. Defaults to limits.estimate_tokens.
+        """
+        self.llm = llm
+        self.budget_tokens = budget_tokens
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.summarize_after = summarize_after if summarize_after is not None else budget_tokens // 2
+        self.count_tokens = count_tokens
+        self.entries: List[Entry] = []
+        self.summary = ""
+        self.turn = 0
+        self.folded = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], llm: Optional[Runnable] = None) -> "ConversationMemory":
+        """Build from a `memory` config section (budget_tokens, recent_turns, summary_tokens, summarize_after)"""
+        return cls(llm=llm, **(config or {}))
+
+    def add(self, message: BaseMessage) -> None:
+        with self._lock:
+            if isinstance(message, HumanMessage):
+                self.turn += 1
+            text = chunk_text(message)
+            self.entries.append(Entry(message, self.count_tokens(message), self.turn, _words(text)))
+        if isinstance(message, HumanMessage):
+            self._fold()
+
+    def last(self) -> Optional[BaseMessage]:
+        return self.entries[-1].message if self.entries else None
+
+    def context(self, budget_tokens: Optional[int] = None, query: Optional[str] = None) -> List[BaseMessage]:
+        """The summary and the most relevant messages that fit the budget, oldest first"""
+        budget = budget_tokens if budget_tokens is not None else self.budget_tokens
+        with self._lock:
+            entries = list(self.entries)
+            summary = self.summary
+        if query is None:
+            query = next((chunk_text(entry.message) for entry in reversed(entries)
+                          if isinstance(entry.message, HumanMessage)), "")
+        query_words = _words(query)
+
+        packed: List[BaseMessage] = []
+        if summary:
+            summary_message = SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+            budget -= self.count_tokens(summary_message)
+            packed.append(summary_message)
+
+        def score(position: int) -> float:
+            entry = entries[position]
+            if entry.turn == self.turn:
+                # the current turn goes first, newest message first
+                return 1_000_000 + position
+            overlap = len(entry.words & query_words) / (len(query_words) or 1)
+            recency = (position + 1) / len(entries)
+            return overlap + 0.5 * recency
+
+        chosen = []
+        for position in sorted(range(len(entries)), key=score, reverse=True):
+            if entries[position].tokens <= budget:
+                chosen.append(position)
+                budget -= entries[position].tokens
+        return packed + [entries[position].message for position in sorted(chosen)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "messages": len(self.entries),
+                "tokens": sum(entry.tokens for entry in self.entries),
+                "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+                "folded": self.folded,
+                "turns": self.turn,
+            }
+
+    def _fold(self) -> None:
+        """Fold the messages older than the recent turns into the summary, if they have grown too large"""
+        with self._lock:
+            oldest_kept = self.turn - self.recent_turns + 1
+            older = [entry for entry in self.entries if entry.turn < oldest_kept]
+            if sum(entry.tokens for entry in older) <= self.summarize_after:
+                return
+            summary = self.summary
+        summary = self._summarize(summary, [entry.message for entry in older])
+        with self._lock:
+            # messages added meanwhile belong to later turns, so they are kept
+            self.entries = self.entries[len(older):]
+            self.summary = summary
+            self.folded += len(older)
+
+    def _summarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        lines = [f"{message.type}: {chunk_text(message).strip()}" for message in messages]
+        if self.llm is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(words=self.summary_tokens * 3 // 4, summary=summary or "(none)",
+                                               messages="\n".join(lines))
+                return chunk_text(self.llm.invoke(prompt)).strip()
+            except Exception as e:
+                print(f"Summarising the conversation failed, keeping an extract: {e}")
+        extract = [summary] if summary else []
+        extract += [line.splitlines()[0][:200] for line in lines if line.strip()]
+        # keep the newest lines that fit
+        kept, tokens = [], 0
+        for line in reversed(extract):
+            tokens += estimate_tokens(line)
+            if tokens > self.summary_tokens:
+                break
+            kept.append(line)
+        return "\n".join(reversed(kept))
@@ -0,0 +1,414 @@
+import argparse
+import atexit
+import contextlib
+import contextvars
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+
+# USD per million tokens (input, output). Local models cost nothing; models
+# missing here are metered without a cost.
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-7-sonnet-latest": (3.00, 15.00),
+    "claude-3-5-haiku-latest": (0.80, 4.00),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "deepseek-r1-distill-llama-70b": (0.75, 0.99),
+}
+LOCAL_PROVIDERS = {"ollama"}
+
+_stage = contextvars.ContextVar("llm_stage", default="")
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Tag every model call made inside the block (including tasks and threads
+    started from it) with a caller stage, e.g. "cv.bullets" or "agent.replan".
+    """
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def tagged(name: Optional[str]) -> ContextManager[None]:
+    """stage(name), or the caller's stage if name is None"""
+    return stage(name) if name is not None else contextlib.nullcontext()
+
+
+def current_stage() -> str:
+    return _stage.get()
+
+
+def estimate_cost(model: str, provider: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    if provider in LOCAL_PROVIDERS:
+        return 0.0
+    if model not in PRICES:
+        return None
+    input_price, output_price = PRICES[model]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class MetricsStore:
+    """
+    Append-only SQLite tables of model calls and of agent runs.
+
+    Recording only buffers the row: a background thread writes the buffer
+    every `flush_interval`, so a call metered on the event loop never waits
+    for SQLite. Reads flush first and see every row recorded before them.
+
+    A write that fails for a passing reason (e.g. the database is locked) is
+    retried with the next one; a row SQLite will never take is dropped, so
+    it cannot hold up the rows after it. At most `max_pending` rows per table
+    wait to be written, the oldest are dropped beyond that.
+    """
+
+    COLUMNS = ("ts", "model", "provider", "stage", "input_tokens", "output_tokens", "ttft",
+               "latency", "retries", "cost", "coalesced", "streamed", "error")
+    RUN_COLUMNS = ("ts", "run_id", "exhausted", "calls", "tokens", "seconds", "replans")
+
+    # errors of a row rather than of the database: retrying the row cannot help
+    ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.DataError)
+
+    def __init__(self, path: str, flush_interval: float = 0.5, max_pending: int = 10_000):
+        """
+        Args:
+            path (str): SQLite file, created if missing
+            flush_interval (float, optional): Seconds between background writes. Defaults to 0.5.
+            max_pending (int, optional): Rows per table kept buffered while writes fail. Defaults to 10000.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                ts REAL NOT NULL,
+                model TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                ttft REAL,
+                latency REAL NOT NULL,
+                retries INTEGER NOT NULL,
+                cost REAL,
+                coalesced INTEGER NOT NULL,
+                streamed INTEGER NOT NULL,
+                error TEXT
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS llm_calls_ts ON llm_calls (ts)")
+        # budget usage of each finished agent run; exhausted names the limit that stopped it, if any
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS agent_runs (
+                ts REAL NOT NULL,
+                run_id TEXT NOT NULL,
+                exhausted TEXT,
+                calls INTEGER NOT NULL,
+                tokens INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                replans INTEGER NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS agent_runs_ts ON agent_runs (ts)")
+        self.db.commit()
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.pending: Dict[str, List[list]] = {"llm_calls": [], "agent_runs": []}   # recorded, not written yet
+        self._lock = threading.Lock()              # the connection
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Condition(self._pending_lock)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-store", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, **fields) -> None:
+        self._buffer("llm_calls", [fields.get(column) for column in self.COLUMNS])
+
+    def record_run(self, **fields) -> None:
+        fields.setdefault("ts", time.time())
+        self._buffer("agent_runs", [fields.get(column) for column in self.RUN_COLUMNS])
+
+    def flush(self) -> None:
+        """Write the buffered rows now"""
+        with self._lock:
+            with self._pending_lock:
+                batches, self.pending = self.pending, {table: [] for table in self.pending}
+            if not any(batches.values()):
+                return
+            try:
+                for table, rows in batches.items():
+                    self.db.executemany(self._insert(table), rows)
+                self.db.commit()
+            except self.ROW_ERRORS:
+                self.db.rollback()
+                self._write_each(batches)
+            except sqlite3.Error:
+                self._keep(batches)
+                raise
+
+    def _write_each(self, batches: Dict[str, List[list]]) -> None:
+        """Write the rows one by one, dropping those SQLite refuses"""
+        dropped, error = 0, None
+        try:
+            for table, rows in batches.items():
+                for row in rows:
+                    try:
+                        self.db.execute(self._insert(table), row)
+                    except self.ROW_ERRORS as e:
+                        dropped, error = dropped + 1, e
+            self.db.commit()
+        except sqlite3.Error:
+            self._keep(batches)
+            raise
+        with self._pending_lock:
+            self.dropped += dropped
+        print(f"Dropped {dropped} LLM metrics rows SQLite refused: {str(error)}")
+
+    def _keep(self, batches: Dict[str, List[list]]) -> None:
+        """Nothing of the batch was committed: it stays buffered for the next write"""
+        self.db.rollback()
+        with self._pending_lock:
+            for table, rows in batches.items():
+                self.pending[table] = rows + self.pending[table]
+                self._cap(table)
+
+    def _insert(self, table: str) -> str:
+        columns = self.COLUMNS if table == "llm_calls" else self.RUN_COLUMNS
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def _cap(self, table: str) -> None:
+        excess = len(self.pending[table]) - self.max_pending
+        if excess > 0:
+            del self.pending[table][:excess]
+            self.dropped += excess
+
+    def close(self) -> None:
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._writer.join(timeout=5)
+        self.flush()
+
+    def runs(self, since: Optional[float] = None) -> List[Dict]:
+        self.flush()
+        with self._lock:
+            cursor = self.db.execute("SELECT * FROM agent_runs WHERE ts >= ? ORDER BY ts", (since or 0,))
+            return [dict(zip(self.RUN_COLUMNS, row)) for row in cursor]
+
+    def rows(self, since: Optional[float] = None) -> List[Dict]:
+        self.flush()
+        with self._lock:
+            cursor = self.db.execute("SELECT * FROM llm_calls WHERE ts >= ? ORDER BY ts", (since or 0,))
+            return [dict(zip(self.COLUMNS, row)) for row in cursor]
+
+    def summary(self, since: Optional[float] = None) -> List[Dict]:
+        """Per (model, stage): calls, errors, tokens, cost and latency percentiles"""
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in self.rows(since):
+            groups.setdefault((row["model"], row["stage"] or "-"), []).append(row)
+
+        summary = []
+        for (model, stage_name), rows in sorted(groups.items()):
+            latencies = sorted(row["latency"] for row in rows if not row["error"])
+            ttfts = sorted(row["ttft"] for row in rows if row["ttft"] is not None)
+            costs = [row["cost"] for row in rows if row["cost"] is not None]
+            summary.append({
+                "model": model,
+                "stage": stage_name,
+                "calls": len(rows),
+                "errors": sum(1 for row in rows if row["error"]),
+                "coalesced": sum(row["coalesced"] for row in rows),
+                "retries": sum(row["retries"] for row in rows),
+                "input_tokens": sum(row["input_tokens"] or 0 for row in rows),
+                "output_tokens": sum(row["output_tokens"] or 0 for row in rows),
+                "cost": sum(costs) if costs else None,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "ttft_p50": percentile(ttfts, 50),
+                "ttft_p95": percentile(ttfts, 95),
+            })
+        return summary
+
+    def _buffer(self, table: str, row: list) -> None:
+        with self._pending_lock:
+            self.pending[table].append(row)
+            self._cap(table)
+            if len(self.pending[table]) >= 256:
+                self._wake.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending_lock:
+                if not self._closed:
+                    self._wake.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                # metering must never break the calls it measures; the rows stay buffered
+                print(f"Error writing LLM metrics: {str(e)}")
+            if closed:
+                return
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+_store: Optional[MetricsStore] = None
+_store_lock = threading.Lock()
+
+
+def metrics_store() -> MetricsStore:
+    """The shared store, at settings databases.metrics"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from framework.core.config_manager import settings
+            _store = MetricsStore((settings.get("databases") or {}).get("metrics") or "./logs/metrics.sqlite3")
+        return _store
+
+
+def use_store(store: MetricsStore) -> None:
+    """Send metrics somewhere else, e.g. a temporary store in a benchmark"""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+_listeners: List[Callable[[Dict], None]] = []
+
+
+def add_listener(listener: Callable[[Dict], None]) -> None:
+    """Also hand every finished call's record to `listener` (e.g. the model router)"""
+    _listeners.append(listener)
+
+
+class CallMeter:
+    """Measures one model call and records it when finished"""
+
+    def __init__(self, model: str, provider: str, streamed: bool = False):
+        self.model = model
+        self.provider = provider
+        self.streamed = streamed
+        self.stage = current_stage()
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.retries = 0
+        # set by the call that actually reached the provider
+        self.coalesced = True
+
+    def lead(self) -> None:
+        self.coalesced = False
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self, usage: Optional[Dict] = None, error: Optional[BaseException] = None) -> None:
+        # a coalesced call shared someone else's request and cost nothing
+        usage = {} if self.coalesced else (usage or {})
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        record = dict(
+            ts=time.time(),
+            model=self.model,
+            provider=self.provider,
+            stage=self.stage,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            ttft=self.first_token_at - self.started if self.first_token_at else None,
+            latency=time.perf_counter() - self.started,
+            retries=self.retries,
+            cost=estimate_cost(self.model, self.provider, input_tokens, output_tokens),
+            coalesced=int(self.coalesced),
+            streamed=int(self.streamed),
+            error=f"{type(error).__name__}: {error}" if error else None,
+        )
+        try:
+            metrics_store().record(**record)
+        except sqlite3.Error as e:
+            # metering must never break the call it measures
+            print(f"Error recording LLM metrics: {str(e)}")
+        for listener in _listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                print(f"Error in LLM metrics listener: {str(e)}")
+
+
+_SINCE_RE = re.compile(r"^(\d+(?:\.\d+)?)([mhd])$")
+
+
+def _parse_since(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    match = _SINCE_RE.match(value)
+    if not match:
+        raise argparse.ArgumentTypeError("use e.g. 30m, 12h or 7d")
+    return time.time() - float(match.group(1)) * {"m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+
+def _format(value, pattern: str) -> str:
+    return "-" if value is None else pattern.format(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarise LLM calls per model and stage")
+    parser.add_argument("--since", help="only calls in the last 30m / 12h / 7d")
+    parser.add_argument("--db", help="metrics SQLite file (defaults to settings databases.metrics)")
+    parser.add_argument("--runs", action="store_true", help="list the budget usage of agent runs instead")
+    args = parser.parse_args()
+
+    store = MetricsStore(args.db) if args.db else metrics_store()
+    if args.runs:
+        _print_runs(store.runs(since=_parse_since(args.since)))
+        return
+    rows = store.summary(since=_parse_since(args.since))
+    if not rows:
+        print("No LLM calls recorded")
+        return
+
+    print(f"{'model':30} {'stage':18} {'calls':>6} {'err':>4} {'coal':>5} {'retry':>5} "
+          f"{'in tok':>9} {'out tok':>8} {'cost $':>8} {'p50 s':>7} {'p95 s':>7} {'ttft50':>7} {'ttft95':>7}")
+    for row in rows:
+        print(f"{row['model'][:30]:30} {row['stage'][:18]:18} {row['calls']:>6} {row['errors']:>4} "
+              f"{row['coalesced']:>5} {row['retries']:>5} {row['input_tokens']:>9} {row['output_tokens']:>8} "
+              f"{_format(row['cost'], '{:.4f}'):>8} {_format(row['latency_p50'], '{:.2f}'):>7} "
+              f"{_format(row['latency_p95'], '{:.2f}'):>7} {_format(row['ttft_p50'], '{:.2f}'):>7} "
+              f"{_format(row['ttft_p95'], '{:.2f}'):>7}")
+    costs = [row["cost"] for row in rows if row["cost"] is not None]
+    print(f"\n{sum(row['calls'] for row in rows)} calls, ${sum(costs):.4f} estimated")
+
+
+def _print_runs(runs: List[Dict]) -> None:
+    if not runs:
+        print("No agent runs recorded")
+        return
+
+    print(f"{'run':32} {'exhausted':>9} {'calls':>6} {'tokens':>8} {'seconds':>8} {'replans':>7}")
+    for run in runs:
+        print(f"{run['run_id'][:32]:32} {run['exhausted'] or '-':>9} {run['calls']:>6} {run['tokens']:>8} "
+              f"{run['seconds']:>8.1f} {run['replans']:>7}")
+    exhausted = sum(1 for run in runs if run["exhausted"])
+    print(f"\n{len(runs)} runs, {exhausted} stopped by their budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+import atexit
+import glob
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+
+# Words too common to tell lessons apart
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "was", "were", "are", "not", "but", "has", "have",
+    "had", "its", "into", "than", "then", "when", "what", "which", "who", "will", "would", "could",
+    "should", "can", "you", "your", "our", "they", "them", "their", "there", "been", "being", "also",
+}
+
+
+def terms(text: str) -> Set[str]:
+    """Index terms of a text: lower-cased words of three letters or more, without stopwords"""
+    return {word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2 and word not in STOPWORDS}
+
+
+class Location(NamedTuple):
+    segment: int    # 0 is the file being written, n the n-th rotated file
+    offset: int
+    length: int
+    run_id: str
+    kind: str
+
+
+class ReflectionLog:
+    """
+    Append-only JSON-lines log of agent reflections (lessons, outcomes, errors).
+
+    Writes are buffered and done by a background thread, so append() does
+    not wait for the disk; entries are readable as soon as they are appended. The
+    file is rotated once it reaches `max_bytes`, and once there are more than
+    `max_segments` rotated files they are compacted into one, keeping the
+    newest `max_entries` entries and one copy of repeated lessons.
+
+    Every file has an index next to it (.idx, one line per entry: id, offset,
+    length, run id, kind and index terms), so opening the log does not read
+    the entries, and tail(), for_run() and get() seek straight to the lines
+    they need. search() ranks entries by the terms they share with a query
+    (an inverted index, weighted by inverse document frequency) and only
+    reads the few it returns.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 8_000_000, max_segments: int = 4,
+                 max_entries: int = 100_000, flush_interval: float = 0.5, cache_entries: int = 1024):
+        """
+        Args:
+            path (str): JSON-lines file, created if missing
+            max_bytes (int, optional): Size at which the file is rotated. Defaults to 8 MB.
+            max_segments (int, optional): Rotated files kept before compaction. Defaults to 4.
+            max_entries (int, optional): Entries kept by compaction. Defaults to 100000.
+            flush_interval (float, optional): Seconds between background writes. Defaults to 0.5.
+            cache_entries (int, optional): Entries kept decoded in memory. Defaults to 1024.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.locations: Dict[int, Location] = {}     # by entry id, in id order
+        self.runs: Dict[str, List[int]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.entry_terms: Dict[int, Set[str]] = {}
+        self.pending: List[Dict] = []                # appended, not written yet
+        self.writing: List[Dict] = []                # being written by flush()
+        self.next_id = 1
+        self.counts = Counter()
+        self._cache: "OrderedDict[int, Dict]" = OrderedDict()
+        self._cache_entries = cache_entries
+        self._readers: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        # oldest first: rotated files in order, then the current one
+        for segment in sorted(self._segments(), key=lambda segment: segment or math.inf):
+            self._load(segment)
+        self._writer = threading.Thread(target=self._write_loop, name="reflection-log", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # Writing
+
+    def append(self, text: str, run_id: str = "", kind: str = "lesson", **fields) -> int:
+        """Add an entry and return its id; it is written to disk in the background"""
+        with self._lock:
+            entry = {"id": self.next_id, "ts": time.time(), "run_id": run_id, "kind": kind, "text": text, **fields}
+            self.next_id += 1
+            self.pending.append(entry)
+            self._index(entry["id"], None, run_id, kind, terms(text))
+            self._remember(entry)
+            self.counts["appended"] += 1
+            if len(self.pending) >= 256:
+                self._wake.notify()
+            return entry["id"]
+
+    def flush(self) -> None:
+        """Write the buffered entries now"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self.pending = self.pending, []
+                self.writing = entries
+                rows = [(entry, (json.dumps(entry, default=str) + "\n").encode(), sorted(self.entry_terms[entry["id"]]))
+                        for entry in entries]
+            if not entries:
+                return
+            locations, written = [], 0
+            try:
+                size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                with open(self.path, "ab") as data, open(self._index_path(0), "a") as index:
+                    for entry, line, entry_terms in rows:
+                        data.write(line)
+                        index.write(json.dumps([entry["id"], size, len(line), entry["run_id"], entry["kind"],
+                                                entry_terms]) + "\n")
+                        locations.append((entry["id"], Location(0, size, len(line), entry["run_id"], entry["kind"])))
+                        size += len(line)
+                        written += 1
+            finally:
+                with self._lock:
+                    for entry_id, location in locations:
+                        if entry_id in self.locations:
+                            self.locations[entry_id] = location
+                    # what could not be written stays buffered
+                    self.pending = entries[written:] + self.pending
+                    self.writing = []
+                    self.counts["written"] += written
+            if size >= self.max_bytes:
+                with self._lock:
+                    self._rotate()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._lock:
+            for reader in self._readers.values():
+                os.close(reader)
+            self._readers.clear()
+
+    # Reading
+
+    def get(self, entry_id: int) -> Optional[Dict]:
+        with self._lock:
+            if entry_id in self._cache:
+                self._cache.move_to_end(entry_id)
+                return self._cache[entry_id]
+            location = self.locations.get(entry_id)
+            if location is None:
+                return None
+            if location.offset < 0:
+                # not written yet
+                return next((entry for entry in self.pending + self.writing if entry["id"] == entry_id), None)
+            line = os.pread(self._reader(location.segment), location.length, location.offset)
+            self.counts["reads"] += 1
+            entry = json.loads(line)
+            self._remember(entry)
+            return entry
+
+    def tail(self, n: int = 10, kind: Optional[str] = None) -> List[Dict]:
+        """The last n entries (of a kind), oldest first"""
+        with self._lock:
+            ids = []
+            for entry_id in reversed(self.locations):
+                if kind is None or self.locations[entry_id].kind == kind:
+                    ids.append(entry_id)
+                    if len(ids) == n:
+                        break
+            return [self.get(entry_id) for entry_id in reversed(ids)]
+
+    def for_run(self, run_id: str) -> List[Dict]:
+        """The entries of one run, oldest first"""
+        with self._lock:
+            return [self.get(entry_id) for entry_id in self.runs.get(run_id, []) if entry_id in self.locations]
+
+    def search(self, query: str, limit: int = 3, kinds: Optional[Set[str]] = None) -> List[Dict]:
+        """The entries sharing the most (and the rarest) terms with the query, best first"""
+        with self._lock:
+            scores: Counter = Counter()
+            total = len(self.locations) or 1
+            for term in terms(query):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                weight = math.log(1 + total / len(posting))
+                for entry_id in posting:
+                    scores[entry_id] += weight
+            if kinds is not None:
+                scores = {entry_id: score for entry_id, score in scores.items()
+                          if self.locations[entry_id].kind in kinds}
+            # ties go to the newest entry
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+            return [self.get(entry_id) for entry_id, _ in best]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self.locations), "pending": len(self.pending), "runs": len(self.runs),
+                    "terms": len(self.postings), "segments": len(self._segments()), **self.counts}
+
+    # Files and index
+
+    def _segments(self) -> List[int]:
+        rotated = [int(name.rsplit(".", 1)[1]) for name in glob.glob(glob.escape(self.path) + ".*")
+                   if name.rsplit(".", 1)[1].isdigit()]
+        return ([0] if os.path.exists(self.path) else []) + sorted(rotated)
+
+    def _segment_path(self, segment: int) -> str:
+        return self.path if segment == 0 else f"{self.path}.{segment}"
+
+    def _index_path(self, segment: int) -> str:
+        return self._segment_path(segment) + ".idx"
+
+    def _reader(self, segment: int) -> int:
+        if segment not in self._readers:
+            self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        return self._readers[segment]
+
+    def _drop_reader(self, segment: int) -> None:
+        reader = self._readers.pop(segment, None)
+        if reader is not None:
+            os.close(reader)
+
+    def _index(self, entry_id: int, location: Optional[Location], run_id: str, kind: str,
+               entry_terms: Set[str]) -> None:
+        self.locations[entry_id] = location or Location(0, -1, 0, run_id, kind)
+        self.runs.setdefault(run_id, []).append(entry_id)
+        self.entry_terms[entry_id] = entry_terms
+        for term in entry_terms:
+            self.postings.setdefault(term, set()).add(entry_id)
+        self.next_id = max(self.next_id, entry_id + 1)
+
+    def _unindex(self, entry_id: int) -> None:
+        location = self.locations.pop(entry_id)
+        run = self.runs.get(location.run_id, [])
+        if entry_id in run:
+            run.remove(entry_id)
+            if not run:
+                del self.runs[location.run_id]
+        for term in self.entry_terms.pop(entry_id, ()):
+            posting = self.postings[term]
+            posting.discard(entry_id)
+            if not posting:
+                del self.postings[term]
+        self._cache.pop(entry_id, None)
+
+    def _remember(self, entry: Dict) -> None:
+        self._cache[entry["id"]] = entry
+        self._cache.move_to_end(entry["id"])
+        while len(self._cache) > self._cache_entries:
+            self._cache.popitem(last=False)
+
+    def _load(self, segment: int) -> None:
+        """Index a file from its .idx, or rebuild the .idx if it does not cover the whole file"""
+        size = os.path.getsize(self._segment_path(segment))
+        rows = []
+        if os.path.exists(self._index_path(segment)):
+            with open(self._index_path(segment)) as index:
+                rows = [json.loads(line) for line in index if line.endswith("\n")]
+        if not rows or rows[-1][1] + rows[-1][2] != size:
+            rows = self._rebuild_index(segment)
+        for entry_id, offset, length, run_id, kind, entry_terms in rows:
+            self._index(entry_id, Location(segment, offset, length, run_id, kind), run_id, kind, set(entry_terms))
+
+    def _rebuild_index(self, segment: int) -> List[list]:
+        rows, offset = [], 0
+        with open(self._segment_path(segment), "rb") as data:
+            for line in data:
+                if line.endswith(b"\n"):
+                    try:
+                        entry = json.loads(line)
+                        rows.append([entry["id"], offset, len(line), entry.get("run_id", ""),
+                                     entry.get("kind", ""), sorted(terms(entry.get("text", "")))])
+                    except (ValueError, KeyError):
+                        pass
+                offset += len(line)
+        self._write_index(segment, rows)
+        self.counts["rebuilt"] += 1
+        return rows
+
+    def _write_index(self, segment: int, rows: List[list]) -> None:
+        with open(self._index_path(segment) + ".tmp", "w") as index:
+            index.writelines(json.dumps(row) + "\n" for row in rows)
+        os.replace(self._index_path(segment) + ".tmp", self._index_path(segment))
+
+    def _rotate(self) -> None:
+        """Move the current file aside as the newest rotated file"""
+        segment = max(self._segments()) + 1
+        self._drop_reader(0)
+        os.replace(self._index_path(0), self._index_path(segment))
+        os.replace(self.path, self._segment_path(segment))
+        for entry_id, location in self.locations.items():
+            if location.segment == 0 and location.offset >= 0:
+                self.locations[entry_id] = location._replace(segment=segment)
+        self.counts["rotations"] += 1
+        if sum(1 for segment in self._segments() if segment) > self.max_segments:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Merge the rotated files into one, keeping the newest entries and the last copy of a lesson"""
+        rotated = [segment for segment in self._segments() if segment != 0]
+        in_files = [entry_id for entry_id, location in self.locations.items() if location.segment in rotated]
+        in_current = sum(1 for location in self.locations.values() if location.segment not in rotated)
+        keep_count = max(0, self.max_entries - in_current)
+        kept, seen, dropped = [], set(), []
+        for entry_id in reversed(in_files):
+            entry = self.get(entry_id)
+            key = (entry.get("kind"), entry.get("text")) if entry.get("kind") == "lesson" else None
+            if len(kept) >= keep_count or (key is not None and key in seen):
+                dropped.append(entry_id)
+                continue
+            seen.add(key)
+            kept.append(entry)
+        kept.reverse()
+
+        target = max(rotated) + 1
+        rows, offset = [], 0
+        with open(self._segment_path(target), "wb") as data:
+            for entry in kept:
+                line = (json.dumps(entry, default=str) + "\n").encode()
+                data.write(line)
+                rows.append([entry["id"], offset, len(line), entry.get("run_id", ""), entry.get("kind", ""),
+                             sorted(self.entry_terms[entry["id"]])])
+                offset += len(line)
+        self._write_index(target, rows)
+        for entry_id, offset, length, run_id, kind, _ in rows:
+            self.locations[entry_id] = Location(target, offset, length, run_id, kind)
+        for entry_id in dropped:
+            self._unindex(entry_id)
+        for segment in rotated:
+            self._drop_reader(segment)
+            os.remove(self._segment_path(segment))
+            os.remove(self._index_path(segment))
+        # keep rotated files numbered 1.. so the next rotation continues after them
+        os.replace(self._segment_path(target), self._segment_path(1))
+        os.replace(self._index_path(target), self._index_path(1))
+        for entry_id, _, _, _, _, _ in rows:
+            self.locations[entry_id] = self.locations[entry_id]._replace(segment=1)
+        self.counts["compactions"] += 1
+        self.counts["compacted_away"] += len(dropped)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._closed:
+                    self._wake.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except OSError as e:
+                # the log must never break the agent writing to it; the entries stay buffered
+                print(f"Error writing reflection log: {str(e)}")
+            if closed:
+                return
+
+
+_log: Optional[ReflectionLog] = None
+_log_lock = threading.Lock()
+
+
+def reflection_log() -> ReflectionLog:
+    """The shared log, at settings databases.reflection_log"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            from framework.core.config_manager import settings
+            _log = ReflectionLog((settings.get("databases") or {}).get("reflection_log") or "./logs/reflection.jsonl")
+        return _log
+
+
+def use_log(log: ReflectionLog) -> None:
+    """Send reflections somewhere else, e.g. a temporary log in a benchmark"""
+    global _log
+    with _log_lock:
+        _log = log
@@ -0,0 +1,273 @@
+import collections
+import threading
+import time
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from framework.core.brains import Models, get_model
+from framework.core.metrics import add_listener, percentile
+
+
+class RequestClass(NamedTuple):
+    """A kind of call: its p95 latency objective (seconds) and the models allowed to serve it"""
+    name: str
+    slo_p95: float
+    models: Tuple[Models, ...]
+
+
+class ModelHealth:
+    """
+    Rolling latency and error-rate statistics for one model, plus its circuit breaker.
+
+    Statistics cover the last `window` calls that are at most `max_age`
+    seconds old, so a model that was slow an hour ago gets measured afresh.
+
+    The breaker opens after `failure_threshold` failures in a row, or once the
+    error rate over at least `min_samples` calls exceeds `max_error_rate`. An
+    open breaker keeps the model out for `cooldown` seconds, then lets one
+    probe call through (half-open): success closes it, failure re-opens it for
+    twice as long, up to `max_cooldown`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window: int = 50, max_age: float = 600.0, min_samples: int = 5,
+                 failure_threshold: int = 3, max_error_rate: float = 0.5,
+                 cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.samples: Deque[Tuple[float, float, bool]] = collections.deque(maxlen=window)
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.failures_in_a_row = 0
+        self.probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float, ok: bool, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.samples.append((now, latency, ok))
+            probe = self.state == self.HALF_OPEN
+            self.probe_started = None
+            if ok:
+                self.failures_in_a_row = 0
+                if probe:
+                    # start over: the failures that opened the breaker are history
+                    self.samples.clear()
+                    self.samples.append((now, latency, ok))
+                    self.state, self.cooldown = self.CLOSED, self.base_cooldown
+                return
+            self.failures_in_a_row += 1
+            if probe:
+                self._open(now, min(self.max_cooldown, self.cooldown * 2))
+                return
+            recent = self._recent(now)
+            errors = sum(1 for _, _, sample_ok in recent if not sample_ok)
+            if (self.failures_in_a_row >= self.failure_threshold
+                    or (len(recent) >= self.min_samples and errors / len(recent) > self.max_error_rate)):
+                self._open(now, self.cooldown)
+
+    def _open(self, now: float, cooldown: float) -> None:
+        self.state, self.opened_at, self.cooldown = self.OPEN, now, cooldown
+
+    def _recent(self, now: float) -> List[Tuple[float, float, bool]]:
+        return [sample for sample in self.samples if now - sample[0] <= self.max_age]
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """Whether the model may take a call now (an open breaker lets a single probe through)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            # a probe that never reported back (cancelled, coalesced) does not block forever
+            return self.state == self.HALF_OPEN and (
+                self.probe_started is None or now - self.probe_started >= self.cooldown)
+
+    def admit(self, now: Optional[float] = None) -> None:
+        """Note that a call is going to this model"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_started = time.monotonic() if now is None else now
+
+    def reopens_in(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return 0.0 if self.state == self.CLOSED else max(0.0, self.opened_at + self.cooldown - now)
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            recent = self._recent(now)
+            state = self.state
+        latencies = sorted(latency for _, latency, ok in recent if ok)
+        return {
+            "samples": len(recent),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "error_rate": sum(1 for _, _, ok in recent if not ok) / len(recent) if recent else 0.0,
+            "state": state,
+        }
+
+
+class ModelRouter:
+    """
+    Picks the model for a call from live measurements.
+
+    Every metered model call (see metrics.CallMeter) feeds the ModelHealth of
+    its model: latency for plain calls, time to first token for streamed ones,
+    and whether it failed. For a request class the router ranks the allowed
+    models whose breaker is closed:
+
+    1. models with too few recent samples, in the class's order, so new and
+       long-idle models get measured;
+    2. models whose p95 meets the class SLO, fastest p50 first;
+    3. the remaining healthy models, lowest p95 first.
+
+    If every breaker is open the class still gets an answer: the models whose
+    breakers reopen soonest.
+    """
+
+    def __init__(self, **health_settings):
+        """
+        Args:
+            **health_settings: ModelHealth parameters (window, cooldown, ...) for every model
+        """
+        self.health_settings = health_settings
+        self.health: Dict[str, ModelHealth] = {}
+        self.classes: Dict[str, RequestClass] = {}
+        self.clients: Dict[Models, Runnable] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model: str) -> ModelHealth:
+        with self._lock:
+            if model not in self.health:
+                self.health[model] = ModelHealth(**self.health_settings)
+            return self.health[model]
+
+    def observe(self, record: Dict) -> None:
+        """Metrics listener: one finished model call"""
+        if record["coalesced"]:
+            return
+        latency = record["ttft"] if record["streamed"] and record["ttft"] is not None else record["latency"]
+        self._health(record["model"]).observe(latency, record["error"] is None)
+
+    def request_class(self, request_class: Union[str, RequestClass]) -> RequestClass:
+        """A RequestClass, looked up by name in those registered or in settings routing.<name>"""
+        if isinstance(request_class, RequestClass):
+            return request_class
+        if request_class not in self.classes:
+            from framework.core.config_manager import settings
+            configured = (settings.get("routing") or {}).get(request_class)
+            if not configured:
+                raise ValueError(f"Unknown request class: {request_class}")
+            self.register(RequestClass(request_class, float(configured["slo_p95"]),
+                                       tuple(Models(model) for model in configured["models"])))
+        return self.classes[request_class]
+
+    def register(self, request_class: RequestClass) -> None:
+        self.classes[request_class.name] = request_class
+
+    def candidates(self, request_class: Union[str, RequestClass]) -> List[Models]:
+        """Allowed models, best first (see the class docstring)"""
+        request_class = self.request_class(request_class)
+        now = time.monotonic()
+        unmeasured, meeting, missing = [], [], []
+        for model in request_class.models:
+            health = self._health(model.value)
+            if not health.available(now):
+                continue
+            stats = health.stats(now)
+            if stats["samples"] < health.min_samples or stats["p95"] is None:
+                unmeasured.append(model)
+            elif stats["p95"] <= request_class.slo_p95:
+                meeting.append((stats["p50"], model))
+            else:
+                missing.append((stats["p95"], model))
+        ranked = unmeasured + [model for _, model in sorted(meeting, key=lambda item: item[0])] \
+            + [model for _, model in sorted(missing, key=lambda item: item[0])]
+        if ranked:
+            return ranked
+        return sorted(request_class.models, key=lambda model: self._health(model.value).reopens_in(now))
+
+    def pick(self, request_class: Union[str, RequestClass]) -> Models:
+        """The model a call of this class should go to now"""
+        model = self.candidates(request_class)[0]
+        self._health(model.value).admit()
+        return model
+
+    def client(self, model: Models) -> Runnable:
+        """The (cached) client for a model"""
+        with self._lock:
+            if model not in self.clients:
+                self.clients[model] = get_model(model)
+            return self.clients[model]
+
+    def use_client(self, model: Models, client: Runnable) -> None:
+        """Serve `model` with a client of your own (e.g. pointed at a local stand-in)"""
+        with self._lock:
+            self.clients[model] = client
+
+    def stats(self) -> Dict[str, Dict]:
+        """Rolling statistics and breaker state per model"""
+        with self._lock:
+            health = dict(self.health)
+        return {model: model_health.stats() for model, model_health in health.items()}
+
+
+class RoutedModel(Runnable):
+    """
+    A Runnable that sends each call to the model the router picks for its
+    request class. A call that fails is retried once on the next candidate,
+    so an outage costs latency rather than the answer.
+    """
+
+    def __init__(self, request_class: Union[str, RequestClass], router: Optional[ModelRouter] = None,
+                 attempts: int = 2):
+        self.router = router or default_router
+        self.request_class = self.router.request_class(request_class)
+        self.attempts = attempts
+
+    def _plan(self) -> List[Models]:
+        return self.router.candidates(self.request_class)[:self.attempts]
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        plan = self._plan()
+        for position, model in enumerate(plan):
+            self.router._health(model.value).admit()
+            try:
+                return self.router.client(model).invoke(input, config, **kwargs)
+            except Exception:
+                if position == len(plan) - 1:
+                    raise
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        plan = self._plan()
+        for position, model in enumerate(plan):
+            self.router._health(model.value).admit()
+            try:
+                return await self.router.client(model).ainvoke(input, config, **kwargs)
+            except Exception:
+                if position == len(plan) - 1:
+                    raise
+
+
+# Fed by every metered model call
+default_router = ModelRouter()
+add_listener(default_router.observe)
+
+
+def route(request_class: Union[str, RequestClass]) -> RoutedModel:
+    """A model that routes every call of this request class (e.g. "interactive")"""
+    return RoutedModel(request_class)
+
+
+def routing_stats() -> Dict[str, Dict]:
+    return default_router.stats()
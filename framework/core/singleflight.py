@@ -0,0 +1,89 @@
+import asyncio
+import copy
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls that overlap in time.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and receive a copy of its result, or
+    its exception. Nothing is kept once the call completes, so unlike a cache
+    this is safe for high-temperature calls: only requests that were already
+    racing each other share an answer.
+
+    Sync and async callers, on any thread or event loop, share the same
+    flights.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+    def _join(self, key: str, label: str):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            self.counts[(label, "leader" if leader else "coalesced")] += 1
+            return flight, leader
+
+    def _land(self, key: str) -> None:
+        with self._lock:
+            del self._flights[key]
+
+    def do(self, key: str, call: Callable[[], Any], label: str = "") -> Any:
+        """Run `call`, or wait for the identical call already in flight"""
+        flight, leader = self._join(key, label)
+        if not leader:
+            return copy.deepcopy(flight.result())
+        try:
+            result = call()
+        except BaseException as e:
+            self._land(key)
+            flight.set_exception(e)
+            raise
+        self._land(key)
+        flight.set_result(result)
+        return result
+
+    async def ado(self, key: str, call: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """Async `do`. A cancelled caller does not cancel the call others are waiting on"""
+        flight, leader = self._join(key, label)
+        if leader:
+            task = asyncio.ensure_future(call())
+
+            def land(task: asyncio.Task) -> None:
+                self._land(key)
+                if task.cancelled():
+                    flight.cancel()
+                elif task.exception() is not None:
+                    flight.set_exception(task.exception())
+                else:
+                    flight.set_result(task.result())
+
+            task.add_done_callback(land)
+            return await asyncio.shield(task)
+        return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(flight)))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Leader and coalesced call counts per label (model)"""
+        stats: Dict[str, Dict[str, int]] = {}
+        for (label, role), count in self.counts.items():
+            stats.setdefault(label, {"leader": 0, "coalesced": 0})[role] = count
+        return stats
+
+
+# Shared by every model returned by get_model
+flights = SingleFlight()
+
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Per-model counts of calls that ran (leader) and calls that shared one (coalesced)"""
+    return flights.stats()
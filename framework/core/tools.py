@@ -0,0 +1,171 @@
+import copy
+import inspect
+import re
+import weakref
+from types import MethodType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, Field, create_model
+
+
+class ToolSpec(NamedTuple):
+    name: str                   # name the model calls the tool by
+    attribute: str              # method name on the class
+    function: Callable          # the undecorated function
+    description: str            # description override, or the docstring
+    explicit_description: bool
+    use_context: bool           # first argument after self is a pydantic-ai RunContext
+    signature: inspect.Signature  # without self (and the context)
+    args_model: type            # pydantic model of the arguments
+    parameters: Dict[str, Any]  # JSON schema of the arguments
+
+
+# Tool specs of every Toolbox class, by class and tool name, filled in at class definition
+registry: Dict[type, Dict[str, ToolSpec]] = {}
+
+# pydantic-ai Tools are built once per class tool and copied per instance
+_pydantic_ai_templates: Dict[Tuple[type, str], Any] = {}
+
+
+def tool_to_call(name=None, description=None, use_context: bool = False):
+    """
+    Mark a method as a tool for the LLM to call. Works bare (@tool_to_call) or
+    with arguments (@tool_to_call(name=..., description=...)).
+
+    Args:
+        name: Optional name override for the tool
+        description: Optional description override for the tool
+        use_context: The tool takes a pydantic-ai RunContext after self
+    """
+    def decorator(func):
+        # Add markers to the function
+        func._is_tool = True
+        func._tool_name = name
+        func._tool_description = description
+        func._use_context = use_context
+        return func
+
+    if callable(name):
+        func, name = name, None
+        return decorator(func)
+    return decorator
+
+
+def _argument_descriptions(doc: str) -> Dict[str, str]:
+    """Argument descriptions from the Args: section of a Google-style docstring"""
+    descriptions = {}
+    section = re.search(r"^\s*Args:\s*\n(.*?)(?:^\s*\w+:\s*\n|\Z)", doc, re.MULTILINE | re.DOTALL)
+    for line in (section.group(1).splitlines() if section else []):
+        match = re.match(r"\s*(\w+)(?:\s*\([^)]*\))?:\s*(.+)", line)
+        if match:
+            descriptions[match.group(1)] = match.group(2).strip()
+    return descriptions
+
+
+def _spec(owner: type, attribute: str, func: Callable) -> ToolSpec:
+    doc = inspect.cleandoc(func.__doc__ or "")
+    parameters = list(inspect.signature(func).parameters.values())[1:]  # drop self
+    if func._use_context:
+        parameters = parameters[1:]
+    arguments = _argument_descriptions(doc)
+    fields = {
+        parameter.name: (
+            Any if parameter.annotation is inspect.Parameter.empty else parameter.annotation,
+            Field(... if parameter.default is inspect.Parameter.empty else parameter.default,
+                  description=arguments.get(parameter.name)),
+        )
+        for parameter in parameters
+        if parameter.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+    }
+    name = func._tool_name or attribute
+    args_model = create_model(f"{owner.__name__}_{name}", __base__=BaseModel, **fields)
+    return ToolSpec(
+        name=name,
+        attribute=attribute,
+        function=func,
+        description=func._tool_description or doc or "No description available",
+        explicit_description=func._tool_description is not None,
+        use_context=func._use_context,
+        signature=inspect.Signature(parameters),
+        args_model=args_model,
+        parameters=args_model.model_json_schema(),
+    )
+
+
+class Toolbox:
+    """
+    Base for agents whose tools are methods marked with @tool_to_call.
+
+    The tools of a class are found once, when the class is defined, and their
+    signatures, argument schemas and descriptions are kept in `registry`, so
+    creating an agent neither walks its attributes nor parses its source.
+    Subclasses inherit their bases' tools and may override or unmark them.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        specs: Dict[str, ToolSpec] = {}
+        for base in reversed(cls.__mro__[1:]):
+            specs.update(registry.get(base, {}))
+        for attribute, value in vars(cls).items():
+            # an attribute redefined here replaces the inherited tool of that name
+            specs = {name: spec for name, spec in specs.items() if spec.attribute != attribute}
+            if getattr(value, "_is_tool", False):
+                spec = _spec(cls, attribute, value)
+                specs[spec.name] = spec
+        registry[cls] = specs
+        cls._tool_descriptions = "\n\n".join(f"{spec.name}: {spec.description}" for spec in specs.values())
+
+    @classmethod
+    def tool_specs(cls) -> Dict[str, ToolSpec]:
+        return registry.get(cls, {})
+
+    @classmethod
+    def tool_descriptions(cls) -> str:
+        """"name: description" of every tool, for prompts"""
+        return getattr(cls, "_tool_descriptions", "")
+
+    def bound_tools(self) -> Dict[str, Callable]:
+        """The tools bound to this instance, by tool name"""
+        return {name: getattr(self, spec.attribute) for name, spec in self.tool_specs().items()}
+
+    def langchain_tools(self) -> List[Any]:
+        """The tools as LangChain StructuredTools, using the cached argument schemas"""
+        from langchain_core.tools import StructuredTool
+
+        tools = []
+        for name, spec in self.tool_specs().items():
+            method = getattr(self, spec.attribute)
+            is_async = inspect.iscoroutinefunction(spec.function)
+            tools.append(StructuredTool(
+                name=name,
+                description=spec.description,
+                args_schema=spec.args_model,
+                func=None if is_async else method,
+                coroutine=method if is_async else None,
+            ))
+        return tools
+
+    def pydantic_ai_tools(self) -> List[Any]:
+        """
+        The tools as pydantic-ai Tools. The function schema of a tool is built
+        for the first instance of a class and reused (copied) for the others.
+        """
+        from pydantic_ai.tools import Tool
+
+        tools = []
+        for name, spec in self.tool_specs().items():
+            key = (type(self), name)
+            if key not in _pydantic_ai_templates:
+                # bound for the signature only (without self); the cache must not keep the instance alive
+                _pydantic_ai_templates[key] = Tool(
+                    MethodType(spec.function, weakref.proxy(self)),
+                    takes_ctx=spec.use_context,
+                    name=name,
+                    description=spec.description if spec.explicit_description else None,
+                )
+            tool = copy.copy(_pydantic_ai_templates[key])
+            tool.function = getattr(self, spec.attribute)
+            tool.current_retry = 0
+            tools.append(tool)
+        return tools
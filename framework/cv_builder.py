@@ -1,13 +1,39 @@
+import asyncio
+from typing import AsyncIterator, Iterator, Tuple
+from framework.core.brains import ainvoke_many, astream_text, invoke_many, merge_streams, stream_text
+from framework.core.cascade import ValidationFailed, all_of, length, lines
+from framework.core.metrics import stage
 from framework.core.config_manager import master_cv_bullets, master_cv, settings
 
+
+def _tagline_format(output)-> None:
+    """Six pipe-delimited sections of a few words each, on one line"""
+    text = output.content if hasattr(output, "content") else str(output)
+    sections = [section.strip() for section in text.strip().split("|")]
+    if len(sections) != 6 or not all(sections):
+        raise ValidationFailed(f"{len(sections)} pipe-delimited sections, expected 6")
+    if any(len(section.split()) > 8 for section in sections):
+        raise ValidationFailed("tagline sections should be 5-6 words")
+
+
+# Quality gates per stage, used when CV_Builder runs on a model cascade
+STAGE_VALIDATORS = {
+    "cv.analysis": all_of(length(min_chars=400, max_chars=8000), lines(min_lines=8)),
+    "cv.tagline": _tagline_format,
+    "cv.skills": all_of(lines(min_lines=18, max_lines=30, max_words=10), length(max_chars=2000)),
+    "cv.bullets": all_of(lines(min_lines=1, max_lines=10, max_words=30), length(max_chars=2000)),
+    "cv.cover_letter": all_of(length(min_chars=600, max_chars=2500), lines(min_lines=3)),
+    "cv.followup": length(min_chars=80, max_chars=700),
+}
+
 class CV_Builder:
     
     def __init__(self, llm):
+        # llm may be a Cascade built with STAGE_VALIDATORS
         self.llm=llm
     
-    def analyse_job_description(self, jd:str, user_input:str)->str:
-        
-        messages = [
+    def _analysis_messages(self, jd:str, user_input:str)->list:
+        return [
         (
         "system",
         """You are a senior leader manager reviewing CVs for a leadership position. Please provide analysis that a CV writer will use to write a cv that is best fit for this role.
@@ -37,13 +63,27 @@ class CV_Builder:
             {user_input}
             """),
         ]
-        
-        ai_msg = self.llm.invoke(messages)
+    
+    def analyse_job_description(self, jd:str, user_input:str)->str:
+        with stage("cv.analysis"):
+            ai_msg = self.llm.invoke(self._analysis_messages(jd=jd, user_input=user_input))
         return ai_msg.content
+    
+    async def aanalyse_job_description(self, jd:str, user_input:str)->str:
+        with stage("cv.analysis"):
+            ai_msg = await self.llm.ainvoke(self._analysis_messages(jd=jd, user_input=user_input))
+        return ai_msg.content
+    
+    def stream_analysis(self, jd:str, user_input:str)-> Iterator[str]:
+        yield from stream_text(self._analysis_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.analysis")
+    
+    async def astream_analysis(self, jd:str, user_input:str)-> AsyncIterator[str]:
+        async for text in astream_text(self._analysis_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.analysis"):
+            yield text
         
         
-    def generate_tagline(self, jd:str, user_input:str)-> str:
-        messages = [
+    def _tagline_messages(self, jd:str, user_input:str)->list:
+        return [
         (
         "system",
         """You are a professional CV/resume writer specializing in leadership positions.
@@ -78,12 +118,26 @@ class CV_Builder:
             {user_input}
             """),
         ]
-        
-        ai_msg = self.llm.invoke(messages)
+    
+    def generate_tagline(self, jd:str, user_input:str)-> str:
+        with stage("cv.tagline"):
+            ai_msg = self.llm.invoke(self._tagline_messages(jd=jd, user_input=user_input))
         return ai_msg.content
     
-    def generate_skills(self, jd:str, user_input:str)-> str:
-        messages = [
+    async def agenerate_tagline(self, jd:str, user_input:str)-> str:
+        with stage("cv.tagline"):
+            ai_msg = await self.llm.ainvoke(self._tagline_messages(jd=jd, user_input=user_input))
+        return ai_msg.content
+    
+    def stream_tagline(self, jd:str, user_input:str)-> Iterator[str]:
+        yield from stream_text(self._tagline_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.tagline")
+    
+    async def astream_tagline(self, jd:str, user_input:str)-> AsyncIterator[str]:
+        async for text in astream_text(self._tagline_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.tagline"):
+            yield text
+    
+    def _skills_messages(self, jd:str, user_input:str)->list:
+        return [
         (
         "system",
         """You are a professional CV/resume writer specializing in leadership positions.
@@ -108,26 +162,28 @@ class CV_Builder:
             {user_input}
             """),
         ]
-        
-        ai_msg = self.llm.invoke(messages)
+    
+    def generate_skills(self, jd:str, user_input:str)-> str:
+        with stage("cv.skills"):
+            ai_msg = self.llm.invoke(self._skills_messages(jd=jd, user_input=user_input))
         return ai_msg.content
     
-    def build_bullets(self,jd_analysis:str, user_input:str)-> str:
-        
-        bullets=""
-        
-        for role_info in master_cv_bullets.get('bullets_to_update'):
-            
-            role_title = role_info.get('role', 'Unnamed Role')
-            requested_bullets = role_info.get('number_bullets', 3)
-            text_content = role_info.get('text', '')
-            bullet=role_title
-            print(f"\n{'='*50}")
-            print(f"Role: {role_title}")
-            print(f"Number of bullets requested: {requested_bullets}")
-            
-            # code tp call LLM and create compatible bullet points
-            messages = [
+    async def agenerate_skills(self, jd:str, user_input:str)-> str:
+        with stage("cv.skills"):
+            ai_msg = await self.llm.ainvoke(self._skills_messages(jd=jd, user_input=user_input))
+        return ai_msg.content
+    
+    def stream_skills(self, jd:str, user_input:str)-> Iterator[str]:
+        yield from stream_text(self._skills_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.skills")
+    
+    async def astream_skills(self, jd:str, user_input:str)-> AsyncIterator[str]:
+        async for text in astream_text(self._skills_messages(jd=jd, user_input=user_input), model=self.llm, stage="cv.skills"):
+            yield text
+    
+    def _bullet_messages(self, role_info:dict, jd_analysis:str, user_input:str)->list:
+        requested_bullets = role_info.get('number_bullets', 3)
+        text_content = role_info.get('text', '')
+        return [
             (
             "system",
             """You are a professional CV/resume writer specializing in leadership positions.
@@ -164,12 +220,56 @@ class CV_Builder:
             {user_input}
             """),
             ]
-            
-            ai_msg = self.llm.invoke(messages)
-            bullet= bullet+ "\n" + ai_msg.content
-            bullets= bullets+ "\n\n\n" +bullet
+    
+    def build_bullets(self,jd_analysis:str, user_input:str)-> str:
         
+        roles = master_cv_bullets.get('bullets_to_update')
+        for role_info in roles:
+            print(f"\n{'='*50}")
+            print(f"Role: {role_info.get('role', 'Unnamed Role')}")
+            print(f"Number of bullets requested: {role_info.get('number_bullets', 3)}")
+        
+        # the roles are independent, so all of them are requested at once
+        with stage("cv.bullets"):
+            completions = invoke_many(
+                [self._bullet_messages(role_info=role_info, jd_analysis=jd_analysis, user_input=user_input) for role_info in roles],
+                model=self.llm)
+        return self._join_bullets(roles, completions)
+    
+    async def abuild_bullets(self,jd_analysis:str, user_input:str)-> str:
+        roles = master_cv_bullets.get('bullets_to_update')
+        with stage("cv.bullets"):
+            completions = await ainvoke_many(
+                [self._bullet_messages(role_info=role_info, jd_analysis=jd_analysis, user_input=user_input) for role_info in roles],
+                model=self.llm)
+        return self._join_bullets(roles, completions)
+    
+    def _join_bullets(self, roles:list, completions:list)-> str:
+        bullets=""
+        for role_info, completion in zip(roles, completions):
+            if not completion.ok:
+                raise completion.error
+            bullet= role_info.get('role', 'Unnamed Role') + "\n" + completion.output.content
+            bullets= bullets+ "\n\n\n" +bullet
         return bullets
+    
+    def stream_bullets(self,jd_analysis:str, user_input:str)-> Iterator[Tuple[str, str]]:
+        """Yield (role, text) as the bullets of each role arrive, one role after the other"""
+        for role_info in master_cv_bullets.get('bullets_to_update'):
+            messages = self._bullet_messages(role_info=role_info, jd_analysis=jd_analysis, user_input=user_input)
+            for text in stream_text(messages, model=self.llm, stage="cv.bullets"):
+                yield role_info.get('role', 'Unnamed Role'), text
+    
+    async def astream_bullets(self,jd_analysis:str, user_input:str)-> AsyncIterator[Tuple[str, str]]:
+        """Yield (role, text) as bullets arrive, with all roles streaming at once"""
+        streams = {
+            role_info.get('role', 'Unnamed Role'): astream_text(
+                self._bullet_messages(role_info=role_info, jd_analysis=jd_analysis, user_input=user_input),
+                model=self.llm, stage="cv.bullets")
+            for role_info in master_cv_bullets.get('bullets_to_update')
+        }
+        async for role, text in merge_streams(streams):
+            yield role, text
             
     
     def build_cv_components(self, jd:str, user_input:str)-> str:
@@ -186,6 +286,58 @@ class CV_Builder:
         print(f"tagline generated: \n {tagline}")
         skills= self.generate_skills(jd=jd, user_input=user_input)
         print(f"skills generated: \n {skills}")
+        return self._format_components(bullets=bullets, tagline=tagline, skills=skills, jd_analysis=jd_analysis)
+    
+    async def abuild_cv_components(self, jd:str, user_input:str)-> str:
+        # tagline and skills only need the JD, so they run alongside the analysis -> bullets chain
+        async def analysis_and_bullets():
+            jd_analysis= await self.aanalyse_job_description(jd=jd, user_input=user_input)
+            bullets= await self.abuild_bullets(jd_analysis=jd_analysis, user_input=user_input)
+            return jd_analysis, bullets
+        
+        (jd_analysis, bullets), tagline, skills = await asyncio.gather(
+            analysis_and_bullets(),
+            self.agenerate_tagline(jd=jd, user_input=user_input),
+            self.agenerate_skills(jd=jd, user_input=user_input),
+        )
+        return self._format_components(bullets=bullets, tagline=tagline, skills=skills, jd_analysis=jd_analysis)
+    
+    def stream_cv_components(self, jd:str, user_input:str)-> Iterator[Tuple[str, str]]:
+        """Yield (stage, text) for analysis, bullets (stage "bullets:<role>"), tagline and skills"""
+        jd_analysis=""
+        for text in self.stream_analysis(jd=jd, user_input=user_input):
+            jd_analysis+= text
+            yield "analysis", text
+        for role, text in self.stream_bullets(jd_analysis=jd_analysis, user_input=user_input):
+            yield f"bullets:{role}", text
+        for text in self.stream_tagline(jd=jd, user_input=user_input):
+            yield "tagline", text
+        for text in self.stream_skills(jd=jd, user_input=user_input):
+            yield "skills", text
+    
+    async def astream_cv_components(self, jd:str, user_input:str)-> AsyncIterator[Tuple[str, str]]:
+        """Async stream_cv_components; tagline and skills stream alongside the analysis -> bullets chain"""
+        async def analysis_and_bullets():
+            jd_analysis=""
+            async for text in self.astream_analysis(jd=jd, user_input=user_input):
+                jd_analysis+= text
+                yield "analysis", text
+            async for role, text in self.astream_bullets(jd_analysis=jd_analysis, user_input=user_input):
+                yield f"bullets:{role}", text
+        
+        async def single(name, stream):
+            async for text in stream:
+                yield name, text
+        
+        streams = {
+            "cv": analysis_and_bullets(),
+            "tagline": single("tagline", self.astream_tagline(jd=jd, user_input=user_input)),
+            "skills": single("skills", self.astream_skills(jd=jd, user_input=user_input)),
+        }
+        async for _, item in merge_streams(streams):
+            yield item
+    
+    def _format_components(self, bullets:str, tagline:str, skills:str, jd_analysis:str)-> str:
         return f"""
         ************************************************************************************
         {bullets}
@@ -197,11 +349,74 @@ class CV_Builder:
         jd analysis
         {jd_analysis}
         """
-        
     
-  
+    def _cover_letter_messages(self, jd:str, company:str, role:str, user_input:str)->list:
+        return [
+        (
+        "system",
+        """You are a professional CV/resume writer specializing in leadership positions.
+
+            Write a cover letter for the role described below. Keep it under 300 words in 3-4 short paragraphs.
+              -Open with why this company and this role, in one or two sentences
+              -Use 2-3 concrete, truthful achievements from my CV that match the most important requirements in the JD
+              -Include metrics wherever the CV has them
+              -Close with a short call to action
+            Provide plain text only (not markdown), ready to paste.
+
+        """
+            ),
+            ("human", f"""Role: {role} at {company}
+
+            JD here:-----
+             {jd}
+
+            CV here:
+            {master_cv}
+
+            also consider directions from user:---
+            {user_input}
+            """),
+        ]
+    
+    async def agenerate_cover_letter(self, jd:str, company:str, role:str, user_input:str)-> str:
+        with stage("cv.cover_letter"):
+            ai_msg = await self.llm.ainvoke(self._cover_letter_messages(jd=jd, company=company, role=role, user_input=user_input))
+        return ai_msg.content
     
+    async def astream_cover_letter(self, jd:str, company:str, role:str, user_input:str)-> AsyncIterator[str]:
+        async for text in astream_text(self._cover_letter_messages(jd=jd, company=company, role=role, user_input=user_input), model=self.llm, stage="cv.cover_letter"):
+            yield text
     
+    def _followup_messages(self, name:str, profile:str, user_input:str)->list:
+        return [
+        (
+        "system",
+        """You are helping me write a short LinkedIn follow-up message to a person I want to stay in touch with during my job search.
+
+            Keep it under 80 words, warm and professional, and specific to the person's profile.
+            Do not invent shared history; only use the context I give you and facts from my CV.
+            Provide plain text only, ready to paste.
+
+        """
+            ),
+            ("human", f"""Person: {name}
+
+            Their profile here:-----
+            {profile}
+
+            CV here:
+            {master_cv}
+
+            context for the message from user:---
+            {user_input}
+            """),
+        ]
     
+    async def agenerate_followup(self, name:str, profile:str, user_input:str)-> str:
+        with stage("cv.followup"):
+            ai_msg = await self.llm.ainvoke(self._followup_messages(name=name, profile=profile, user_input=user_input))
+        return ai_msg.content
     
-        
\ No newline at end of file
+    async def astream_followup(self, name:str, profile:str, user_input:str)-> AsyncIterator[str]:
+        async for text in astream_text(self._followup_messages(name=name, profile=profile, user_input=user_input), model=self.llm, stage="cv.followup"):
+            yield text
@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from framework.core.brains import astream_many
+from framework.core.config_manager import master_cv_bullets, master_cv
+from framework.core.metrics import stage
+
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#]{2,}")
+_SCORE_RE = re.compile(r"SCORE:\s*(\d{1,3})", re.IGNORECASE)
+_REASON_RE = re.compile(r"REASON:\s*(.+)", re.IGNORECASE)
+
+STOPWORDS = {
+    "the", "and", "for", "with", "you", "your", "our", "are", "will", "this", "that", "from",
+    "have", "has", "all", "who", "into", "their", "they", "about", "across", "more", "can",
+    "not", "was", "were", "been", "per", "other", "years", "year", "work", "team", "role",
+}
+
+
+def _terms(text: str) -> Counter:
+    return Counter(word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS)
+
+
+@functools.lru_cache(maxsize=1)
+def cv_profile() -> Tuple[Dict[str, float], frozenset]:
+    """
+    Term weights of the master CV (and the bullet source text), plus the words
+    of the role titles I have held. Computed once per process.
+    """
+    bullets = master_cv_bullets.get('bullets_to_update') or []
+    counts = _terms(master_cv + "\n".join(role.get('text', '') for role in bullets))
+    top = max(counts.values()) if counts else 1
+    weights = {term: 0.5 + 0.5 * count / top for term, count in counts.items()}
+    title_words = frozenset(_terms(" ".join(role.get('role', '').split(",")[0] for role in bullets)))
+    return weights, title_words
+
+
+@functools.lru_cache(maxsize=4096)
+def local_features(title: str, text: str) -> Dict[str, float]:
+    """
+    Cheap CV-overlap features for one job card; cached per card text.
+
+    Returns:
+        Dict[str, float]: keyword coverage, title overlap and a 0-100 local score
+    """
+    weights, title_words = cv_profile()
+    card_terms = _terms(f"{title}\n{text}")
+    total = sum(card_terms.values()) or 1
+    coverage = sum(count * weights.get(term, 0.0) for term, count in card_terms.items()) / total
+    title_terms = set(_terms(title))
+    title_overlap = len(title_terms & title_words) / len(title_terms) if title_terms else 0.0
+    return {
+        "coverage": round(coverage, 3),
+        "title_overlap": round(title_overlap, 3),
+        # half of a card's (weighted) words appearing in the CV already counts as full coverage
+        "local_score": round(100 * (0.6 * min(1.0, coverage / 0.5) + 0.4 * title_overlap)),
+    }
+
+
+class JobScorer:
+    """
+    Scores LinkedIn job cards against the master CV.
+
+    Every card first gets a local keyword score (instant, cached in memory).
+    The LLM score is cached on disk by card text, so cards seen on earlier
+    pages never cost another call. Scores are streamed back as they finish:
+    local scores and cache hits first, then LLM results with cards in the
+    viewport scheduled ahead of the rest.
+    """
+
+    LLM_WEIGHT = 0.7
+
+    def __init__(self, llm, cache_path: str = "./logs/score_cache.sqlite3", llm_concurrency: int = 16):
+        """
+        Args:
+            llm: Chat model used for the detailed score
+            cache_path (str, optional): SQLite file caching LLM scores
+            llm_concurrency (int, optional): LLM calls in flight per batch. Defaults to 16.
+        """
+        self.llm = llm
+        self.llm_concurrency = llm_concurrency
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.cache = sqlite3.connect(cache_path, check_same_thread=False)
+        self.cache.execute(
+            "CREATE TABLE IF NOT EXISTS llm_scores (key TEXT PRIMARY KEY, score INTEGER, reason TEXT, created_at REAL)")
+        self.cache.commit()
+        self._cv_digest = hashlib.sha256(master_cv.encode()).hexdigest()
+
+    # Single card
+
+    def local_score(self, card: Dict) -> Dict[str, float]:
+        return local_features(card.get("title", ""), self._card_text(card))
+
+    async def llm_score(self, card: Dict) -> Optional[Dict]:
+        """LLM score for one card, served from the cache when possible"""
+        key = self._cache_key(card)
+        cached = self._cached(key)
+        if cached:
+            return cached
+
+        with stage("score.llm"):
+            ai_msg = await self.llm.ainvoke(self._score_messages(card))
+        return self._store(key, ai_msg.content)
+
+    # Batches
+
+    async def score_many(self, cards: List[Dict]) -> AsyncIterator[Dict]:
+        """
+        Score a page of job cards, yielding results as they complete.
+
+        Each card is yielded once with its local score ("final": False) unless
+        its LLM score is already cached, and once more with the LLM score
+        ("final": True).
+        """
+        # stable sort: viewport cards first, page order otherwise
+        ordered = sorted(cards, key=lambda card: not card.get("inViewport"))
+        locals_by_id = {}
+        pending = []
+        for card in ordered:
+            local = self.local_score(card)
+            locals_by_id[self._card_id(card)] = local
+            cached = self._cached(self._cache_key(card))
+            yield self._result(card, local, cached, final=cached is not None)
+            if cached is None:
+                pending.append(card)
+
+        # prompts are dispatched in order, so viewport cards go first; closing
+        # this generator (client went away) cancels the calls still pending
+        prompts = [self._score_messages(card) for card in pending]
+        async for completion in astream_many(prompts, model=self.llm, max_concurrency=self.llm_concurrency,
+                                             stage="score.llm"):
+            card = pending[completion.index]
+            llm = self._store(self._cache_key(card), completion.output.content) if completion.ok else None
+            result = self._result(card, locals_by_id[self._card_id(card)], llm, final=True)
+            if not completion.ok:
+                result["error"] = str(completion.error)
+            yield result
+
+    # Helpers
+
+    def _card_id(self, card: Dict) -> str:
+        return str(card.get("id") or card.get("url", ""))
+
+    def _card_text(self, card: Dict) -> str:
+        return "\n".join(str(card.get(field, "")) for field in ("company", "location", "description"))
+
+    def _cache_key(self, card: Dict) -> str:
+        source = "\n".join([self._cv_digest, card.get("title", ""), self._card_text(card)])
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        row = self.cache.execute("SELECT score, reason FROM llm_scores WHERE key = ?", (key,)).fetchone()
+        return {"score": row[0], "reason": row[1]} if row else None
+
+    def _store(self, key: str, reply: str) -> Optional[Dict]:
+        """Parse an LLM reply and cache the score"""
+        score_match = _SCORE_RE.search(reply)
+        if not score_match:
+            return None
+        reason_match = _REASON_RE.search(reply)
+        result = {
+            "score": min(100, int(score_match.group(1))),
+            "reason": reason_match.group(1).strip() if reason_match else "",
+        }
+        self.cache.execute("INSERT OR REPLACE INTO llm_scores VALUES (?, ?, ?, ?)",
+                           (key, result["score"], result["reason"], time.time()))
+        self.cache.commit()
+        return result
+
+    def _result(self, card: Dict, local: Dict, llm: Optional[Dict], final: bool) -> Dict:
+        score = local["local_score"]
+        if llm:
+            score = round(self.LLM_WEIGHT * llm["score"] + (1 - self.LLM_WEIGHT) * local["local_score"])
+        return {
+            "id": self._card_id(card),
+            "url": card.get("url", ""),
+            "score": score,
+            "localScore": local["local_score"],
+            "llmScore": llm["score"] if llm else None,
+            "reason": llm["reason"] if llm else "",
+            "final": final,
+        }
+
+    def _score_messages(self, card: Dict) -> list:
+        return [
+        (
+        "system",
+        """You are a senior recruiter screening job search results for a candidate.
+
+            Rate how well the candidate's CV matches the job card from 0 to 100, where 100 means a near-perfect fit for seniority, domain and skills.
+            Job cards are short, so judge on what is there and do not penalise missing detail.
+
+            Reply in exactly this format:
+            SCORE: <number>
+            REASON: <one sentence>
+
+        """
+            ),
+            ("human", f"""Job card here:-----
+            Title: {card.get("title", "")}
+            Company: {card.get("company", "")}
+            Location: {card.get("location", "")}
+            {card.get("description", "")}
+
+            CV here:
+            {master_cv}
+            """),
+        ]
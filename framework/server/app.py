@@ -0,0 +1,319 @@
+import asyncio
+import functools
+import json
+import os
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from framework.bookkeepers.job_applications import JobApplicationManager
+from framework.connectors.notion.connector import NotionConnection
+from framework.core.brains import Models, get_model
+from framework.core.cascade import Cascade, cascade_stats
+from framework.core.checkpoints import checkpoint_store
+from framework.core.config_manager import settings
+from framework.core.hedging import HedgedModel
+from framework.core.router import routing_stats
+from framework.core.singleflight import coalescing_stats
+from framework.cv_builder import CV_Builder, STAGE_VALIDATORS
+from framework.job_scorer import JobScorer
+from framework.server.http import HttpError, HttpServer, Request, Response, StreamResponse, sse_event
+from framework.server.jobs import JobQueue
+from framework.server.page_parser import parse_connections_page, parse_job_page, parse_profile_page
+
+
+class BackendApp:
+    """
+    Asyncio backend for the LPFJS Chrome extension.
+
+    LLM work goes through the async model API and the (synchronous) Notion
+    client runs on a dedicated thread pool, so no handler ever blocks the
+    event loop and slow requests do not hold up fast ones. The multi-call
+    generation endpoints hand their work to a JobQueue and answer with a job
+    id straight away; the extension then polls or subscribes for the result.
+    """
+
+    NOTION_TEXT_LIMIT = 2000      # Notion rejects rich text longer than this
+    RECENT_JOBS = 200             # parsed job pages kept for follow-up calls
+
+    def __init__(self, job_manager: JobApplicationManager, cv_builder: CV_Builder,
+                 job_queue: JobQueue, job_scorer: JobScorer, io_workers: int = 8,
+                 cors_origin: str = "*", agent: Any = None):
+        """
+        Args:
+            job_manager (JobApplicationManager): Notion-backed application tracker
+            cv_builder (CV_Builder): CV builder wrapping the LLM
+            job_queue (JobQueue): Queue running the long LLM generations
+            job_scorer (JobScorer): Scores search result cards against the CV
+            io_workers (int, optional): Threads for blocking Notion calls. Defaults to 8.
+            cors_origin (str, optional): Allowed CORS origin. Defaults to "*".
+            agent (base_agent, optional): Plan-and-execute agent served under /api/agent. Defaults to None.
+        """
+        self.job_manager = job_manager
+        self.cv_builder = cv_builder
+        self.job_queue = job_queue
+        self.job_scorer = job_scorer
+        self.job_queue.register("cover-letter", self._run_cover_letter)
+        self.job_queue.register("followup", self._run_followup)
+        self.agent = agent
+        self._reply_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        if agent is not None:
+            self.job_queue.register("agent-run", self._run_agent)
+            self.job_queue.register("agent-reply", self._run_agent_reply)
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="notion-io")
+        self.recent_jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self.server = HttpServer(cors_origin=cors_origin)
+        self._add_routes()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 5000):
+        """Start the job workers and the HTTP server"""
+        await self.job_queue.start()
+        return await self.server.start(host, port)
+
+    async def stop(self) -> None:
+        await self.job_queue.stop()
+        self.io_pool.shutdown()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 5000) -> None:
+        server = await self.start(host, port)
+        print(f"Serving on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _add_routes(self) -> None:
+        self.server.add_route("GET", "/ping", self.ping)
+        self.server.add_route("GET", "/api/stats", self.stats)
+        self.server.add_route("POST", "/api/job", self.job)
+        self.server.add_route("POST", "/api/save-job", self.save_job)
+        self.server.add_route("POST", "/api/score-jobs", self.score_jobs)
+        self.server.add_route("POST", "/api/generate-cover-letter", self.generate_cover_letter)
+        self.server.add_route("POST", "/api/profile", self.profile)
+        self.server.add_route("POST", "/api/connections", self.connections)
+        self.server.add_route("POST", "/api/generate-followup", self.generate_followup)
+        self.server.add_route("GET", "/api/jobs/{job_id}", self.job_status)
+        self.server.add_route("GET", "/api/jobs/{job_id}/events", self.job_events)
+        if self.agent is not None:
+            self.server.add_route("GET", "/api/agent/runs", self.agent_waiting_runs)
+            self.server.add_route("POST", "/api/agent/runs", self.agent_run)
+            self.server.add_route("POST", "/api/agent/runs/{run_id}/reply", self.agent_reply)
+
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call (Notion) on the I/O pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, functools.partial(func, *args, **kwargs))
+
+    # Helpers
+
+    def _job_from_request(self, data: Dict) -> Dict:
+        """Parse the posted job page, letting client-side fields win"""
+        url = data.get("url", "")
+        job = parse_job_page(data.get("html", ""), url=url)
+        for field in ("title", "company"):
+            value = (data.get(field) or "").strip()
+            if value and not value.startswith("Unknown"):
+                job[field] = value
+
+        self.recent_jobs[url] = job
+        self.recent_jobs.move_to_end(url)
+        while len(self.recent_jobs) > self.RECENT_JOBS:
+            self.recent_jobs.popitem(last=False)
+        return job
+
+    # Handlers
+
+    async def ping(self, request: Request) -> Response:
+        return Response.json({"status": "ok"})
+
+    async def stats(self, request: Request) -> Response:
+        stats = {"coalescing": coalescing_stats(), "cascades": cascade_stats(), "routing": routing_stats()}
+        if isinstance(self.job_scorer.llm, HedgedModel):
+            stats["hedging"] = self.job_scorer.llm.stats()
+        return Response.json(stats)
+
+    async def job(self, request: Request) -> Response:
+        job = self._job_from_request(request.json())
+        return Response.json({"status": "ok", "job": job})
+
+    async def save_job(self, request: Request) -> Response:
+        job = self._job_from_request(request.json())
+        if not job["url"]:
+            raise HttpError(400, "Job URL is required")
+        try:
+            page = await self.run_io(
+                self.job_manager.add_application,
+                company=job["company"] or "Unknown Company",
+                role=job["title"] or "Unknown Role",
+                url=job["url"],
+                location=job["location"][:self.NOTION_TEXT_LIMIT],
+                job_description=job["description"][:self.NOTION_TEXT_LIMIT],
+            )
+        except ValueError as e:
+            raise HttpError(409, str(e))
+        return Response.json({"status": "saved", "id": page.get("id"), "notionUrl": page.get("url")})
+
+    async def score_jobs(self, request: Request) -> StreamResponse:
+        cards = request.json().get("cards", [])
+        if not isinstance(cards, list):
+            raise HttpError(400, "cards must be a list")
+
+        async def stream():
+            async for result in self.job_scorer.score_many(cards):
+                yield (json.dumps(result) + "\n").encode()
+        return StreamResponse(stream(), content_type="application/x-ndjson")
+
+    async def generate_cover_letter(self, request: Request) -> Response:
+        data = request.json()
+        job = self._job_from_request(data)
+        payload = {
+            "jd": job["description"],
+            "company": job["company"],
+            "role": job["title"],
+            "user_input": data.get("resumePoints", ""),
+        }
+        record = await self.job_queue.submit("cover-letter", payload)
+        return self._accepted(record)
+
+    async def profile(self, request: Request) -> Response:
+        data = request.json()
+        profile = parse_profile_page(data.get("html", ""), url=data.get("url", ""))
+        return Response.json({"status": "ok", "profile": {k: v for k, v in profile.items() if k != "text"}})
+
+    async def connections(self, request: Request) -> Response:
+        connections = parse_connections_page(request.json().get("html", ""))
+        return Response.json({"status": "ok", "count": len(connections), "connections": connections})
+
+    async def generate_followup(self, request: Request) -> Response:
+        data = request.json()
+        profile = parse_profile_page(data.get("html", ""), url=data.get("url", ""))
+        payload = {
+            "name": data.get("name") or profile["name"],
+            "profile": f"{profile['headline']}\n{profile['text'][:4000]}",
+            "user_input": data.get("messageContext", ""),
+        }
+        record = await self.job_queue.submit("followup", payload)
+        return self._accepted(record)
+
+    async def job_status(self, request: Request) -> Response:
+        record = self.job_queue.get(request.match_info["job_id"])
+        if record is None:
+            raise HttpError(404, "Unknown job")
+        return Response.json(record)
+
+    async def job_events(self, request: Request) -> StreamResponse:
+        job_id = request.match_info["job_id"]
+        if self.job_queue.get(job_id) is None:
+            raise HttpError(404, "Unknown job")
+
+        async def stream():
+            async for record in self.job_queue.events(job_id):
+                yield sse_event(record, event=record["status"])
+        return StreamResponse(stream())
+
+    async def agent_waiting_runs(self, request: Request) -> Response:
+        runs = await self.run_io(self.agent.waiting_runs)
+        return Response.json({"waiting": runs})
+
+    async def agent_run(self, request: Request) -> Response:
+        data = request.json()
+        if not (data.get("input") or "").strip():
+            raise HttpError(400, "Missing input")
+        record = await self.job_queue.submit("agent-run", {"input_text": data["input"], "run_id": data.get("runId")})
+        return self._accepted(record)
+
+    async def agent_reply(self, request: Request) -> Response:
+        # the paused run is read back from the agent's checkpointer, so any backend process can resume it
+        run_id = request.match_info["run_id"]
+        if run_id not in await self.run_io(self.agent.waiting_runs):
+            raise HttpError(404, "No run waiting for a reply")
+        # a second reply while the first is queued or running gets the first one's job
+        record = await self.job_queue.submit("agent-reply", {"run_id": run_id, "reply": request.json().get("reply", "")},
+                                             dedupe_key=f"agent-reply:{run_id}")
+        return self._accepted(record)
+
+    def _accepted(self, record: Dict) -> Response:
+        record = dict(record, statusUrl=f"/api/jobs/{record['jobId']}")
+        return Response.json(record, status=202)
+
+    # Job handlers (run by the queue workers)
+
+    async def _run_cover_letter(self, payload: Dict) -> Dict:
+        cover_letter = await self.cv_builder.agenerate_cover_letter(**payload)
+        return {"coverLetter": cover_letter}
+
+    async def _run_followup(self, payload: Dict) -> Dict:
+        message = await self.cv_builder.agenerate_followup(**payload)
+        return {"message": message}
+
+    async def _run_agent(self, payload: Dict) -> Dict:
+        return await self.agent.run(**payload)
+
+    async def _run_agent_reply(self, payload: Dict) -> Dict:
+        # one reply at a time per run, and only while the run still waits for one: a reply
+        # that passed agent_reply's check just before another resumed the run is refused
+        lock = self._reply_locks.setdefault(payload["run_id"], asyncio.Lock())
+        async with lock:
+            if payload["run_id"] not in await self.run_io(self.agent.waiting_runs):
+                raise ValueError("The run is no longer waiting for a reply")
+            return await self.agent.resume(**payload)
+
+def build_app() -> BackendApp:
+    """Wire the backend from config/settings.yaml and the environment"""
+    load_dotenv()
+    server_settings = settings.get("server", {})
+    notion = NotionConnection(os.getenv("NOTION_INTEGRATION_SECRET"))
+    job_manager = JobApplicationManager(
+        notion,
+        database_id=settings.get("databases").get("applications"),
+        ledger_path=server_settings.get("saved_jobs_db", "./logs/saved_jobs.sqlite3"),
+    )
+    # a cascade configured under settings cascades.cv replaces the single CV model
+    llm = (Cascade.from_settings("cv", validators=STAGE_VALIDATORS)
+           or get_model(Models(server_settings.get("model", Models.CLAUDE_SONNET.value))))
+    job_queue = JobQueue(
+        db_path=server_settings.get("jobs_db", "./logs/jobs.sqlite3"),
+        workers=server_settings.get("job_workers", 2),
+    )
+    job_scorer = JobScorer(
+        # scoring is interactive: hedge slow first tokens if settings server.scoring_hedge asks for it
+        llm=HedgedModel.from_settings(get_model(Models(server_settings.get("scoring_model", Models.CLAUDE_HAIKU.value))),
+                                      server_settings.get("scoring_hedge")),
+        cache_path=server_settings.get("score_cache_db", "./logs/score_cache.sqlite3"),
+        llm_concurrency=server_settings.get("score_concurrency", 16),
+    )
+    return BackendApp(
+        job_manager=job_manager,
+        cv_builder=CV_Builder(llm=llm),
+        job_queue=job_queue,
+        job_scorer=job_scorer,
+        io_workers=server_settings.get("io_workers", 8),
+        agent=build_agent(server_settings.get("agent")),
+    )
+
+
+def build_agent(agent_settings: Optional[Dict]):
+    """The agent of settings server.agent, checkpointing its paused runs; None if there is none"""
+    if not agent_settings:
+        return None
+    from agent_trials3.base_agent import base_agent
+
+    return base_agent(
+        llm_think=agent_settings.get("think_model", "openai:gpt-4o-mini"),
+        llm_do=agent_settings.get("do_model", "openai:gpt-4o-mini"),
+        llm_interact=agent_settings.get("interact_model", "openai:gpt-4o-mini"),
+        checkpointer=checkpoint_store(),
+    )
+
+
+if __name__ == "__main__":
+    server_settings = settings.get("server", {})
+    app = build_app()
+    asyncio.run(app.serve_forever(
+        host=server_settings.get("host", "127.0.0.1"),
+        port=server_settings.get("port", 5000),
+    ))
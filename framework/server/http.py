@@ -0,0 +1,291 @@
+import asyncio
+import json
+import re
+import traceback
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """Raised by handlers to return a JSON error with the given status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """A parsed HTTP request"""
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.body = body
+        self.match_info: Dict[str, str] = {}
+
+    def json(self) -> Any:
+        """Decode the body as JSON, raising a 400 on malformed input"""
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+
+
+class Response:
+    """A complete HTTP response"""
+
+    def __init__(self, body: bytes = b"", status: int = 200,
+                 content_type: str = "application/json",
+                 headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+        self.headers.update(headers or {})
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200) -> "Response":
+        return cls(json.dumps(data).encode(), status=status)
+
+
+class StreamResponse:
+    """A response whose body is produced incrementally (server-sent events, NDJSON)"""
+
+    def __init__(self, chunks: AsyncIterator[bytes], status: int = 200,
+                 content_type: str = "text/event-stream",
+                 headers: Optional[Dict[str, str]] = None):
+        self.chunks = chunks
+        self.status = status
+        self.headers = {"Content-Type": content_type, "Cache-Control": "no-cache"}
+        self.headers.update(headers or {})
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> bytes:
+    """Encode one server-sent event carrying JSON data"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n".encode()
+
+
+Handler = Callable[[Request], Awaitable[Union[Response, StreamResponse]]]
+
+
+class HttpServer:
+    """
+    A small asyncio HTTP/1.1 server for the extension backend.
+
+    Every connection is served by its own coroutine, so a slow handler only
+    holds up its own request. Handlers must not block the event loop: blocking
+    I/O belongs in an executor and LLM calls should use the async client API.
+    """
+
+    MAX_BODY_BYTES = 32 * 1024 * 1024   # full LinkedIn pages are a few MB
+    KEEP_ALIVE_SECONDS = 30
+
+    def __init__(self, cors_origin: str = "*"):
+        self.cors_origin = cors_origin
+        self._routes: List[Tuple[str, re.Pattern, Handler]] = []
+
+    def route(self, method: str, path: str):
+        """
+        Decorator registering a handler. Path segments written as {name} are
+        captured into request.match_info.
+        """
+        pattern = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", path) + "$")
+
+        def decorator(handler: Handler) -> Handler:
+            self._routes.append((method.upper(), pattern, handler))
+            return handler
+        return decorator
+
+    def add_route(self, method: str, path: str, handler: Handler) -> None:
+        self.route(method, path)(handler)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 5000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 5000) -> None:
+        server = await self.start(host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    # Connection handling
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), timeout=self.KEEP_ALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.CancelledError:
+                    # shutting down while the connection sits idle: just hang up
+                    break
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    # The request could not be parsed; answer and hang up
+                    await self._write_response(writer, request, keep_alive=False)
+                    break
+
+                response = await self._dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                if isinstance(response, StreamResponse):
+                    await self._write_stream(writer, request, response, keep_alive)
+                else:
+                    await self._write_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # shutting down mid-request (e.g. a client that hung up on a slow
+            # handler): the connection is going away anyway
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return Response.json({"error": "Malformed request line"}, status=400)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return Response.json({"error": "Malformed Content-Length"}, status=400)
+        if length > self.MAX_BODY_BYTES:
+            return Response.json({"error": "Request body too large"}, status=413)
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    async def _dispatch(self, request: Request) -> Union[Response, StreamResponse]:
+        if request.method == "OPTIONS":
+            # CORS preflight from the content script
+            return Response(status=204, headers={
+                "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type",
+                "Access-Control-Max-Age": "600",
+            })
+
+        path_matched = False
+        for method, pattern, handler in self._routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            path_matched = True
+            if method != request.method:
+                continue
+            request.match_info = match.groupdict()
+            try:
+                return await handler(request)
+            except HttpError as e:
+                return Response.json({"error": e.message}, status=e.status)
+            except Exception:
+                # the details stay in the server log; they are no business of the client
+                print(f"Error handling {request.method} {request.path}:\n{traceback.format_exc()}")
+                return Response.json({"error": "Internal server error"}, status=500)
+
+        if path_matched:
+            return Response.json({"error": "Method not allowed"}, status=405)
+        return Response.json({"error": f"No route for {request.path}"}, status=404)
+
+    def _cors_headers(self) -> Dict[str, str]:
+        return {"Access-Control-Allow-Origin": self.cors_origin}
+
+    async def _write_response(self, writer: asyncio.StreamWriter,
+                              response: Response, keep_alive: bool) -> None:
+        headers = dict(response.headers)
+        headers.update(self._cors_headers())
+        headers["Content-Length"] = str(len(response.body))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        writer.write(_status_line(response.status) + _header_block(headers) + response.body)
+        await writer.drain()
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, request: Request,
+                            response: StreamResponse, keep_alive: bool) -> None:
+        headers = dict(response.headers)
+        headers.update(self._cors_headers())
+        headers["Transfer-Encoding"] = "chunked"
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        writer.write(_status_line(response.status) + _header_block(headers))
+        await writer.drain()
+        try:
+            async for chunk in response.chunks:
+                if chunk:
+                    writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception:
+            # as in _dispatch the details stay in the server log; the client gets an
+            # error marker and a properly ended body, so it can tell a failure from a cut-off
+            print(f"Error streaming {request.method} {request.path}:\n{traceback.format_exc()}")
+            marker = _error_chunk(response.headers.get("Content-Type", ""))
+            if marker:
+                writer.write(f"{len(marker):x}\r\n".encode() + marker + b"\r\n")
+        finally:
+            # also stops the producer when the client goes away mid-stream
+            aclose = getattr(response.chunks, "aclose", None)
+            if aclose:
+                await aclose()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def _error_chunk(content_type: str) -> bytes:
+    """The last chunk of a stream whose producer failed, in the stream's own format"""
+    if content_type.startswith("text/event-stream"):
+        return sse_event({"error": "Internal server error"}, event="error")
+    if content_type.startswith("application/x-ndjson"):
+        return json.dumps({"error": "Internal server error"}).encode() + b"\n"
+    return b""
+
+
+def _status_line(status: int) -> bytes:
+    return f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}\r\n".encode()
+
+
+def _header_block(headers: Dict[str, str]) -> bytes:
+    return "".join(f"{k}: {v}\r\n" for k, v in headers.items()).encode("latin-1") + b"\r\n"
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+JobHandler = Callable[[Dict], Awaitable[Dict]]
+
+
+class JobQueue:
+    """
+    Durable background queue for long-running LLM work.
+
+    Submitting returns immediately with a job record; a fixed number of worker
+    coroutines run the registered handlers, which bounds concurrent LLM calls.
+    Jobs are stored in SQLite so results survive restarts, and jobs still
+    pending or running at shutdown are picked up again on the next start.
+    Submitting a job identical to one that is still pending or running
+    returns the existing job instead of queueing a duplicate.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    FINISHED = (DONE, FAILED)
+
+    def __init__(self, db_path: str, workers: int = 2):
+        """
+        Args:
+            db_path (str): SQLite file holding the jobs
+            workers (int, optional): Jobs executed concurrently. Defaults to 2.
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                dedupe_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+        self.db.commit()
+
+        self.workers = workers
+        self.handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that executes jobs of the given kind"""
+        self.handlers[kind] = handler
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Start the workers and requeue jobs left over from the last run"""
+        self._queue = asyncio.Queue()
+        now = time.time()
+        self.db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                        (self.PENDING, now, self.RUNNING))
+        self.db.commit()
+        for row in self.db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                                   (self.PENDING,)):
+            self._queue.put_nowait(row["id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Public API
+
+    async def submit(self, kind: str, payload: Dict, dedupe_key: Optional[str] = None) -> Dict:
+        """
+        Queue a job, or return the identical job that is already queued.
+
+        Args:
+            kind (str): Registered job kind
+            payload (Dict): JSON-serialisable handler input
+            dedupe_key (str, optional): Identity of the job. Defaults to a hash of kind and payload.
+
+        Returns:
+            Dict: The job record
+        """
+        if self._queue is None:
+            raise RuntimeError("JobQueue not started")
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        key = dedupe_key or hashlib.sha256(
+            json.dumps([kind, payload], sort_keys=True).encode()).hexdigest()
+
+        existing = self.db.execute(
+            "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+            (key, self.PENDING, self.RUNNING)).fetchone()
+        if existing:
+            return self._to_record(existing)
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.db.execute(
+            "INSERT INTO jobs (id, kind, dedupe_key, status, payload, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, key, self.PENDING, json.dumps(payload), now, now))
+        self.db.commit()
+        self._queue.put_nowait(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the job record, or None if the id is unknown"""
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait until the job has finished and return its record"""
+        async def finished():
+            async for record in self.events(job_id):
+                if record["status"] in self.FINISHED:
+                    return record
+        return await asyncio.wait_for(finished(), timeout)
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict]:
+        """
+        Yield the job record now and again after every status change,
+        ending once the job has finished.
+        """
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(updates)
+        try:
+            record = self.get(job_id)
+            while record is not None:
+                yield record
+                if record["status"] in self.FINISHED:
+                    break
+                record = await updates.get()
+        finally:
+            self._subscribers[job_id].remove(updates)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    # Internals
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None or row["status"] != self.PENDING:
+                    continue
+                self._update(job_id, status=self.RUNNING)
+                try:
+                    result = await self.handlers[row["kind"]](json.loads(row["payload"]))
+                    self._update(job_id, status=self.DONE, result=json.dumps(result))
+                except asyncio.CancelledError:
+                    # shutting down: leave it to be requeued on the next start
+                    raise
+                except Exception as e:
+                    self._update(job_id, status=self.FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _update(self, job_id: str, status: str, result: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        self.db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id))
+        self.db.commit()
+        record = self.get(job_id)
+        for updates in self._subscribers.get(job_id, []):
+            updates.put_nowait(record)
+
+    def _to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "jobId": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
@@ -0,0 +1,706 @@
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from langchain_openai import ChatOpenAI
+
+from framework.bookkeepers.job_applications import JobApplicationManager
+from framework.connectors.notion.connector import NotionConnection
+from framework.core.brains import Models, _managed, stream_text
+from framework.core.cascade import Cascade, cascade_stats
+from framework.core.limits import configure_limits
+from framework.core.metrics import MetricsStore, add_listener, stage, use_store
+from framework.core.cassette import use_cassette
+from framework.core.hedging import HedgedModel
+from framework.core.router import ModelRouter, RequestClass, RoutedModel
+from framework.cv_builder import CV_Builder, STAGE_VALIDATORS
+from framework.job_scorer import JobScorer
+from framework.server.app import BackendApp
+from framework.server.jobs import JobQueue
+from framework.server.mock_llm import MockLLMServer
+
+
+class FakeChatModel:
+    """Stands in for a chat model: answers every call after a fixed delay"""
+
+    def __init__(self, latency: float = 1.0, reply: str = "Generated text"):
+        self.latency = latency
+        self.reply = reply
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        time.sleep(self.latency)
+        return AIMessage(content=self.reply)
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=self.reply)
+
+
+class FakeNotionConnection(NotionConnection):
+    """A NotionConnection whose blocking API calls just sleep"""
+
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.rows: List[Dict] = []
+
+    def get_all_rows(self, database_id: str, filter_params: Optional[Dict] = None,
+                     sorts: Optional[List[Dict]] = None) -> List[Dict]:
+        time.sleep(self.latency)
+        return []
+
+    def add_row(self, database_id: str, properties: Dict) -> Dict:
+        time.sleep(self.latency)
+        row = {"id": str(uuid.uuid4()), "url": "https://www.notion.so/fake", "properties": properties}
+        self.rows.append(row)
+        return row
+
+
+def fake_job_page(job_id: int, padding_bytes: int = 2_000_000) -> str:
+    """A LinkedIn-sized job page: the useful bits plus megabytes of markup"""
+    return (
+        f"<html><head><title>Program Manager {job_id} | Acme {job_id} | LinkedIn</title></head><body>"
+        + "<div class=\"filler\"></div>" * (padding_bytes // 25)
+        + f"<div id=\"job-details\"><p>Lead programs for team {job_id}.</p><p>5+ years experience.</p></div>"
+        + "</body></html>"
+    )
+
+
+def encode_request(method: str, path: str, payload: Optional[Dict] = None) -> bytes:
+    body = json.dumps(payload).encode() if payload is not None else b""
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+
+
+async def http_request(port: int, method: str, path: str,
+                       payload: Optional[Dict] = None, raw: Optional[bytes] = None) -> Tuple[int, Dict]:
+    """Minimal HTTP/1.1 client returning (status, decoded JSON body)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw or encode_request(method, path, payload))
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"chunked" in head.lower():
+        lines = [json.loads(line) for line in _dechunk(content).splitlines() if line]
+        return status, {"lines": lines}
+    return status, json.loads(content) if content else {}
+
+
+def _dechunk(content: bytes) -> bytes:
+    body = b""
+    while content:
+        size_line, _, content = content.partition(b"\r\n")
+        size = int(size_line, 16)
+        if size == 0:
+            break
+        body, content = body + content[:size], content[size + 2:]
+    return body
+
+
+def make_app(llm_latency: float, notion_latency: float, workers: int) -> BackendApp:
+    """A BackendApp wired to fakes, with its state in a temporary directory"""
+    state_dir = tempfile.mkdtemp()
+    llm = FakeChatModel(latency=llm_latency, reply="SCORE: 72\nREASON: Strong program management overlap.")
+    return BackendApp(
+        job_manager=JobApplicationManager(FakeNotionConnection(latency=notion_latency), database_id="fake",
+                                          ledger_path=os.path.join(state_dir, "saved_jobs.sqlite3")),
+        cv_builder=CV_Builder(llm=llm),
+        job_queue=JobQueue(os.path.join(state_dir, "jobs.sqlite3"), workers=workers),
+        job_scorer=JobScorer(llm=llm, cache_path=os.path.join(state_dir, "scores.sqlite3"),
+                             llm_concurrency=workers),
+        io_workers=workers,
+    )
+
+
+async def run_load_test(concurrency: int = 60, llm_latency: float = 1.0,
+                        notion_latency: float = 0.3) -> Dict[str, Dict[str, float]]:
+    """
+    Fire `concurrency` mixed extension requests at once and measure latency.
+
+    Without head-of-line blocking every request finishes in roughly its own
+    service time (LLM or Notion latency) instead of queueing behind others,
+    and /ping probes stay fast while the slow work is in flight.
+    """
+    app = make_app(llm_latency, notion_latency, workers=concurrency)
+    server = await app.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    calls = []
+    for i in range(concurrency):
+        page = {"url": f"https://www.linkedin.com/jobs/view/{i}/", "html": fake_job_page(i)}
+        if i % 3 == 0:
+            path, payload = "/api/generate-cover-letter", dict(page, resumePoints="TPM, ML platforms")
+        elif i % 3 == 1:
+            path, payload = "/api/save-job", page
+        else:
+            path, payload = "/api/job", page
+        # encode up front so client-side JSON work is not counted as server latency
+        calls.append((path, encode_request("POST", path, payload)))
+
+    latencies: Dict[str, List[float]] = {}
+
+    async def timed(path: str, raw: Optional[bytes], method: str = "POST"):
+        start = time.perf_counter()
+        status, body = await http_request(port, method, path, raw=raw)
+        # queued generations answer 202 at once; the user waits for the result
+        while status == 202 or body.get("status") in (JobQueue.PENDING, JobQueue.RUNNING):
+            await asyncio.sleep(0.05)
+            status, body = await http_request(port, "GET", f"/api/jobs/{body['jobId']}")
+        latencies.setdefault(path, []).append(time.perf_counter() - start)
+        assert status == 200, f"{path} returned {status}"
+
+    async def ping_probes():
+        await asyncio.sleep(0.05)
+        for _ in range(10):
+            await timed("/ping", None, method="GET")
+            await asyncio.sleep(llm_latency / 10)
+
+    start = time.perf_counter()
+    await asyncio.gather(ping_probes(), *[timed(path, raw) for path, raw in calls])
+    wall = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    await app.stop()
+
+    summary = {
+        path: {"count": len(values), "p50": statistics.median(values), "max": max(values)}
+        for path, values in latencies.items()
+    }
+    summary["total"] = {"count": len(calls), "wall": wall}
+    return summary
+
+
+async def run_batch_score_test(cards: int = 25, llm_latency: float = 1.0) -> Dict[str, float]:
+    """
+    Score a search results page in one /api/score-jobs call.
+
+    Returns the time to the first streamed result, the time until every card
+    has its LLM score, and the same page again once the scores are cached.
+    """
+    app = make_app(llm_latency, 0.0, workers=cards)
+    server = await app.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    page = {"cards": [
+        {"id": str(i), "url": f"https://www.linkedin.com/jobs/view/{i}/",
+         "title": f"Senior Technical Program Manager {i}", "company": f"Acme {i}",
+         "location": "Luxembourg", "description": "ML platforms, optimization, stakeholder alignment",
+         "inViewport": i < 7}
+        for i in range(cards)
+    ]}
+
+    timings = {}
+    for run in ("cold", "cached"):
+        start = time.perf_counter()
+        status, body = await http_request(port, "POST", "/api/score-jobs", page)
+        timings[run] = time.perf_counter() - start
+        assert status == 200 and sum(line["final"] for line in body["lines"]) == cards
+
+    server.close()
+    await server.wait_closed()
+    await app.stop()
+    return timings
+
+
+async def run_save_retry_test(duplicates: int = 20, notion_latency: float = 0.3) -> Dict[str, float]:
+    """
+    Save one job many times at once (different URL variants), then retry it.
+
+    Returns the number of Notion rows written, which should be one, and the
+    latency of a retry once the write is recorded.
+    """
+    app = make_app(0.0, notion_latency, workers=duplicates)
+    server = await app.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    variants = [
+        "https://www.linkedin.com/jobs/view/4012345678/",
+        "https://www.linkedin.com/jobs/view/4012345678/?refId=abc&trackingId=xyz",
+        "https://www.linkedin.com/jobs/search/?currentJobId=4012345678&keywords=tpm",
+    ]
+    calls = [
+        encode_request("POST", "/api/save-job",
+                       {"url": variants[i % len(variants)], "html": fake_job_page(1, padding_bytes=0)})
+        for i in range(duplicates)
+    ]
+
+    responses = await asyncio.gather(*[http_request(port, "POST", "/api/save-job", raw=raw) for raw in calls])
+    assert all(status == 200 for status, _ in responses)
+    assert len({body["id"] for _, body in responses}) == 1
+
+    start = time.perf_counter()
+    status, _ = await http_request(port, "POST", "/api/save-job", raw=calls[0])
+    retry = time.perf_counter() - start
+    assert status == 200
+
+    server.close()
+    await server.wait_closed()
+    await app.stop()
+    return {"rows": len(app.job_manager.notion.rows), "retry": retry}
+
+
+async def run_rate_limit_test(calls: int = 60, requests_per_second: float = 10.0) -> Dict[str, Dict[str, float]]:
+    """
+    Fire `calls` concurrent chat calls at a rate-limited stand-in provider,
+    once with a plain client relying on SDK retries and once with a client
+    managed by the provider limiter.
+
+    Returns wall time, 429s received and failed calls for each client.
+    """
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    results = {}
+    for name in ("unmanaged", "managed"):
+        provider = MockLLMServer(reply="SCORE: 72", requests_per_second=requests_per_second)
+        base_url = await provider.start()
+        if name == "managed":
+            configure_limits("openai", requests_per_minute=requests_per_second * 60, max_in_flight=8)
+            llm = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=base_url, api_key="stand-in",
+                                       max_retries=0, include_response_headers=True)
+        else:
+            llm = ChatOpenAI(model="gpt-4o-mini", base_url=base_url, api_key="stand-in", max_retries=5)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*[llm.ainvoke(f"Score job {i}") for i in range(calls)],
+                                        return_exceptions=True)
+        results[name] = {
+            "wall": time.perf_counter() - start,
+            "rate_limited": provider.rejected,
+            "failed": sum(isinstance(outcome, Exception) for outcome in outcomes),
+        }
+        await provider.stop()
+    return results
+
+
+async def run_streaming_test(words: int = 40, token_delay: float = 0.05) -> Dict[str, float]:
+    """
+    Stream one completion of `words` words from the stand-in provider.
+
+    Returns when the first text reached the caller, when the completion was
+    done, and the TTFT the call meter recorded.
+    """
+    store = MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3"))
+    use_store(store)
+    provider = MockLLMServer(reply=" ".join(["word"] * words), requests_per_second=100.0,
+                             tokens_per_second=1 / token_delay)
+    base_url = await provider.start()
+    llm = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=base_url, api_key="stand-in", max_retries=0)
+
+    def consume() -> Tuple[float, float]:
+        start = time.perf_counter()
+        first = None
+        for _ in stream_text("Write a tagline", llm):
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+    first, total = await asyncio.get_running_loop().run_in_executor(None, consume)
+    await provider.stop()
+    return {"first_text": first, "complete": total, "metered_ttft": store.rows()[-1]["ttft"]}
+
+
+GOOD_TAGLINE = ("Technical Program Leader | 10+ Years Experience | Delivered $30M First-Year Savings "
+                "| Led 45+ ML Engineers | Aligned 40+ Stakeholder Teams | Automated 70% Planning Work")
+
+
+async def run_cascade_test(calls: int = 40, cheap_failure_rate: float = 0.25,
+                           cheap_latency: float = 0.2, strong_latency: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """
+    Generate `calls` taglines with the strong model alone, then with a cascade
+    that tries a cheap model first and escalates when its tagline fails the
+    cv.tagline validator (which the cheap stand-in does for a
+    `cheap_failure_rate` share of prompts).
+
+    Returns escalation rate, mean and p95 latency per call, and estimated cost for each.
+    """
+    configure_limits("openai", requests_per_minute=60_000, tokens_per_minute=10_000_000, max_in_flight=64)
+
+    def cheap_reply(body: Dict) -> str:
+        # a stable share of prompts gets a tagline with too few sections
+        prompt = json.dumps(body["messages"])
+        if int(uuid.uuid5(uuid.NAMESPACE_URL, prompt).hex, 16) % 100 < cheap_failure_rate * 100:
+            return "Technical Program Leader with a decade of delivering savings"
+        return GOOD_TAGLINE
+
+    cheap = MockLLMServer(requests_per_second=1000, burst=1000, latency=cheap_latency, reply=cheap_reply)
+    strong = MockLLMServer(requests_per_second=1000, burst=1000, latency=strong_latency, reply=GOOD_TAGLINE)
+    cheap_model = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=await cheap.start(), api_key="stand-in", max_retries=0)
+    strong_model = _managed(ChatOpenAI)(model="gpt-4o", base_url=await strong.start(), api_key="stand-in", max_retries=0)
+    prompts = [f"Write a CV tagline for job {i}" for i in range(calls)]
+
+    results = {}
+    for name, llm in (("strong only", strong_model),
+                      ("cascade", Cascade([cheap_model, strong_model], validators=STAGE_VALIDATORS, name="benchmark"))):
+        store = MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3"))
+        use_store(store)
+        latencies = []
+
+        async def timed(prompt: str):
+            start = time.perf_counter()
+            reply = await llm.ainvoke(prompt)
+            latencies.append(time.perf_counter() - start)
+            return reply
+
+        with stage("cv.tagline"):
+            await asyncio.gather(*[timed(prompt) for prompt in prompts])
+        latencies.sort()
+        answered = cascade_stats().get("benchmark", {}).get("cv.tagline", {})
+        results[name] = {
+            "escalation_rate": 1 - answered.get("gpt-4o-mini", 0) / calls if name == "cascade" else 0.0,
+            "latency_mean": statistics.mean(latencies),
+            "latency_p95": latencies[int(0.95 * (len(latencies) - 1))],
+            "cost": sum(row["cost"] or 0 for row in store.rows()),
+        }
+    await cheap.stop()
+    await strong.stop()
+    return results
+
+
+async def run_router_test(calls_per_phase: int = 30, cooldown: float = 1.0) -> List[Dict[str, float]]:
+    """
+    Route calls of one request class between a fast and a slow stand-in
+    provider through three phases: both up, the fast one down, the fast one
+    back up (after its breaker's cooldown).
+
+    Returns, per phase, the share of calls each model answered and the calls that failed.
+    """
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    configure_limits("openai", requests_per_minute=60_000, tokens_per_minute=10_000_000, max_in_flight=64)
+    router = ModelRouter(cooldown=cooldown, min_samples=3)
+    add_listener(router.observe)
+    fast = MockLLMServer(requests_per_second=1000, burst=1000, latency=0.05)
+    slow = MockLLMServer(requests_per_second=1000, burst=1000, latency=0.3)
+    served = Counter()
+    for model, provider in ((Models.GPT4o_mini, fast), (Models.GPT4o, slow)):
+        client = _managed(ChatOpenAI)(model=model.value, base_url=await provider.start(),
+                                      api_key="stand-in", max_retries=0)
+        router.use_client(model, client.with_listeners(on_end=lambda _, name=model.value: served.update([name])))
+    llm = RoutedModel(RequestClass("interactive", 1.0, (Models.GPT4o, Models.GPT4o_mini)), router=router)
+
+    phases = []
+    for phase, fast_failing in (("both up", False), ("fast down", True), ("fast back", False)):
+        fast.failing = fast_failing
+        if phase == "fast back":
+            await asyncio.sleep(cooldown)
+        served.clear()
+        failed = 0
+        for i in range(calls_per_phase):
+            try:
+                await llm.ainvoke(f"{phase} {i}")
+            except Exception:
+                failed += 1
+        phases.append({"phase": phase, "failed": failed,
+                       **{model: served[model] / calls_per_phase for model in ("gpt-4o-mini", "gpt-4o")}})
+    await fast.stop()
+    await slow.stop()
+    return phases
+
+
+# Mostly ~50ms, but 5% of requests take 1.5s or more
+HEAVY_TAIL = {"distribution": "heavy_tail", "base": 0.05, "tail_share": 0.05, "tail": 1.5}
+
+
+async def run_hedging_test(calls: int = 400, concurrency: int = 20, budget: float = 0.1) -> Dict[str, Dict[str, float]]:
+    """
+    Send `calls` requests to a stand-in provider with heavy-tailed latency,
+    plainly and through a HedgedModel backed by a second such provider.
+
+    Returns p50, p99 and max latency per setup, plus the share of calls hedged.
+    """
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    configure_limits("openai", requests_per_minute=600_000, tokens_per_minute=100_000_000, max_in_flight=256)
+    primary_provider = MockLLMServer(requests_per_second=10_000, burst=10_000, latency=HEAVY_TAIL)
+    backup_provider = MockLLMServer(requests_per_second=10_000, burst=10_000, latency=HEAVY_TAIL)
+    primary = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=await primary_provider.start(),
+                                   api_key="stand-in", max_retries=0)
+    backup = _managed(ChatOpenAI)(model="gpt-4o", base_url=await backup_provider.start(),
+                                  api_key="stand-in", max_retries=0)
+    hedged = HedgedModel(primary, backup, percentile=90, budget=budget, initial_delay=0.2)
+
+    results = {}
+    # "streamed" is the hedged code path (the race is on first tokens) without hedging
+    unhedged = HedgedModel(primary, backup, budget=0.0, initial_delay=0.2)
+    for name, llm in (("plain", primary), ("streamed", unhedged), ("hedged", hedged)):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def timed(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                await llm.ainvoke(f"Score job {i}")
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*[timed(i) for i in range(calls)])
+        latencies.sort()
+        results[name] = {
+            "p50": statistics.median(latencies),
+            "p99": latencies[int(0.99 * (len(latencies) - 1))],
+            "max": latencies[-1],
+            "hedged": llm.counts["hedged"] / calls if isinstance(llm, HedgedModel) else 0.0,
+        }
+    await primary_provider.stop()
+    await backup_provider.stop()
+    return results
+
+
+async def run_replay_test(calls: int = 20) -> Dict[str, float]:
+    """
+    Record `calls` LangChain calls (plain and streamed) and a pydantic-ai run
+    against a stand-in provider, stop the provider, then replay them all from
+    the cassette, at recorded speed and 10x faster.
+
+    Returns wall times for each pass and whether the replies matched.
+    """
+    from pydantic_ai import Agent
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    configure_limits("openai", requests_per_minute=60_000, tokens_per_minute=10_000_000, max_in_flight=64)
+    provider = MockLLMServer(reply="Delivered $30M savings across three regions", latency=0.3,
+                             tokens_per_second=50, requests_per_second=1000, burst=1000)
+    base_url = await provider.start()
+    llm = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=base_url, api_key="stand-in", max_retries=0)
+    agent = Agent(OpenAIModel("gpt-4o-mini", provider=OpenAIProvider(base_url=base_url, api_key="stand-in")))
+    cassette_path = os.path.join(tempfile.mkdtemp(), "cassette.jsonl")
+
+    async def workload() -> List[str]:
+        replies = await asyncio.gather(*[llm.ainvoke(f"Write bullet {i}") for i in range(calls)])
+        streamed = "".join([chunk.content async for chunk in llm.astream("Write a tagline")])
+        run = await agent.run("Summarise the CV")
+        return [reply.content for reply in replies] + [streamed, run.data]
+
+    timings = {}
+    start = time.perf_counter()
+    with use_cassette(cassette_path, mode="record"):
+        recorded = await workload()
+    timings["record"] = time.perf_counter() - start
+    await provider.stop()
+
+    for name, speed in (("replay", 1.0), ("replay_10x", 10.0)):
+        start = time.perf_counter()
+        with use_cassette(cassette_path, mode="replay", speed=speed):
+            replayed = await workload()
+        timings[name] = time.perf_counter() - start
+        timings[f"{name}_matches"] = float(replayed == recorded)
+    return timings
+
+
+
+async def run_mock_scaling_test(cv_builds: int = 50, planner_runs: int = 200,
+                                latency: Optional[Dict] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run `cv_builds` concurrent CV builds (LangChain) and `planner_runs`
+    concurrent planner hat runs (pydantic-ai, structured output via the
+    final_result tool) against the mock LLM server.
+
+    Returns model calls, throughput (calls/s) and p50/p95 latency per workload.
+    """
+    from agent_trials3.hats import planner_hat
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    configure_limits("openai", requests_per_minute=600_000, tokens_per_minute=100_000_000, max_in_flight=512)
+    mock = MockLLMServer(
+        rules=[{"match": "tagline", "reply": GOOD_TAGLINE}],
+        reply="Delivered $30M savings by leading 45 engineers across three regions",
+        latency=latency or {"distribution": "lognormal", "median": 0.2, "sigma": 0.4},
+        tokens_per_second=200, requests_per_second=10_000, burst=10_000,
+    )
+    base_url = await mock.start()
+    llm = _managed(ChatOpenAI)(model="gpt-4o-mini", base_url=base_url, api_key="mock", max_retries=0)
+    builder = CV_Builder(llm=llm)
+    planner = planner_hat(OpenAIModel("qwen2.5:latest", provider=OpenAIProvider(base_url=base_url, api_key="mock")),
+                          tools=[])
+
+    async def timed(latencies: List[float], call) -> None:
+        start = time.perf_counter()
+        await call
+        latencies.append(time.perf_counter() - start)
+
+    results = {}
+    workloads = (
+        ("cv_builds", cv_builds, lambda i: builder.abuild_cv_components(jd=f"Program Manager {i}", user_input="")),
+        ("planner_runs", planner_runs, lambda i: planner.run(f"Plan the job search for role {i}")),
+    )
+    for name, count, call in workloads:
+        latencies: List[float] = []
+        before = mock.accepted
+        start = time.perf_counter()
+        await asyncio.gather(*[timed(latencies, call(i)) for i in range(count)])
+        wall = time.perf_counter() - start
+        latencies.sort()
+        results[name] = {
+            "runs": count,
+            "calls": mock.accepted - before,
+            "throughput": (mock.accepted - before) / wall,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        }
+    await mock.stop()
+    return results
+
+
+async def run_structured_output_test(runs: int = 100, malformed_rate: float = 0.3) -> Dict[str, Dict[str, float]]:
+    """
+    Run the planner hat `runs` times against a mock local model that gets
+    `malformed_rate` of its unconstrained structured outputs wrong: with the
+    raw model, with local JSON repair, and with json_schema constrained
+    decoding plus repair.
+
+    Returns result retries per run, failed runs and model calls for each setup.
+    """
+    from agent_trials3.hats import planner_hat, run_hat
+    from agent_trials3.structured import ConstrainedModel, structured_stats
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    mock = MockLLMServer(latency=0.05, requests_per_second=10_000, burst=10_000, malformed_rate=malformed_rate)
+    base_url = await mock.start()
+    raw = OpenAIModel("qwen2.5:latest", provider=OpenAIProvider(base_url=base_url, api_key="mock"))
+
+    results = {}
+    for name, native, repair in (("raw", False, False), ("repair", False, True), ("constrained", True, True)):
+        planner = planner_hat(raw, tools=[])
+        planner.name = f"planner/{name}"
+        planner.model = ConstrainedModel(raw, hat=planner.name, native=native, repair=repair)
+        before = mock.accepted
+        outcomes = await asyncio.gather(*[run_hat(planner, f"Plan the job search for role {i}", lambda _: None)
+                                          for i in range(runs)], return_exceptions=True)
+        counts = structured_stats()[planner.name]["qwen2.5:latest"]
+        results[name] = {
+            "retries_per_run": counts["retries"] / runs,
+            "repaired": counts["repaired"],
+            "failed": sum(isinstance(outcome, Exception) for outcome in outcomes),
+            "calls": mock.accepted - before,
+        }
+    await mock.stop()
+    return results
+
+async def run_team_scaling_test(subtasks: int = 40, worker_counts: Tuple[int, ...] = (1, 2, 4, 8),
+                                latency: Optional[Dict] = None) -> List[Dict[str, float]]:
+    """
+    Dispatch `subtasks` independent subtasks to the team from
+    config/orgs/jobsearch.yaml with each number of worker agents in
+    `worker_counts`, against the mock LLM server. Every subtask is a full
+    plan / do / replan run of a worker agent.
+
+    Returns subtasks/s, model calls and p50/p95 subtask latency per worker count.
+    """
+    from agent_trial2.hats import Subtask
+    from agent_trial2.team import agent_team
+
+    use_store(MetricsStore(os.path.join(tempfile.mkdtemp(), "metrics.sqlite3")))
+    configure_limits("openai", requests_per_minute=600_000, tokens_per_minute=100_000_000, max_in_flight=512)
+    mock = MockLLMServer(latency=latency or {"distribution": "lognormal", "median": 0.2, "sigma": 0.4},
+                         tokens_per_second=200, requests_per_second=10_000, burst=10_000)
+    base_url = await mock.start()
+
+    def make_llm(settings: Dict) -> ChatOpenAI:
+        return _managed(ChatOpenAI)(model=settings.get("model", "gpt-4o-mini"), base_url=base_url,
+                                    api_key="mock", max_retries=0)
+
+    results = []
+    for workers in worker_counts:
+        team = agent_team.from_config("config/orgs/jobsearch.yaml", make_llm=make_llm, workers=workers)
+        latencies: List[float] = []
+
+        async def timed(i: int) -> None:
+            start = time.perf_counter()
+            await team.dispatch([Subtask(task=f"Find openings for role {i}")])
+            latencies.append(time.perf_counter() - start)
+
+        before = mock.accepted
+        start = time.perf_counter()
+        await asyncio.gather(*[timed(i) for i in range(subtasks)])
+        wall = time.perf_counter() - start
+        await team.close()
+        latencies.sort()
+        results.append({
+            "workers": workers,
+            "throughput": subtasks / wall,
+            "calls": mock.accepted - before,
+            "failed": team.counts["failed"],
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        })
+    await mock.stop()
+    return results
+
+
+if __name__ == "__main__":
+    results = asyncio.run(run_load_test())
+    print(f"{'endpoint':32} {'count':>6} {'p50 (s)':>9} {'max (s)':>9}")
+    for path, stats in results.items():
+        if path == "total":
+            continue
+        print(f"{path:32} {stats['count']:>6} {stats['p50']:>9.3f} {stats['max']:>9.3f}")
+    print(f"\n{results['total']['count']} concurrent requests finished in {results['total']['wall']:.2f}s")
+
+    timings = asyncio.run(run_batch_score_test())
+    print(f"\n25-card search page scored in {timings['cold']:.2f}s "
+          f"(one LLM call takes 1.00s); again from cache in {timings['cached']:.3f}s")
+
+    saves = asyncio.run(run_save_retry_test())
+    print(f"\n20 concurrent saves of one job wrote {saves['rows']} Notion row(s); "
+          f"a retry answered in {saves['retry']:.3f}s without calling Notion")
+
+    limits = asyncio.run(run_rate_limit_test())
+    print(f"\n60 calls against a 10 req/s stand-in provider:")
+    for name, stats in limits.items():
+        print(f"  {name:10} {stats['wall']:6.2f}s  {stats['rate_limited']:4d} x 429  {stats['failed']:3d} failed")
+
+    cascade = asyncio.run(run_cascade_test())
+    print(f"\n40 taglines, cheap model first vs strong model only:")
+    for name, stats in cascade.items():
+        print(f"  {name:12} {stats['escalation_rate']:5.0%} escalated  mean {stats['latency_mean']:.2f}s  "
+              f"p95 {stats['latency_p95']:.2f}s  ${stats['cost']:.4f}")
+
+    routing = asyncio.run(run_router_test())
+    print(f"\nRouted calls, fast (gpt-4o-mini) vs slow (gpt-4o) stand-in:")
+    for phase in routing:
+        print(f"  {phase['phase']:10} fast {phase['gpt-4o-mini']:4.0%}  slow {phase['gpt-4o']:4.0%}  "
+              f"{phase['failed']} failed")
+
+    hedging = asyncio.run(run_hedging_test())
+    print(f"\n400 calls to a heavy-tailed stand-in provider, plain vs hedged at p90 (10% budget):")
+    for name, stats in hedging.items():
+        print(f"  {name:8} p50 {stats['p50']:.3f}s  p99 {stats['p99']:.3f}s  max {stats['max']:.3f}s  "
+              f"{stats['hedged']:.1%} hedged")
+
+    replay = asyncio.run(run_replay_test())
+    print(f"\nRecorded 22 calls in {replay['record']:.2f}s; replayed offline in {replay['replay']:.2f}s "
+          f"(10x: {replay['replay_10x']:.2f}s), replies identical: "
+          f"{bool(replay['replay_matches'] and replay['replay_10x_matches'])}")
+
+    streaming = asyncio.run(run_streaming_test())
+    print(f"\nStreamed 40-word completion: first text after {streaming['first_text']:.2f}s, "
+          f"complete after {streaming['complete']:.2f}s (metered TTFT {streaming['metered_ttft']:.2f}s)")
+
+    scaling = asyncio.run(run_mock_scaling_test())
+    print(f"\nConcurrent runs against the mock LLM server:")
+    for name, stats in scaling.items():
+        print(f"  {name:12} {stats['runs']:4d} runs  {stats['calls']:5d} calls  {stats['throughput']:6.0f} calls/s  "
+              f"p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s")
+
+    structured = asyncio.run(run_structured_output_test())
+    print(f"\n100 planner runs against a mock local model that botches 30% of its unconstrained JSON:")
+    for name, stats in structured.items():
+        print(f"  {name:12} {stats['retries_per_run']:.2f} retries/run  {stats['repaired']:3d} repaired  "
+              f"{stats['failed']} failed  {stats['calls']} calls")
+
+    team = asyncio.run(run_team_scaling_test())
+    print(f"\n40 independent subtasks through the jobsearch team against the mock LLM server:")
+    for stats in team:
+        print(f"  {stats['workers']:2d} workers  {stats['throughput']:5.2f} subtasks/s  {stats['calls']:4d} calls  "
+              f"p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  {stats['failed']} failed")
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+import yaml
+
+from framework.server.http import HttpServer, Request, Response, StreamResponse, sse_event
+
+
+LatencySpec = Union[float, Dict[str, Any], Callable[[], float]]
+
+
+def latency_sampler(spec: LatencySpec) -> Callable[[], float]:
+    """
+    A function returning one latency (seconds) per call.
+
+    Args:
+        spec: seconds, a function, or a distribution:
+            {"distribution": "uniform", "low": 0.1, "high": 0.5}
+            {"distribution": "lognormal", "median": 0.3, "sigma": 0.6}
+            {"distribution": "pareto", "scale": 0.1, "alpha": 2.5}
+            {"distribution": "heavy_tail", "base": 0.05, "tail_share": 0.05, "tail": 1.5}
+    """
+    if callable(spec):
+        return spec
+    if not isinstance(spec, dict):
+        return lambda: float(spec)
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "fixed":
+        return lambda: float(spec.get("seconds", 0.0))
+    if distribution == "uniform":
+        return lambda: random.uniform(spec["low"], spec["high"])
+    if distribution == "lognormal":
+        return lambda: random.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.5))
+    if distribution == "pareto":
+        return lambda: spec["scale"] * random.paretovariate(spec.get("alpha", 2.5))
+    if distribution == "heavy_tail":
+        def heavy_tail() -> float:
+            if random.random() < spec.get("tail_share", 0.05):
+                return spec.get("tail", 1.5) * random.paretovariate(3)
+            return spec.get("base", 0.05) * random.uniform(0.8, 1.6)
+        return heavy_tail
+    raise ValueError(f"Unknown latency distribution: {distribution}")
+
+
+def schema_example(schema: Dict, definitions: Optional[Dict] = None) -> Any:
+    """A small value valid against a JSON schema, to answer structured-output tools"""
+    definitions = definitions if definitions is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return schema_example(definitions[schema["$ref"].split("/")[-1]], definitions)
+    for combined in ("anyOf", "oneOf", "allOf"):
+        if combined in schema:
+            return schema_example(schema[combined][0], definitions)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    if "default" in schema:
+        return schema["default"]
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((option for option in kind if option != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        required = schema.get("required", list(properties))
+        return {name: schema_example(properties[name], definitions) for name in required if name in properties}
+    if kind == "array":
+        return [schema_example(schema.get("items", {"type": "string"}), definitions)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return "mock"
+
+
+def _text(content) -> str:
+    """Text of an OpenAI message content (a string or a list of parts)"""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _tokens(text: str) -> int:
+    # a word is close enough to a token for load testing
+    return len(text.split())
+
+
+class MockLLMServer:
+    """
+    A local OpenAI-compatible chat server for load and scaling tests.
+
+    Speaks /v1/chat/completions (plain, `n` choices, streaming, tool calls)
+    and /v1/models, so LangChain's ChatOpenAI, the OpenAI SDK and
+    pydantic-ai's OpenAIModel can all point at it through `base_url`.
+
+    Replies come from `rules`, tried in order against the last user message:
+
+        {"match": "tagline", "reply": "Leader | 10+ Years | ..."}
+        {"match": "weather", "tool_call": {"name": "get_weather", "arguments": {"city": "Tokyo"}}}
+
+    A reply is a template with {prompt}, {model} and {n} (the request's
+    sequence number); a rule may also give a function of the request body.
+    Requests no rule matches get `reply`. A tool call is only made while the
+    conversation has no tool result yet, so agents run a realistic
+    call-tool-then-answer loop. Structured-output tools (pydantic-ai's
+    final_result*, or a forced tool_choice) are answered with arguments
+    generated from their JSON schema, and a json_schema response_format
+    with a matching JSON reply. `malformed_rate` of the structured answers
+    not constrained by a response_format come out the ways local models
+    get JSON wrong: fenced in text instead of a tool call, with trailing
+    commas or Python quoting, nested one level too deep, or missing fields.
+
+    Timing and failures:
+        latency: per-request delay before the first token (see latency_sampler)
+        tokens_per_second: pace of the reply, streamed or not
+        requests_per_second / burst: a token bucket answering 429 with
+            retry-after and x-ratelimit headers once empty
+        error_rates: {"429": 0.02, "500": 0.01} injected at random
+        failing: set to answer every request with a 503 (an outage)
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None,
+                 reply: Union[str, Callable[[Dict], str]] = "Mock reply to: {prompt:.60}",
+                 latency: LatencySpec = 0.1, tokens_per_second: Optional[float] = None,
+                 requests_per_second: Optional[float] = None, burst: int = 5,
+                 error_rates: Optional[Dict[str, float]] = None, malformed_rate: float = 0.0):
+        self.rules = [dict(rule, pattern=re.compile(rule["match"], re.IGNORECASE)) if "match" in rule else rule
+                      for rule in rules or []]
+        self.reply = reply
+        self.latency = latency_sampler(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate = requests_per_second
+        self.burst = burst
+        self.level = float(burst)
+        self.updated = time.monotonic()
+        self.error_rates = {str(status): rate for status, rate in (error_rates or {}).items()}
+        self.malformed_rate = malformed_rate
+        self.failing = False
+        self.malformed = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.injected = 0
+        self.requests = 0
+        self.server = HttpServer()
+        self.server.add_route("POST", "/v1/chat/completions", self.chat_completions)
+        self.server.add_route("GET", "/v1/models", self.models)
+
+    @classmethod
+    def from_config(cls, path: str) -> "MockLLMServer":
+        """Build from a YAML file with the constructor's arguments (see config/mock_llm.yaml)"""
+        with open(path) as f:
+            return cls(**(yaml.safe_load(f) or {}))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL (port 0 picks a free port)"""
+        self._server = await self.server.start(host, port)
+        return f"http://{host}:{self._server.sockets[0].getsockname()[1]}/v1"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def models(self, request: Request) -> Response:
+        return Response.json({"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+
+    # Admission
+
+    def _rate_limited(self, headers: Dict[str, str]) -> Optional[Response]:
+        if self.rate is None:
+            return None
+        now = time.monotonic()
+        self.level = min(self.burst, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        headers["x-ratelimit-limit-requests"] = str(int(self.rate * 60))
+        headers["x-ratelimit-reset-requests"] = f"{1 / self.rate:.3f}s"
+        if self.level < 1:
+            self.rejected += 1
+            headers["retry-after"] = f"{(1 - self.level) / self.rate:.3f}"
+            headers["x-ratelimit-remaining-requests"] = "0"
+            return self._error(429, "Rate limit reached", "requests", headers)
+        self.level -= 1
+        headers["x-ratelimit-remaining-requests"] = str(int(self.level))
+        return None
+
+    def _error(self, status: int, message: str, kind: str, headers: Dict[str, str]) -> Response:
+        response = Response.json({"error": {"message": message, "type": kind}}, status=status)
+        response.headers.update(headers)
+        return response
+
+    def _injected_error(self) -> Optional[Response]:
+        for status, rate in self.error_rates.items():
+            if random.random() < rate:
+                self.injected += 1
+                headers = {"retry-after": "0.1"} if status == "429" else {}
+                return self._error(int(status), "Injected error", "mock", headers)
+        return None
+
+    # Replies
+
+    def _answer(self, body: Dict, sequence: int) -> Dict:
+        """{"content": str} or {"tool_call": {"name", "arguments"}} for a request"""
+        messages = body.get("messages", [])
+        prompt = next((_text(message.get("content")) for message in reversed(messages)
+                       if message.get("role") == "user"), "")
+        tools = {tool["function"]["name"]: tool["function"] for tool in body.get("tools", [])
+                 if tool.get("type") == "function"}
+        has_tool_result = any(message.get("role") == "tool" for message in messages)
+        values = {"prompt": prompt, "model": body.get("model", "mock"), "n": sequence}
+
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return {"content": json.dumps(schema_example(response_format["json_schema"].get("schema", {})))}
+
+        forced = body.get("tool_choice")
+        if isinstance(forced, dict) and forced.get("function", {}).get("name") in tools:
+            return self._structured(tools[forced["function"]["name"]])
+
+        for rule in self.rules:
+            if "pattern" in rule and not rule["pattern"].search(prompt):
+                continue
+            if "tool_call" in rule:
+                if has_tool_result or rule["tool_call"]["name"] not in tools:
+                    continue
+                return {"tool_call": {"name": rule["tool_call"]["name"],
+                                      "arguments": rule["tool_call"].get("arguments", {})}}
+            reply = rule.get("reply", self.reply)
+            return {"content": reply(body) if callable(reply) else reply.format(**values)}
+
+        output_tools = [tool for name, tool in tools.items() if name.startswith("final_result")]
+        if output_tools or forced == "required" and tools:
+            return self._structured(output_tools[0] if output_tools else next(iter(tools.values())))
+        return {"content": self.reply(body) if callable(self.reply) else self.reply.format(**values)}
+
+    def _structured(self, tool: Dict) -> Dict:
+        arguments = schema_example(tool.get("parameters", {}))
+        if random.random() >= self.malformed_rate:
+            return {"tool_call": {"name": tool["name"], "arguments": arguments}}
+        self.malformed += 1
+        text = json.dumps(arguments)
+        slip = random.randrange(5)
+        if slip == 0:
+            return {"content": f"Here is the result:\n```json\n{text}\n```"}
+        if slip == 1:
+            text = re.sub(r"([}\]])$", r", \1", text.replace("]", ", ]"))
+        elif slip == 2:
+            text = repr(arguments)
+        elif slip == 3:
+            text = json.dumps({tool.get("parameters", {}).get("title", "result"): arguments})
+        else:
+            text = "{}"
+        return {"tool_call": {"name": tool["name"], "arguments": text}}
+
+    def _pace(self, text: str) -> float:
+        return _tokens(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    async def chat_completions(self, request: Request) -> Union[Response, StreamResponse]:
+        self.requests += 1
+        sequence = self.requests
+        if self.failing:
+            return self._error(503, "Service unavailable", "outage", {"retry-after": "0"})
+        headers: Dict[str, str] = {}
+        refused = self._rate_limited(headers) or self._injected_error()
+        if refused:
+            return refused
+        self.accepted += 1
+
+        body = request.json()
+        await asyncio.sleep(self.latency())
+        if body.get("stream"):
+            return StreamResponse(self._stream(body, sequence), headers=headers)
+
+        answers = [self._answer(body, sequence) for _ in range(body.get("n", 1))]
+        await asyncio.sleep(max(self._pace(answer.get("content") or json.dumps(answer.get("tool_call")))
+                                for answer in answers))
+        choices = []
+        for index, answer in enumerate(answers):
+            if "tool_call" in answer:
+                message = {"role": "assistant", "content": None, "tool_calls": [self._tool_call(answer["tool_call"])]}
+                choices.append({"index": index, "finish_reason": "tool_calls", "message": message})
+            else:
+                message = {"role": "assistant", "content": answer["content"]}
+                choices.append({"index": index, "finish_reason": "stop", "message": message})
+        response = Response.json({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": choices,
+            "usage": self._usage(body, answers),
+        })
+        response.headers.update(headers)
+        return response
+
+    def _tool_call(self, call: Dict) -> Dict:
+        return {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                "function": {"name": call["name"], "arguments": call["arguments"] if isinstance(call["arguments"], str)
+                             else json.dumps(call["arguments"])}}
+
+    def _usage(self, body: Dict, answers: List[Dict]) -> Dict[str, int]:
+        prompt_tokens = sum(_tokens(_text(message.get("content"))) for message in body.get("messages", []))
+        completion_tokens = sum(_tokens(answer.get("content") or json.dumps(answer.get("tool_call")))
+                                for answer in answers)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    async def _stream(self, body: Dict, sequence: int) -> AsyncIterator[bytes]:
+        answer = self._answer(body, sequence)
+        chunk = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+                 "created": int(time.time()), "model": body.get("model", "mock")}
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+        if "tool_call" in answer:
+            call = self._tool_call(answer["tool_call"])
+            arguments = call["function"]["arguments"]
+            deltas = [{"tool_calls": [{"index": 0, "id": call["id"], "type": "function",
+                                       "function": {"name": call["function"]["name"], "arguments": ""}}]}]
+            deltas += [{"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + 8]}}]}
+                       for start in range(0, len(arguments), 8)]
+            finish_reason = "tool_calls"
+        else:
+            words = answer["content"].split(" ")
+            deltas = [{"role": "assistant", "content": words[0]}] + [{"content": f" {word}"} for word in words[1:]]
+            finish_reason = "stop"
+
+        for position, delta in enumerate(deltas):
+            if position and delay:
+                await asyncio.sleep(delay)
+            yield sse_event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        yield sse_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                         "usage": self._usage(body, [answer])})
+        yield b"data: [DONE]\n\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434, help="11434 stands in for a local Ollama")
+    parser.add_argument("--config", default="config/mock_llm.yaml", help="rules, latency, limits and error rates")
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        mock = MockLLMServer.from_config(args.config)
+        print(f"Mock LLM serving on {await mock.start(args.host, args.port)}")
+        async with mock._server:
+            await mock._server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import html as html_lib
+import re
+from typing import Dict, List
+
+
+# The extension posts the full page HTML (several MB). Parsing it into a DOM
+# would dominate request CPU time, so these helpers only look at small slices
+# located with plain string searches and regexes.
+
+MAX_TEXT_CHARS = 20000
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_PROFILE_LINK_RE = re.compile(r'href="(?:https://www\.linkedin\.com)?(/in/[^/"?]+)/?[^"]*"')
+
+
+def html_to_text(fragment: str, limit: int = MAX_TEXT_CHARS) -> str:
+    """Strip tags from an HTML fragment and collapse whitespace"""
+    fragment = re.sub(r"<(br|/p|/li|/div|/h\d)[^>]*>", "\n", fragment, flags=re.IGNORECASE)
+    text = html_lib.unescape(_TAG_RE.sub(" ", fragment))
+    text = _SPACE_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n", text)
+    return text.strip()[:limit]
+
+
+def page_title(html: str) -> str:
+    match = _TITLE_RE.search(html, 0, 200000)
+    return html_to_text(match.group(1), limit=500) if match else ""
+
+
+def _slice_after(html: str, marker: str, length: int = 120000) -> str:
+    start = html.find(marker)
+    if start < 0:
+        return ""
+    # skip the rest of the tag the marker sits in
+    start = html.find(">", start) + 1
+    return html[start:start + length]
+
+
+def _class_text(html: str, class_name: str, limit: int = 300) -> str:
+    """Text of the first element carrying the given CSS class"""
+    # str.find is far cheaper than running the regex over the whole page
+    index = html.find(class_name)
+    if index < 0:
+        return ""
+    window = html[max(0, index - 500):index + 5000]
+    match = re.search(r'class="[^"]*\b' + re.escape(class_name) + r'\b[^"]*"[^>]*>(.*?)</',
+                      window, re.DOTALL)
+    return html_to_text(match.group(1), limit=limit) if match else ""
+
+
+def parse_job_page(html: str, url: str = "") -> Dict[str, str]:
+    """
+    Extract the basic job fields from a LinkedIn job page.
+
+    Args:
+        html (str): Full page HTML as posted by the extension
+        url (str, optional): The page URL. Defaults to "".
+
+    Returns:
+        Dict[str, str]: title, company, location, description and url
+    """
+    # "<Role> | <Company> | LinkedIn" is the most stable source for both fields
+    title_parts = [part.strip() for part in page_title(html).split("|")]
+    role = _class_text(html, "job-details-jobs-unified-top-card__job-title") or title_parts[0]
+    company = (_class_text(html, "job-details-jobs-unified-top-card__company-name")
+               or (title_parts[1] if len(title_parts) > 2 else ""))
+    location = _class_text(html, "job-details-jobs-unified-top-card__bullet")
+
+    description_html = _slice_after(html, 'id="job-details"') or _slice_after(html, "jobs-description__content")
+    return {
+        "title": role,
+        "company": company,
+        "location": location,
+        "description": html_to_text(description_html),
+        "url": url,
+    }
+
+
+def parse_profile_page(html: str, url: str = "") -> Dict[str, str]:
+    """
+    Extract name, headline and the visible profile text from a profile page.
+
+    Args:
+        html (str): Full page HTML as posted by the extension
+        url (str, optional): The page URL. Defaults to "".
+
+    Returns:
+        Dict[str, str]: name, headline, text and url
+    """
+    # "(3) Jane Doe | LinkedIn" -> "Jane Doe"
+    name = re.sub(r"^\(\d+\)\s*", "", page_title(html).split("|")[0]).strip()
+    return {
+        "name": _class_text(html, "text-heading-xlarge") or name,
+        "headline": _class_text(html, "text-body-medium"),
+        "text": html_to_text(_slice_after(html, "<main")),
+        "url": url,
+    }
+
+
+def parse_connections_page(html: str) -> List[str]:
+    """
+    Collect the unique profile URLs linked from a connections page.
+
+    Args:
+        html (str): Full page HTML as posted by the extension
+
+    Returns:
+        List[str]: Profile URLs in page order
+    """
+    seen = {}
+    for path in _PROFILE_LINK_RE.findall(_slice_after(html, "<main", length=len(html))):
+        seen.setdefault(f"https://www.linkedin.com{path}/", None)
+    return list(seen)
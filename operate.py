@@ -1,6 +1,6 @@
 from agent_trials.core.agents.worker2 import Worker
 from framework.core.brains import get_model, tool_to_call, Models
-from from 
+from framework.core.router import default_router
 from dotenv import load_dotenv
 import os
 
@@ -8,7 +8,8 @@ import os
 def main():
     # Create worker instance with everything included
     
-    llm= get_model(Models.QWQ )
+    # the worker binds tools to a concrete client, so pick the model up front
+    llm= default_router.client(default_router.pick("tools"))
     worker = Worker(llm=llm)
     
     # Run example queries
@@ -34,7 +35,7 @@ def main2():
     
 
 if __name__ == "__main__":
-    main2()
+    main()
     
     
     
@@ -2,12 +2,15 @@ from framework.cv_builder import CV_Builder
 from framework.connectors.notion.connector import NotionConnection
 from framework.bookkeepers.job_applications import JobApplicationManager
 from framework.core.brains import get_model,Models
+from framework.core.router import route
 from framework.core.config_manager import master_cv_bullets, master_cv, settings
 from agent_trials3.base_agent import base_agent
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.models.groq import GroqModel
+from langgraph.types import Command
 import asyncio
+import uuid
 
 
 from dotenv import load_dotenv
@@ -25,7 +28,7 @@ def llm_ollama(name:str)->OpenAIModel:
 
 
 def test_app():
-    llm = get_model(Models.CLAUDE_SONNET)
+    llm = route("cv")
     cv= CV_Builder(llm=llm)
     user_input=" "
     jd=""
@@ -67,15 +70,24 @@ async def test_app2(input_text):
     # Get the app
     app = agent.get_app()
     
-    # Run the agent
+    # Run the agent; the checkpointer keeps the run under its thread id
     inputs = {"input": input_text}
-    config = {}
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
     
     try:
-        async for event in app.astream(inputs, config=config):
-            for k, v in event.items():
-                if k != "__end__":
-                    agent.display.thinking(f"Event: {k} = {v}")
+        while inputs is not None:
+            async for event in app.astream(inputs, config=config):
+                for k, v in event.items():
+                    if k != "__end__":
+                        agent.display.thinking(f"Event: {k} = {v}")
+            
+            # A run paused on a question resumes with the answer typed at the console
+            inputs = None
+            snapshot = await app.aget_state(config)
+            for task in snapshot.tasks:
+                for question in task.interrupts:
+                    reply = await asyncio.to_thread(input, f"{question.value['question']}\n> ")
+                    inputs = Command(resume=reply)
     except Exception as e:
         agent.display.error(f"Error running agent: {str(e)}")
     
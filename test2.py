@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import asyncio
+import hashlib
 
 # Import your modules
 from agent_trials3.base_agent import base_agent
@@ -19,16 +20,57 @@ st.set_page_config(page_title="Agent Trials Platform", layout="wide")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "your-openai-api-key")
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "your-groq-api-key")
 
-def get_model(model_name):
+# Display name -> (provider, model name) for the selectable models
+MODEL_CATALOGUE = {
+    "OpenAI GPT-4o": ("openai", "gpt-4o"),
+    "OpenAI GPT-4o-mini": ("openai", "gpt-4o-mini"),
+    "Groq llama4": ("groq", "meta-llama/llama-4-scout-17b-16e-instruct"),
+}
+
+
+def config_fingerprint() -> str:
+    """Fingerprint of everything the cached models depend on.
+    
+    Passed into the cached loaders so a changed key or catalogue entry
+    builds fresh clients instead of reusing stale ones.
+    """
+    source = repr((OPENAI_API_KEY, GROQ_API_KEY, sorted(MODEL_CATALOGUE.items())))
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+# Streamlit re-executes this script on every widget interaction, so model
+# clients are cached as resources and shared across reruns and sessions.
+@st.cache_resource(show_spinner=False)
+def get_model(model_name, fingerprint):
     """Get the appropriate model based on the selected name"""
-    if model_name == "OpenAI GPT-4o":
-        return OpenAIModel(model="gpt-4o")
-    elif model_name == "OpenAI GPT-4o-mini":
-        return OpenAIModel( model="GPT-4o-mini")
-    elif model_name == "Groq llama4":
-        return GroqModel( model="meta-llama/llama-4-scout-17b-16e-instruct")
-    else:
-        return OpenAIModel( model="GPT-4o-mini")
+    provider, name = MODEL_CATALOGUE.get(model_name, MODEL_CATALOGUE["OpenAI GPT-4o-mini"])
+    if provider == "groq":
+        return GroqModel(name, provider=GroqProvider(api_key=GROQ_API_KEY))
+    return OpenAIModel(name, provider=OpenAIProvider(api_key=OPENAI_API_KEY))
+
+
+def get_agent(think_model_name, do_model_name, interact_model_name, fingerprint):
+    """Build the agent (hats and compiled graph) once per session and model selection.
+    
+    Agents are not shared across sessions: the UI gives each its own display
+    and run state.
+    """
+    key = (think_model_name, do_model_name, interact_model_name, fingerprint)
+    if st.session_state.get("agent_key") != key:
+        st.session_state.agent = base_agent(
+            llm_think=get_model(think_model_name, fingerprint),
+            llm_do=get_model(do_model_name, fingerprint),
+            llm_interact=get_model(interact_model_name, fingerprint)
+        )
+        st.session_state.agent_key = key
+    return st.session_state.agent
+
+
+def clear_cached_models():
+    """Drop every cached model client, and this session's agent"""
+    get_model.clear()
+    st.session_state.pop("agent", None)
+    st.session_state.pop("agent_key", None)
 
 # Initialize the Streamlit UI if not already in session state
 if 'ui' not in st.session_state:
@@ -41,19 +83,19 @@ with st.sidebar:
     # Model selection dropdowns
     think_model_name = st.selectbox(
         "Thinking Model",
-        ["OpenAI GPT-4o", "GPT-4o-mini", "Groq llama4"],
+        list(MODEL_CATALOGUE),
         index=0
     )
     
     do_model_name = st.selectbox(
         "Doing Model",
-        ["OpenAI GPT-4o", "GPT-4o-mini", "Groq llama4"],
+        list(MODEL_CATALOGUE),
         index=2
     )
     
     interact_model_name = st.selectbox(
         "Interaction Model",
-        ["OpenAI GPT-4o", "GPT-4o-mini", "Groq llama4"],
+        list(MODEL_CATALOGUE),
         index=2
     )
     
@@ -61,16 +103,12 @@ with st.sidebar:
     if st.button("Initialize Agent"):
         with st.spinner("Initializing agent..."):
             try:
-                # Get the model instances
-                llm_think = get_model(think_model_name)
-                llm_do = get_model(do_model_name)
-                llm_interact = get_model(interact_model_name)
-                
-                # Create the base agent
-                agent = base_agent(
-                    llm_think=llm_think,
-                    llm_do=llm_do,
-                    llm_interact=llm_interact
+                # Kept per session and model selection, so re-initializing is instant
+                agent = get_agent(
+                    think_model_name,
+                    do_model_name,
+                    interact_model_name,
+                    config_fingerprint()
                 )
                 
                 # Connect the agent to our UI
@@ -79,6 +117,12 @@ with st.sidebar:
                 st.success("Agent initialized successfully!")
             except Exception as e:
                 st.error(f"Failed to initialize agent: {str(e)}")
+    
+    # Explicit invalidation, e.g. after rotating keys or editing the catalogue
+    if st.button("Reload Models"):
+        clear_cached_models()
+        st.session_state.ui.agent = None
+        st.success("Cached models cleared")
 
 # Run the UI with the connected agent
 st.session_state.ui.run_app()
\ No newline at end of file
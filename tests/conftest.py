@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# config/settings.yaml is read relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture(autouse=True)
+def metrics(tmp_path):
+    """Every test meters into its own store instead of ./logs/metrics.sqlite3"""
+    from framework.core.metrics import MetricsStore, use_store
+
+    store = MetricsStore(str(tmp_path / "metrics.sqlite3"))
+    use_store(store)
+    yield store
+    use_store(None)
+    store.close()
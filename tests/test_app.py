@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+from framework.server.app import BackendApp
+from framework.server.http import HttpError, Request
+from framework.server.jobs import JobQueue
+
+
+class PausedAgent:
+    """One run waiting for a reply; resuming it finishes it"""
+
+    def __init__(self):
+        self.waiting = {"run-1"}
+        self.resumed = []
+
+    def waiting_runs(self):
+        return sorted(self.waiting)
+
+    async def resume(self, run_id, reply):
+        await asyncio.sleep(0.01)
+        self.waiting.discard(run_id)
+        self.resumed.append(reply)
+        return {"run_id": run_id, "status": "done", "response": reply}
+
+
+def reply(run_id, text):
+    request = Request("POST", f"/api/agent/runs/{run_id}/reply", {}, json.dumps({"reply": text}).encode())
+    request.match_info = {"run_id": run_id}
+    return request
+
+
+def test_two_replies_resume_a_paused_run_once(tmp_path):
+    agent = PausedAgent()
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    app = BackendApp(job_manager=None, cv_builder=None, job_queue=queue, job_scorer=None, agent=agent)
+
+    async def main():
+        await queue.start()
+        try:
+            first, second = [json.loads(response.body) for response in await asyncio.gather(
+                app.agent_reply(reply("run-1", "yes")), app.agent_reply(reply("run-1", "no")))]
+            assert first["jobId"] == second["jobId"]
+            assert (await queue.wait(first["jobId"], timeout=5))["status"] == "done"
+            with pytest.raises(HttpError):
+                await app.agent_reply(reply("run-1", "again"))
+            # a reply that got past the check just before the run was resumed is refused
+            late = await queue.submit("agent-reply", {"run_id": "run-1", "reply": "late"})
+            assert (await queue.wait(late["jobId"], timeout=5))["status"] == "failed"
+        finally:
+            await queue.stop()
+    asyncio.run(main())
+    assert agent.resumed == ["yes"]
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from agent_trials3.base_agent import PlanExecute, base_agent
+from agent_trials3.budget import BudgetExceeded, RunBudget
+
+
+class Display:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class Reflections:
+    def append(self, *args, **kwargs):
+        pass
+
+
+def make_agent(outcome):
+    agent = base_agent.__new__(base_agent)
+    agent.display, agent.reflections = Display(), Reflections()
+    agent.budget = RunBudget()
+    agent.doer, agent.do_escalation = SimpleNamespace(_max_result_retries=1), []
+
+    async def run_hat(hat, prompt, meter, escalation):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(data=SimpleNamespace(answer_short_points=outcome))
+    agent._run_hat = run_hat
+    return agent
+
+
+@pytest.mark.parametrize("outcome", ["done", BudgetExceeded("calls", "out of calls"), ValueError("boom")])
+def test_execute_step_adds_only_its_own_step(outcome):
+    agent = make_agent(outcome)
+    builder = StateGraph(PlanExecute)
+    builder.add_node("first", agent.execute_step)
+    builder.add_node("second", agent.execute_step)
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", END)
+    state = asyncio.run(builder.compile().ainvoke({"input": "x", "plan": ["look it up"], "past_steps": []}))
+    assert len(state["past_steps"]) == 2
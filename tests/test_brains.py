@@ -0,0 +1,120 @@
+import asyncio
+import gc
+import threading
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from framework.core import brains
+from framework.core.limits import configure_limits
+from framework.core.metrics import current_stage
+
+
+def fake_model(*replies):
+    model = brains._managed(GenericFakeChatModel)(messages=iter([AIMessage(content=reply) for reply in replies]))
+    limiter = configure_limits(brains.provider_of(model), max_in_flight=1)
+    return model, limiter
+
+
+def test_astream_closed_early_releases_its_slot(metrics):
+    model, limiter = fake_model("one two three four", "five six")
+
+    async def first_chunk():
+        async for chunk in model.astream("hello"):
+            return chunk
+
+    # the abandoned stream is closed by the event loop's asyncgen finalizer, in another context
+    assert asyncio.run(first_chunk()).content
+    gc.collect()
+
+    assert limiter.slots.in_use == 0
+    assert brains._admitted.get() is False
+    assert len(metrics.rows()) == 1
+
+    # the next call is admitted, not blocked on a leaked slot
+    chunks = []
+    thread = threading.Thread(target=lambda: chunks.extend(model.stream("again")), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert "".join(chunk.content for chunk in chunks) == "five six"
+    assert len(metrics.rows()) == 2
+
+
+def test_stream_closed_early_releases_its_slot(metrics):
+    model, limiter = fake_model("one two three", "four")
+
+    stream = model.stream("hello")
+    next(stream)
+    stream.close()
+
+    assert limiter.slots.in_use == 0
+    assert brains._admitted.get() is False
+    assert model.invoke("again").content == "four"
+    assert limiter.slots.in_use == 0
+
+
+def test_tool_call_stream_native_calls_complete_when_the_next_starts():
+    stream = brains.ToolCallStream()
+    chunks = [
+        AIMessageChunk(content="", tool_call_chunks=[{"name": "a", "args": '{"x"', "id": "1", "index": 0}]),
+        AIMessageChunk(content="", tool_call_chunks=[{"name": None, "args": ': 1}', "id": None, "index": 0}]),
+        AIMessageChunk(content="", tool_call_chunks=[{"name": "b", "args": '{"y": 2}', "id": "2", "index": 1}]),
+    ]
+    assert stream.feed(chunks[0]) == [] and stream.feed(chunks[1]) == []
+    assert stream.feed(chunks[2]) == [{"name": "a", "arguments": {"x": 1}, "id": "1"}]
+    assert stream.close() == [{"name": "b", "arguments": {"y": 2}, "id": "2"}]
+
+
+def test_tool_call_stream_index_less_calls_stay_separate():
+    # ChatOllama streams whole calls; their chunks carry no index
+    stream = brains.ToolCallStream()
+    both = AIMessageChunk(content="", tool_calls=[{"name": "a", "args": {"x": 1}, "id": "1"},
+                                                  {"name": "b", "args": {"y": 2}, "id": "2"}])
+    assert all(chunk["index"] is None for chunk in both.tool_call_chunks)
+    calls = stream.feed(both)
+    assert [(call["name"], call["arguments"]) for call in calls] == [("a", {"x": 1}), ("b", {"y": 2})]
+
+    later = AIMessageChunk(content="", tool_calls=[{"name": "c", "args": {}, "id": "3"}])
+    assert [call["name"] for call in stream.feed(later)] == ["c"]
+    assert stream.close() == []
+
+
+def test_tool_call_stream_json_in_text():
+    stream = brains.ToolCallStream()
+    text = ('Sure. {"name": "search", "arguments": {"filter": {"q": "a } b", "n": {"m": 1}}}}, '
+            '[{"function": {"name": "save", "arguments": "{\\"id\\": 3}"}}]')
+    calls = []
+    for position in range(0, len(text), 7):
+        calls += stream.feed(text[position:position + 7])
+    assert calls == [
+        {"name": "search", "arguments": {"filter": {"q": "a } b", "n": {"m": 1}}}},
+        {"name": "save", "arguments": {"id": 3}},
+    ]
+    assert stream.close() == []
+
+
+def test_stream_text_tags_the_model_call_not_the_consumer(metrics):
+    model, _ = fake_model("one two three")
+    seen = []
+    for text in brains.stream_text("hi", model, stage="cv.test"):
+        seen.append(current_stage())
+    assert seen and set(seen) == {""}
+    assert metrics.rows()[-1]["stage"] == "cv.test"
+
+
+def test_astream_text_closed_early_in_another_task(metrics):
+    model, _ = fake_model("one two three")
+
+    async def main():
+        stream = brains.astream_text("hi", model, stage="cv.test")
+
+        async def first():
+            async for text in stream:
+                assert current_stage() == ""
+                return text
+        assert await asyncio.create_task(first())
+        # finalized from a context other than the one that started it
+        await asyncio.create_task(stream.aclose())
+    asyncio.run(main())
+    assert metrics.rows()[-1]["stage"] == "cv.test"
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from agent_trials3.budget import BudgetExceeded, RunBudget, add_usage
+from agent_trials3.hats import run_hat
+
+
+def looping_model():
+    """Calls its tool forever, never giving a result"""
+    def respond(messages, info):
+        return ModelResponse(parts=[ToolCallPart("ping", {})])
+
+    async def stream(messages, info):
+        yield {0: DeltaToolCall(name="ping", json_args="{}")}
+    return FunctionModel(respond, stream_function=stream)
+
+
+def chatty_model(words=400):
+    async def stream(messages, info):
+        for _ in range(words):
+            yield "word "
+    return FunctionModel(lambda messages, info: ModelResponse(parts=[TextPart("word " * words)]),
+                         stream_function=stream)
+
+
+def hat(model):
+    agent = Agent(model=model, name="test", result_type=str)
+
+    @agent.tool_plain
+    def ping() -> str:
+        return "pong"
+    return agent
+
+
+def run(agent, meter):
+    return asyncio.run(run_hat(agent, "go", lambda text: None, usage=meter.usage, usage_limits=meter.usage_limits()))
+
+
+def test_add_usage_and_exceeded():
+    used = add_usage({"calls": 2, "tokens": 10}, {"calls": 1, "seconds": 0.5})
+    assert used == {"calls": 3, "tokens": 10, "seconds": 0.5, "replans": 0}
+    budget = RunBudget(max_calls=3, max_replans=1)
+    assert budget.exceeded(used) == "calls"
+    assert budget.exceeded({"calls": 1, "replans": 1}) == "replans"
+    assert RunBudget().exceeded(used) is None
+    assert budget.report(used) == "calls 3/3, tokens 10, seconds 0, replans 0/1"
+
+
+def test_call_limit_is_charged_to_calls():
+    meter = RunBudget(max_calls=5).meter({"calls": 2})
+    with pytest.raises(UsageLimitExceeded) as error:
+        run(hat(looping_model()), meter)
+    assert meter.usage.requests == 3
+    assert meter.charge(error.value) == "calls"
+    with pytest.raises(BudgetExceeded, match="calls 5/5"):
+        meter.check()
+
+
+def test_token_limit_is_charged_to_tokens():
+    meter = RunBudget(max_tokens=300).meter({"tokens": 100})
+    with pytest.raises(UsageLimitExceeded) as error:
+        run(hat(chatty_model()), meter)
+    # the stream was cut off before its tokens were counted
+    assert meter.charge(error.value) == "tokens"
+    assert meter.exceeded() == "tokens" and meter.spent()["tokens"] == 200
+
+
+def test_pydantic_ai_request_limit_is_not_the_budget():
+    meter = RunBudget(max_tokens=10**9).meter(None)
+    with pytest.raises(UsageLimitExceeded) as error:
+        run(hat(looping_model()), meter)
+    assert meter.charge(error.value) is None
+
+
+def test_seconds_left_counts_earlier_steps():
+    meter = RunBudget(max_seconds=10).meter({"seconds": 9.5})
+    assert 0 < meter.seconds_left() <= 0.5
+    assert RunBudget().meter(None).seconds_left() is None
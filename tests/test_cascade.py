@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from framework.core import cascade
+from framework.core.cascade import Cascade, CascadeExhausted, ValidationFailed
+from framework.core.metrics import stage
+
+
+class Answer(BaseModel):
+    value: int
+
+
+def fake(*replies):
+    return GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+
+
+class Broken(GenericFakeChatModel):
+    def _generate(self, *args, **kwargs):
+        raise ConnectionError("no server")
+
+
+def rejects(validator, output):
+    with pytest.raises(ValidationFailed):
+        validator(output)
+
+
+def test_validators():
+    cascade.length(3, 5)("abcd")
+    rejects(cascade.length(3, 5), "  ab ")
+    rejects(cascade.length(3, 5), "abcdef")
+
+    cascade.lines(2, 3, max_words=3)("one two\n\nthree")
+    rejects(cascade.lines(2), "one line")
+    rejects(cascade.lines(1, 1), "a\nb")
+    rejects(cascade.lines(max_words=2), "far too many words")
+
+    cascade.matches(r"\d+")(AIMessage(content="it is 42"))
+    rejects(cascade.matches(r"\d+"), "none")
+
+    cascade.parses(Answer)('```json\n{"value": 3}\n```')
+    cascade.parses(Answer)(Answer(value=3))
+    rejects(cascade.parses(Answer), '{"value": "many"}')
+    rejects(cascade.parses(Answer), "not json")
+
+    rejects(cascade.all_of(cascade.length(1), cascade.matches("x")), "abc")
+
+
+def test_moves_up_only_when_the_stage_validator_rejects(monkeypatch):
+    monkeypatch.setattr(cascade, "cascade_counts", cascade.CascadeStats())
+    tiers = Cascade([fake("short", "fine"), fake("a longer answer")], name="t",
+                    validators={"review": cascade.length(10)})
+    with stage("review"):
+        assert tiers.invoke("q").content == "a longer answer"
+    # no validator outside the stage: the first tier answers
+    assert tiers.invoke("q").content == "fine"
+    assert cascade.cascade_stats() == {"t": {"review": {"GenericFakeChatModel": 1}, "-": {"GenericFakeChatModel": 1}}}
+
+
+def test_failing_tiers_and_exhaustion(monkeypatch):
+    monkeypatch.setattr(cascade, "cascade_counts", cascade.CascadeStats())
+    assert Cascade([Broken(messages=iter([])), fake("ok")]).invoke("q").content == "ok"
+    assert Cascade([fake("a"), fake("b")], validators=cascade.length(5)).invoke("q").content == "b"
+    with pytest.raises(CascadeExhausted) as error:
+        Cascade([fake("a"), fake("b")], validators=cascade.length(5), strict=True).invoke("q")
+    assert len(error.value.attempts) == 2
+    with pytest.raises(ConnectionError):
+        Cascade([Broken(messages=iter([]))]).invoke("q")
+    assert cascade.cascade_stats()["cascade"]["-"]["exhausted"] == 3
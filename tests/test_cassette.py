@@ -0,0 +1,22 @@
+import os
+
+from framework.core.cassette import DUMMY_KEYS, Cassette
+
+
+def test_replay_removes_only_the_keys_it_set(tmp_path, monkeypatch):
+    path = tmp_path / "tape.jsonl"
+    path.write_text("")
+    for key in DUMMY_KEYS:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("OPENAI_API_KEY", "real")
+    with Cassette(str(path)):
+        assert os.environ["GROQ_API_KEY"] == "cassette-replay"
+    assert os.environ["OPENAI_API_KEY"] == "real"
+    assert not any(key in os.environ for key in DUMMY_KEYS[1:])
+
+
+def test_record_sets_no_keys(tmp_path, monkeypatch):
+    for key in DUMMY_KEYS:
+        monkeypatch.delenv(key, raising=False)
+    with Cassette(str(tmp_path / "tape.jsonl"), mode="record"):
+        assert not any(key in os.environ for key in DUMMY_KEYS)
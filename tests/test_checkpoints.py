@@ -0,0 +1,66 @@
+from typing import TypedDict
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command, interrupt
+
+from framework.core.checkpoints import SqliteCheckpointer
+
+
+def config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def put(saver, thread_id, n, parent=None):
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = f"{n:04d}"
+    return saver.put(config(thread_id, parent), checkpoint, {"step": n}, {})
+
+
+def test_put_get_list_and_prune(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "db" / "checkpoints.sqlite3"), keep_last=2)
+    parent = None
+    for n in range(4):
+        parent = put(saver, "a", n, parent)["configurable"]["checkpoint_id"]
+    put(saver, "b", 0)
+    saver.put_writes(config("a", "0003"), [("messages", "hi")], task_id="t")
+
+    latest = saver.get_tuple(config("a"))
+    assert latest.checkpoint["id"] == "0003" and latest.metadata["step"] == 3
+    assert latest.parent_config["configurable"]["checkpoint_id"] == "0002"
+    assert latest.pending_writes == [("t", "messages", "hi")]
+    # only the newest two of a thread are kept
+    assert [t.checkpoint["id"] for t in saver.list(config("a"))] == ["0003", "0002"]
+    assert saver.get_tuple(config("a", "0000")) is None
+    assert [t.checkpoint["id"] for t in saver.list(config("a"), before=config("a", "0003"))] == ["0002"]
+    assert [t.metadata["step"] for t in saver.list(None, filter={"step": 0})] == [0]
+    saver.delete_thread("a")
+    assert saver.get_tuple(config("a")) is None and saver.get_tuple(config("b"))
+
+
+class State(TypedDict):
+    answer: str
+
+
+def ask(state: State) -> State:
+    return {"answer": interrupt("what now?")}
+
+
+def graph(saver):
+    builder = StateGraph(State)
+    builder.add_node("ask", ask)
+    builder.add_edge(START, "ask")
+    builder.add_edge("ask", END)
+    return builder.compile(checkpointer=saver)
+
+
+def test_interrupted_run_resumes_from_another_checkpointer(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    graph(SqliteCheckpointer(path)).invoke({"answer": ""}, config("run"))
+    saver = SqliteCheckpointer(path)
+    assert saver.interrupted() == ["run"]
+    assert graph(saver).invoke(Command(resume="carry on"), config("run")) == {"answer": "carry on"}
+    assert saver.interrupted() == []
@@ -0,0 +1,45 @@
+import asyncio
+import gc
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from framework.core import brains
+from framework.core.metrics import current_stage
+from framework.cv_builder import CV_Builder
+
+
+def builder(*replies):
+    return CV_Builder(brains._managed(GenericFakeChatModel)(messages=iter([AIMessage(content=reply) for reply in replies])))
+
+
+def test_stream_stage_tags_only_the_model_call(metrics):
+    cv = builder("one two three")
+    stages = [current_stage() for _ in cv.stream_analysis(jd="jd", user_input="")]
+    assert set(stages) == {""}
+    assert metrics.rows()[-1]["stage"] == "cv.analysis"
+
+
+def test_async_stream_broken_off_in_a_child_task(metrics):
+    cv = builder("one two three")
+
+    async def main():
+        async def first():
+            async for text in cv.astream_analysis(jd="jd", user_input=""):
+                return text
+        assert await asyncio.create_task(first())
+        gc.collect()
+        # the abandoned generator is finalized by the loop, outside the child task's context
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    errors = []
+    loop = asyncio.new_event_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        loop.run_until_complete(main())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+    assert errors == []
+    assert metrics.rows()[-1]["stage"] == "cv.analysis"
@@ -0,0 +1,66 @@
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import Runnable
+
+from framework.core.hedging import HedgeBudget, HedgedModel
+
+
+class Slow(Runnable):
+    """Streams `words` after waiting `delay` seconds for the first one"""
+
+    def __init__(self, delay, *words):
+        self.delay = delay
+        self.words = words
+        self.cancelled = False
+
+    def invoke(self, input, config=None, **kwargs):
+        return AIMessageChunk(content="".join(self.words))
+
+    async def astream(self, input, config=None, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+            for word in self.words:
+                yield AIMessageChunk(content=word)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_budget_caps_hedges_at_a_share_of_calls():
+    budget = HedgeBudget(ratio=0.5, burst=2)
+    assert budget.spend() and budget.spend()
+    assert not budget.spend()
+    budget.earn()
+    assert not budget.spend()
+    budget.earn()
+    assert budget.spend()
+    for _ in range(10):
+        budget.earn()
+    assert budget.credit == 2
+
+
+def test_backup_wins_a_slow_primary_and_the_primary_is_cancelled():
+    primary, backup = Slow(1.0, "slow"), Slow(0.0, "fast ", "answer")
+    model = HedgedModel(primary, backup, initial_delay=0.02)
+    assert asyncio.run(model.ainvoke("q")).content == "fast answer"
+    assert primary.cancelled
+    assert model.counts["hedged"] == 1 and model.counts["backup_won"] == 1
+
+
+def test_no_hedge_without_budget():
+    primary, backup = Slow(0.05, "primary"), Slow(0.0, "backup")
+    model = HedgedModel(primary, backup, budget=0, initial_delay=0.01)
+    assert asyncio.run(model.ainvoke("q")).content == "primary"
+    assert model.counts["budget_denied"] == 1
+
+
+def test_fails_over_when_the_primary_fails():
+    class Failing(Slow):
+        async def astream(self, input, config=None, **kwargs):
+            raise ConnectionError("down")
+            yield
+
+    model = HedgedModel(Failing(0), Slow(0, "backup"), initial_delay=1.0)
+    assert asyncio.run(model.ainvoke("q")).content == "backup"
+    assert model.counts["failover"] == 1 and not model.first_token_times
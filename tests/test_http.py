@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from framework.server.http import HttpServer, Response, StreamResponse, sse_event
+
+
+async def raw_exchange(raw: bytes, loop_errors=None) -> bytes:
+    server = HttpServer()
+
+    async def echo(request):
+        return Response.json({"length": len(request.body), "id": request.match_info["item_id"]})
+
+    async def broken(request):
+        raise RuntimeError("secret connection string")
+
+    async def broken_stream(request):
+        async def events():
+            yield sse_event({"n": 1})
+            raise RuntimeError("secret connection string")
+        return StreamResponse(events())
+
+    server.add_route("POST", "/items/{item_id}", echo)
+    server.add_route("GET", "/broken", broken)
+    server.add_route("GET", "/broken-stream", broken_stream)
+    if loop_errors is not None:
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    finally:
+        listener.close()
+        await listener.wait_closed()
+    return response
+
+
+async def exchange(raw: bytes):
+    head, _, body = (await raw_exchange(raw)).partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def request(method, path, headers=(), body=b""):
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", "Connection: close", *headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def test_routes_and_body():
+    status, body = asyncio.run(exchange(request("POST", "/items/7", ["Content-Length: 5"], b"hello")))
+    assert status == 200 and body == {"length": 5, "id": "7"}
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+def test_malformed_content_length_is_a_bad_request(length):
+    status, body = asyncio.run(exchange(request("POST", "/items/7", [f"Content-Length: {length}"])))
+    assert status == 400 and "Content-Length" in body["error"]
+
+
+def test_handler_errors_do_not_leak_details(capsys):
+    status, body = asyncio.run(exchange(request("GET", "/broken")))
+    assert status == 500 and body == {"error": "Internal server error"}
+    assert "secret connection string" in capsys.readouterr().out
+
+
+def test_unknown_route_and_method():
+    assert asyncio.run(exchange(request("GET", "/nope")))[0] == 404
+    assert asyncio.run(exchange(request("GET", "/items/7")))[0] == 405
+
+
+def test_failing_stream_ends_with_an_error_event(capsys):
+    errors = []
+    response = asyncio.run(raw_exchange(request("GET", "/broken-stream"), errors))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert b"200" in head.split(b"\r\n")[0]
+    assert b'event: error\ndata: {"error": "Internal server error"}' in body
+    assert body.endswith(b"0\r\n\r\n") and b"secret" not in body
+    assert "secret connection string" in capsys.readouterr().out
+    assert errors == []
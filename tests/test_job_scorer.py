@@ -0,0 +1,51 @@
+import asyncio
+import gc
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from framework.core import brains
+from framework.core.metrics import current_stage
+from framework.job_scorer import JobScorer
+
+CARDS = [{"id": str(n), "title": f"Data engineer {n}", "text": "python sql spark"} for n in range(3)]
+
+
+def scorer(tmp_path):
+    replies = iter([AIMessage(content="SCORE: 80\nREASON: good fit")] * 10)
+    return JobScorer(brains._managed(GenericFakeChatModel)(messages=replies),
+                     cache_path=str(tmp_path / "scores" / "cache.sqlite3"))
+
+
+def test_score_many_tags_only_the_llm_calls(tmp_path, metrics):
+    async def main():
+        results = []
+        async for result in scorer(tmp_path).score_many(CARDS):
+            results.append((result["final"], current_stage()))
+        return results
+    results = asyncio.run(main())
+    assert sum(final for final, _ in results) == 3
+    assert {stage for _, stage in results} == {""}
+    assert {row["stage"] for row in metrics.rows()} == {"score.llm"}
+
+
+def test_score_many_closed_by_a_departing_client(tmp_path, metrics):
+    async def main():
+        async def first():
+            async for result in scorer(tmp_path).score_many(CARDS):
+                if result["final"]:
+                    return result
+        assert await asyncio.create_task(first())
+        gc.collect()
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    errors = []
+    loop = asyncio.new_event_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        loop.run_until_complete(main())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+    assert errors == []
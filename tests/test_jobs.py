@@ -0,0 +1,13 @@
+import asyncio
+
+import pytest
+
+from framework.server.jobs import JobQueue
+
+
+def test_job_queue_refuses_jobs_before_it_starts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.register("noop", lambda payload: None)
+    with pytest.raises(RuntimeError, match="not started"):
+        asyncio.run(queue.submit("noop", {}))
+    assert queue.db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
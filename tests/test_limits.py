@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from framework.core.cassette import CassetteMiss
+from framework.core.limits import ProviderLimiter, Slots, TokenBucket, parse_reset
+
+
+def test_parse_reset():
+    assert parse_reset("20") == 20
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("250ms") == 0.25
+    assert parse_reset("soon") is None
+
+
+def test_token_bucket_waits_once_empty():
+    bucket = TokenBucket(60)  # one per second
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(2) == pytest.approx(2, abs=0.05)
+    # larger than the bucket: capped, not waiting forever
+    assert bucket.reserve(10**6) == pytest.approx(62, abs=0.1)
+
+
+def test_token_bucket_adjust_and_sync():
+    bucket = TokenBucket(600)
+    bucket.reserve(500)
+    bucket.adjust(400)
+    assert bucket.level == pytest.approx(500, abs=1)
+    bucket.sync(remaining=0, reset=5, limit=120)
+    assert bucket.capacity == 120 and bucket.level <= 0
+    assert bucket.reserve(0) == pytest.approx(5, abs=0.05)
+    bucket.pause(30)
+    assert bucket.reserve(0) == pytest.approx(30, abs=0.05)
+
+
+def test_slots_are_handed_over_in_order():
+    slots = Slots(1)
+    slots.acquire()
+    order = []
+
+    def worker(n):
+        slots.acquire()
+        order.append(n)
+        slots.release()
+
+    threads = []
+    for n in range(3):
+        threads.append(threading.Thread(target=worker, args=(n,)))
+        threads[-1].start()
+        while len(slots._waiters) < n + 1:
+            time.sleep(0.001)
+    slots.release()
+    for thread in threads:
+        thread.join(1)
+    assert order == [0, 1, 2] and slots.in_use == 0
+
+
+def test_slots_cancelled_waiter_gives_no_slot_away():
+    async def main():
+        slots = Slots(1)
+        await slots.aacquire()
+        waiter = asyncio.ensure_future(slots.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slots.release()
+        assert slots.in_use == 0 and not slots._waiters
+        await asyncio.wait_for(slots.aacquire(), 1)
+        assert slots.in_use == 1
+    asyncio.run(main())
+
+
+def test_provider_limiter_follows_headers():
+    limiter = ProviderLimiter("test", requests_per_minute=100, tokens_per_minute=10000)
+    limiter.record(500, 200, {"x-ratelimit-remaining-tokens": "50", "x-ratelimit-limit-tokens": "6000",
+                              "anthropic-ratelimit-requests-remaining": "3"})
+    assert limiter.tokens.capacity == 6000 and limiter.tokens.level == 50
+    assert limiter.requests.level == 3
+
+
+def test_provider_limiter_backoff():
+    limiter = ProviderLimiter("test", requests_per_minute=100, max_retries=2)
+    request = httpx.Request("POST", "https://example.com")
+    limited = httpx.HTTPStatusError("429", request=request, response=httpx.Response(
+        429, headers={"retry-after": "7"}, request=request))
+    assert limiter.backoff(limited, 0) == 7
+    # a 429 pauses the whole provider
+    assert limiter.requests.reserve(1) == pytest.approx(7, abs=0.05)
+    assert limiter.backoff(limited, 2) is None
+    assert limiter.backoff(ValueError("bad"), 0) is None
+    try:
+        raise RuntimeError("wrapped") from CassetteMiss("no recording")
+    except RuntimeError as e:
+        assert limiter.backoff(e, 0) is None
+
+
+def test_provider_limiter_bounds_in_flight():
+    limiter = ProviderLimiter("test", max_in_flight=2)
+
+    async def main():
+        await limiter.aacquire(10)
+        await limiter.aacquire(10)
+        third = asyncio.ensure_future(limiter.aacquire(10))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        limiter.release()
+        await asyncio.wait_for(third, 1)
+        assert limiter.slots.in_use == 2
+    asyncio.run(main())
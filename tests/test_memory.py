@@ -0,0 +1,50 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from framework.core.memory import ConversationMemory
+
+
+def one_token_per_word(message):
+    return len(str(message.content).split())
+
+
+def converse(memory, *turns):
+    for question, answer in turns:
+        memory.add(HumanMessage(content=question))
+        memory.add(AIMessage(content=answer))
+
+
+def test_older_turns_are_folded_into_an_extract():
+    memory = ConversationMemory(recent_turns=1, summarize_after=12, count_tokens=one_token_per_word)
+    converse(memory, ("what is the capital of france", "paris is the capital"),
+             ("and of spain", "madrid"))
+    # the first turn alone (10 tokens) is under the threshold
+    assert memory.stats()["messages"] == 4
+    memory.add(HumanMessage(content="and of italy"))
+    # the first two turns were folded, the current one is kept
+    assert memory.stats()["folded"] == 4
+    assert [entry.message.content for entry in memory.entries] == ["and of italy"]
+    assert memory.summary.splitlines() == ["human: what is the capital of france", "ai: paris is the capital",
+                                           "human: and of spain", "ai: madrid"]
+
+
+def test_fold_uses_the_model_incrementally():
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="first summary"), AIMessage(content="second summary")]))
+    memory = ConversationMemory(llm=llm, recent_turns=1, summarize_after=0, count_tokens=one_token_per_word)
+    converse(memory, ("one", "a"), ("two", "b"))
+    assert memory.summary == "first summary"
+    converse(memory, ("three", "c"))
+    assert memory.summary == "second summary" and memory.stats()["folded"] == 4
+
+
+def test_context_keeps_the_current_turn_and_relevant_messages_in_order():
+    memory = ConversationMemory(recent_turns=10, count_tokens=one_token_per_word)
+    converse(memory, ("tell me about python decorators", "decorators wrap functions"),
+             ("what about the weather", "sunny all week long today"))
+    memory.add(HumanMessage(content="more on python decorators"))
+    context = memory.context(budget_tokens=12)
+    assert [message.content for message in context] == [
+        "tell me about python decorators", "decorators wrap functions", "more on python decorators"]
+    memory.summary = "earlier"
+    context = memory.context(budget_tokens=10)
+    assert isinstance(context[0], SystemMessage) and context[-1].content == "more on python decorators"
@@ -0,0 +1,109 @@
+import sqlite3
+import time
+
+import pytest
+
+from framework.core.metrics import CallMeter, MetricsStore, estimate_cost, percentile
+
+
+def written(store, table="llm_calls"):
+    with store._lock:
+        return store.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_record_buffers_and_the_writer_flushes(tmp_path):
+    store = MetricsStore(str(tmp_path / "m.sqlite3"), flush_interval=0.05)
+    try:
+        store.record(ts=time.time(), model="m", provider="p", stage="", latency=0.1, retries=0,
+                     coalesced=0, streamed=0)
+        store.record_run(run_id="r", exhausted=None, calls=1, tokens=2, seconds=0.5, replans=0)
+        deadline = time.time() + 5
+        while written(store) == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert written(store) == 1 and written(store, "agent_runs") == 1
+        assert store.rows()[0]["model"] == "m" and store.runs()[0]["run_id"] == "r"
+    finally:
+        store.close()
+
+
+def test_record_does_not_touch_sqlite(tmp_path):
+    store = MetricsStore(str(tmp_path / "m.sqlite3"), flush_interval=60)
+    try:
+        with store._lock:   # a slow write in progress
+            started = time.perf_counter()
+            for _ in range(100):
+                store.record(ts=time.time(), model="m", provider="p", stage="", latency=0.1, retries=0,
+                             coalesced=0, streamed=0)
+            assert time.perf_counter() - started < 0.5
+        # reads see everything recorded before them
+        assert len(store.rows()) == 100
+    finally:
+        store.close()
+
+
+def record(store, **fields):
+    store.record(**dict(dict(ts=time.time(), model="m", provider="p", stage="", latency=0.1, retries=0,
+                             coalesced=0, streamed=0), **fields))
+
+
+def test_rows_sqlite_refuses_are_dropped(tmp_path):
+    store = MetricsStore(str(tmp_path / "m.sqlite3"), flush_interval=60)
+    try:
+        record(store)
+        record(store, model=None)   # violates NOT NULL
+        record(store)
+        store.flush()
+        assert written(store) == 2 and store.dropped == 1
+        assert store.pending["llm_calls"] == []
+        # later writes are not held up
+        record(store)
+        assert len(store.rows()) == 3
+    finally:
+        store.close()
+
+
+def test_locked_database_keeps_rows_buffered(tmp_path):
+    path = str(tmp_path / "m.sqlite3")
+    store = MetricsStore(path, flush_interval=60)
+    store.db.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(path)
+    try:
+        record(store)
+        other.execute("BEGIN EXCLUSIVE")
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+        assert len(store.pending["llm_calls"]) == 1 and store.dropped == 0
+        other.rollback()
+        assert len(store.rows()) == 1
+    finally:
+        other.close()
+        store.close()
+
+
+def test_buffer_is_capped(tmp_path):
+    store = MetricsStore(str(tmp_path / "m.sqlite3"), flush_interval=60, max_pending=3)
+    try:
+        for latency in range(5):
+            record(store, latency=latency)
+        assert [row[7] for row in store.pending["llm_calls"]] == [2, 3, 4]
+        assert store.dropped == 2
+    finally:
+        store.close()
+
+
+def test_call_meter_records_usage_and_cost(metrics):
+    meter = CallMeter("gpt-4o-mini", "openai", streamed=True)
+    meter.lead()
+    meter.finish(usage={"input_tokens": 1000, "output_tokens": 100})
+    row, = metrics.rows()
+    assert (row["input_tokens"], row["output_tokens"], row["streamed"]) == (1000, 100, 1)
+    assert row["cost"] == pytest.approx(estimate_cost("gpt-4o-mini", "openai", 1000, 100))
+    # a coalesced call shared another's request and costs nothing
+    CallMeter("gpt-4o-mini", "openai").finish(usage={"input_tokens": 5, "output_tokens": 5})
+    assert metrics.rows()[-1]["input_tokens"] == 0
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 95) == 4
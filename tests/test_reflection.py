@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from framework.core.reflection import ReflectionLog
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "logs" / "reflection.jsonl")
+
+
+def open_log(path, **kwargs):
+    return ReflectionLog(path, flush_interval=60, **kwargs)
+
+
+def test_entries_are_readable_before_and_after_writing(path):
+    log = open_log(path)
+    first = log.append("retry the flaky search tool", run_id="a")
+    log.append("plan finished", run_id="a", kind="outcome")
+    log.append("the database tool needs a limit", run_id="b")
+    assert log.get(first)["text"] == "retry the flaky search tool"
+    log.flush()
+    assert log.stats()["pending"] == 0 and os.path.exists(path + ".idx")
+    assert [entry["kind"] for entry in log.for_run("a")] == ["lesson", "outcome"]
+    assert [entry["id"] for entry in log.tail(2, kind="lesson")] == [1, 3]
+    assert log.search("which tool needs a limit", limit=1)[0]["run_id"] == "b"
+    log.close()
+
+
+def test_reopening_reads_the_index_and_rebuilds_a_stale_one(path):
+    log = open_log(path)
+    for n in range(3):
+        log.append(f"lesson number {n}", run_id="r")
+    log.close()
+    reopened = open_log(path)
+    assert reopened.stats()["entries"] == 3 and not reopened.stats().get("rebuilt")
+    assert reopened.append("another") == 4
+    reopened.close()
+
+    # an index behind its file (e.g. a crash between the two writes) is rebuilt
+    with open(path + ".idx") as index:
+        rows = index.readlines()
+    with open(path + ".idx", "w") as index:
+        index.writelines(rows[:-1])
+    rebuilt = open_log(path)
+    assert rebuilt.stats()["rebuilt"] == 1 and rebuilt.get(4)["text"] == "another"
+    rebuilt.close()
+
+
+def test_rotation_and_compaction(path):
+    log = open_log(path, max_bytes=1, max_segments=2, max_entries=3)
+    for n in range(3):
+        log.append("always check the input", run_id=str(n))
+        log.flush()
+    # the third rotation compacted the rotated files into one
+    assert log.stats()["rotations"] == 3 and log.stats()["compactions"] == 1
+    assert sorted(os.listdir(os.path.dirname(path))) == ["reflection.jsonl.1", "reflection.jsonl.1.idx"]
+    # only one copy of the repeated lesson is kept: the newest
+    assert [entry["run_id"] for entry in log.tail(10)] == ["2"]
+    assert log.search("check input")[0]["id"] == 3
+
+    for n in range(3, 7):
+        log.append(f"distinct lesson {n}", run_id=str(n))
+    log.flush()
+    log.close()
+    reopened = open_log(path, max_bytes=1, max_segments=2, max_entries=3)
+    assert [entry["id"] for entry in reopened.tail(10)] == [3, 4, 5, 6, 7]
+    reopened.close()
@@ -0,0 +1,47 @@
+from framework.core.router import ModelHealth
+
+
+def test_breaker_opens_after_failures_in_a_row():
+    health = ModelHealth(failure_threshold=3, cooldown=10)
+    for t in range(2):
+        health.observe(1.0, False, now=t)
+    assert health.available(now=2)
+    health.observe(1.0, False, now=2)
+    assert health.state == ModelHealth.OPEN
+    assert not health.available(now=5)
+    assert health.reopens_in(now=5) == 7
+
+
+def test_breaker_opens_on_error_rate():
+    health = ModelHealth(min_samples=4, failure_threshold=10, max_error_rate=0.5)
+    for t, ok in enumerate([False, True, False, True, False]):
+        health.observe(1.0, ok, now=t)
+    assert health.state == ModelHealth.OPEN
+
+
+def test_half_open_probe():
+    health = ModelHealth(failure_threshold=1, cooldown=10, max_cooldown=15)
+    health.observe(1.0, False, now=0)
+    assert health.available(now=10) and health.state == ModelHealth.HALF_OPEN
+    health.admit(now=10)
+    # one probe at a time, unless it never reports back
+    assert not health.available(now=11)
+    assert health.available(now=20)
+    # a failed probe doubles the cooldown, capped
+    health.observe(1.0, False, now=20)
+    assert health.state == ModelHealth.OPEN and health.cooldown == 15
+    assert health.available(now=35)
+    health.observe(0.5, True, now=35)
+    assert health.state == ModelHealth.CLOSED and health.cooldown == 10
+    assert health.stats(now=35)["samples"] == 1
+
+
+def test_stats_cover_recent_samples_only():
+    health = ModelHealth(max_age=60)
+    health.observe(9.0, True, now=0)
+    for t, latency in enumerate([1.0, 2.0, 3.0], start=100):
+        health.observe(latency, True, now=t)
+    health.observe(5.0, False, now=103)
+    stats = health.stats(now=104)
+    assert stats["samples"] == 4 and stats["error_rate"] == 0.25
+    assert stats["p50"] == 2.0 and stats["state"] == ModelHealth.CLOSED
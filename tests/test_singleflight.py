@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from framework.core.singleflight import SingleFlight
+
+
+def test_overlapping_calls_share_one_run():
+    flights = SingleFlight()
+    started, finish = threading.Event(), threading.Event()
+    runs, results = [], []
+
+    def call():
+        runs.append(1)
+        started.set()
+        finish.wait(1)
+        return {"answer": 42}
+
+    def caller():
+        results.append(flights.do("key", call, "model"))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=caller)
+    follower.start()
+    while flights.counts[("model", "coalesced")] < 1:
+        time.sleep(0.001)
+    finish.set()
+    leader.join(1), follower.join(1)
+    assert len(runs) == 1 and results == [{"answer": 42}] * 2
+    # followers get a copy, not the leader's object
+    assert results[0] is not results[1]
+    assert flights.stats() == {"model": {"leader": 1, "coalesced": 1}}
+    # nothing is kept once the call lands
+    assert flights.do("key", lambda: "again") == "again"
+
+
+def test_async_followers_share_the_exception():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flights.ado("key", fail) for _ in range(3)), return_exceptions=True)
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flights.stats()[""] == {"leader": 1, "coalesced": 2}
+
+
+def test_cancelled_leader_does_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.ado("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.ado("key", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+    assert asyncio.run(main()) == "done"
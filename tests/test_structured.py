@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from agent_trials3.structured import ConstrainedModel, fit_schema, repair_json
+
+class Plan(BaseModel):
+    steps: list[str]
+
+
+PLAN = {"properties": {"steps": {"type": "array"}}, "required": ["steps"]}
+
+
+@pytest.mark.parametrize("text, value", [
+    ('{"a": 1}', {"a": 1}),
+    ('Sure! ```json\n{"a": [1, 2]}\n``` Hope this helps.', {"a": [1, 2]}),
+    ("Here it is: {'a': True, 'b': None}", {"a": True, "b": None}),
+    ('{"a": [1, 2,], "b": false,}', {"a": [1, 2], "b": False}),
+    ('{"steps": ["one", "two', {"steps": ["one", "two"]}),
+    ('{"a": {"b": 1,', {"a": {"b": 1}}),
+    ('```json\n["x", "y"', ["x", "y"]),
+])
+def test_repair_json(text, value):
+    assert repair_json(text) == value
+
+
+@pytest.mark.parametrize("text", ["no json here", "{not: really json at all", ""])
+def test_repair_json_gives_up(text):
+    assert repair_json(text) is None
+
+
+def test_fit_schema():
+    assert fit_schema({"Plan": {"steps": ["a"]}}, PLAN) == {"steps": ["a"]}
+    assert fit_schema(["a", "b"], PLAN) == {"steps": ["a", "b"]}
+    assert fit_schema({"steps": ["a"], "extra": 1}, PLAN) == {"steps": ["a"], "extra": 1}
+    # several keys, or an inner object unrelated to the schema, are left alone
+    assert fit_schema({"x": {"y": 1}}, PLAN) == {"x": {"y": 1}}
+    two = {"properties": {"a": {}, "b": {}}, "required": ["a", "b"]}
+    assert fit_schema([1], two) == [1]
+    assert fit_schema([1], {}) == [1]
+
+
+def openai_compatible(replies):
+    """An OpenAIModel on a local OpenAI-compatible server, answering with `replies` and keeping the requests"""
+    requests = []
+
+    def handle(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        status, content = replies.pop(0)
+        return httpx.Response(status, json={
+            "id": "1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        } if status == 200 else {"error": {"message": content}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    provider = OpenAIProvider(base_url="http://localhost:11434/v1", api_key="local", http_client=client)
+    return OpenAIModel("qwen2.5", provider=provider), requests
+
+
+def test_json_schema_goes_out_without_touching_the_shared_client():
+    model, requests = openai_compatible([(200, '{"steps": ["a", "b"]}'), (200, "plain")])
+    create = model.client.chat.completions.create
+    agent = Agent(ConstrainedModel(model, hat="plan"), result_type=Plan)
+    assert asyncio.run(agent.run("plan it")).data == Plan(steps=["a", "b"])
+    assert requests[0]["response_format"]["json_schema"]["schema"]["required"] == ["steps"]
+    # another model on the same client sends no response_format
+    assert asyncio.run(Agent(model).run("hi")).data == "plain"
+    assert "response_format" not in requests[1]
+    assert model.client.chat.completions.create == create
+
+
+def test_rejected_json_schema_falls_back_to_plain_requests():
+    model, requests = openai_compatible([(400, "response_format not supported"), (200, '{"steps": ["a"]}')])
+    constrained = ConstrainedModel(model, hat="plan")
+    assert asyncio.run(Agent(constrained, result_type=Plan).run("plan it")).data == Plan(steps=["a"])
+    assert constrained.json_schema_rejected and "response_format" not in requests[1]
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+from agent_trial2.hats import Subtask, Subtasks
+from agent_trial2.team import agent_team, shared_state
+
+
+class FakeAgent:
+    def __init__(self, seen):
+        self.seen = seen
+
+    def get_app(self):
+        return self
+
+    async def ainvoke(self, state, config=None):
+        self.seen.append(state["input"])
+        await asyncio.sleep(0.01)
+        return {"response": f"done: {state['input'].splitlines()[0]}"}
+
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def ainvoke(self, prompt):
+        return self.reply
+
+
+def make_team(workers=2):
+    # skip __init__: it builds the leader and QA hats on real clients
+    team = agent_team.__new__(agent_team)
+    team.profiles, team.qa, team.recursion_limit = {}, None, 25
+    team.leader = FakeLLM(Subtasks(tasks=[Subtask(task="a"), Subtask(task="b"), Subtask(task="c", depends_on=[1, 2])]))
+    team.leader_llm = FakeLLM(SimpleNamespace(content="answer"))
+    team.seen = []
+    team.workers = [FakeAgent(team.seen) for _ in range(workers)]
+    team.state = shared_state()
+    team.room, team.pool, team._loop = None, [], None
+    team.counts = {"subtasks": 0, "failed": 0, "rejected": 0}
+    return team
+
+
+def test_dependent_subtasks_get_earlier_results():
+    team = make_team()
+    assert asyncio.run(asyncio.wait_for(team.run("objective"), 5)) == "answer"
+    assert team.counts["subtasks"] == 3
+    assert "1. a: done: a" in team.seen[-1] and "2. b: done: b" in team.seen[-1]
+    assert [entry["task"] for entry in team.state.get("results")][-1] == "c"
+
+
+def test_team_runs_again_on_a_new_event_loop():
+    team = make_team()
+    for _ in range(2):
+        assert asyncio.run(asyncio.wait_for(team.run("objective"), 5)) == "answer"
+    assert team.counts["subtasks"] == 6
+
+
+def test_context_manager_stops_the_pool():
+    team = make_team()
+
+    async def scenario():
+        async with team:
+            assert len(team.pool) == 2
+            await team.submit("x")
+            pool = team.pool
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert all(task.done() for task in pool) and team.pool == [] and team.room is None
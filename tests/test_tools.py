@@ -0,0 +1,50 @@
+import asyncio
+import gc
+import weakref
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from framework.core.tools import Toolbox, tool_to_call
+
+
+class Adder(Toolbox):
+    def __init__(self, offset):
+        self.offset = offset
+
+    @tool_to_call
+    def add(self, a: int, b: int = 1) -> int:
+        """Add two numbers.
+
+        Args:
+            a (int): First number
+            b (int): Second number
+        """
+        return a + b + self.offset
+
+
+def test_pydantic_ai_tools_are_bound_to_each_instance():
+    first, second = Adder(0), Adder(100)
+    assert first.pydantic_ai_tools()[0].function(1, 2) == 3
+    tool, = second.pydantic_ai_tools()
+    assert tool.function(1, 2) == 103
+
+    def respond(messages, info):
+        if len(messages) == 1:
+            return ModelResponse(parts=[ToolCallPart("add", {"a": 2})])
+        return ModelResponse(parts=[TextPart(str(messages[-1].parts[0].content))])
+    agent = Agent(FunctionModel(respond), tools=[tool])
+    assert asyncio.run(agent.run("go")).data == "103"
+
+
+def test_cached_tool_template_does_not_keep_the_instance_alive():
+    class FirstAdder(Adder):
+        pass
+
+    adder = FirstAdder(0)
+    adder.pydantic_ai_tools()
+    ref = weakref.ref(adder)
+    del adder
+    gc.collect()
+    assert ref() is None
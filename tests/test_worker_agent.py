@@ -0,0 +1,58 @@
+import json
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from agent_trials.core.agents.worker_agent import PlanAndExecuteAgent
+from framework.core.memory import ConversationMemory
+
+
+def make_agent(**config):
+    # skip __init__: it reads a config file and builds a real client
+    agent = PlanAndExecuteAgent.__new__(PlanAndExecuteAgent)
+    agent.config = config
+    agent.state = {}
+    agent.result_store = {}
+    agent.internal_messages = ConversationMemory()
+    agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="done")] * 5))
+    return agent
+
+
+def call(tool_name, **parameters):
+    return {"tool_name": tool_name, "parameters": parameters}
+
+
+def summary(agent):
+    return [message.content for message in agent.internal_messages.context()]
+
+
+def test_bad_reference_fails_only_its_call():
+    agent = make_agent()
+    calls = [
+        call("search_information", query="python"),
+        call("search_information", query="$1.query.0"),        # a string has no keys
+        call("search_information", query="$1.results.7"),      # out of range
+        call("search_information", query="$1.results.0"),
+    ]
+    assert agent._execute_tool_sequence(calls) == "done"
+    messages = summary(agent)
+    errors = [message for message in messages if message.startswith("Error executing tool")]
+    assert len(errors) == 2 and all("could not resolve reference" in error for error in errors)
+    assert any("Sample result for Sample result for python" in message for message in messages)
+
+
+def test_stored_results_can_be_read_back():
+    agent = make_agent(max_inline_result_chars=50)
+    calls = [call("search_information", query="x" * 200)]
+    agent._execute_tool_sequence(calls)
+    assert list(agent.result_store) == ["result-1"]
+
+    stored = json.dumps(agent.result_store["result-1"])
+    assert agent.read_stored_result("result-1", offset=10, length=20) == stored[10:30]
+
+    resolved = agent._resolve_references({"query": "$result-1.query", "text": "q=$result-1.state_updates"}, {})
+    assert resolved["query"] == "x" * 200
+    assert resolved["text"].startswith('q={"last_search"')
+
+    agent._execute_tool_sequence([call("read_stored_result", reference="result-9")])
+    assert any("No stored result result-9" in message for message in summary(agent))